@@ -101,7 +101,7 @@ export default function ServiceDetailPage() {
       const response = await fetch(`https://demoapi.andyanh.id.vn/api/services/${params.id}/reviews`)
       if (response.ok) {
         const data = await response.json()
-        setReviews(data)
+        setReviews(data.items)
       }
     } catch (error) {
       console.error("Error fetching reviews:", error)
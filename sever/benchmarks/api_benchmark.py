@@ -0,0 +1,481 @@
+"""
+Benchmark tải cho các luồng chính của API: xem danh mục, đặt hàng kèm file thiết kế, dashboard admin,
+xuất CSV và upload ảnh.
+
+Mặc định benchmark tự dựng môi trường riêng để kết quả lặp lại được giữa các lần chạy:
+- database riêng (DATABASE_NAME + "_bench", tạo mới và xóa khi xong) với dữ liệu mẫu cố định
+  (--scale nhân số dòng)
+- máy chủ SMTP giả lập aiosmtpd (email xác nhận đơn hàng không gửi ra ngoài)
+- uvicorn chạy main:app ở tiến trình con, file upload đơn hàng ghi vào thư mục tạm
+
+Mỗi kịch bản chạy --duration giây với --concurrency luồng gửi request liên tục, kết quả gồm
+số request/giây và độ trễ p50/p90/p95/p99 theo từng loại request. --baseline so sánh với kết quả
+đã lưu (--save-baseline): kịch bản có p95 tăng hoặc throughput giảm quá --tolerance thì thoát với mã 1,
+dùng được trong CI.
+
+Chạy (cần Postgres cấu hình trong .env, pip install -r requirements-dev.txt):
+    python -m benchmarks.api_benchmark --duration 20 --concurrency 8
+    python -m benchmarks.api_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.api_benchmark --baseline benchmarks/baseline.json --tolerance 0.25
+    python -m benchmarks.api_benchmark --url http://localhost:8000 --scenarios catalog   # server có sẵn
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+import requests
+from aiosmtpd.controller import Controller
+from PIL import Image as PILImage
+from sqlalchemy import create_engine, text
+
+from benchmarks.smtp_pool_benchmark import CountingHandler, free_port
+from config.settings import settings
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_USERNAME = "bench_admin"
+ADMIN_PASSWORD = "bench-password"
+PERCENTILES = (50, 90, 95, 99)
+
+# Dữ liệu mẫu cho --scale 1: {n} là số dòng đã nhân theo scale.
+# Dịch vụ có độ phổ biến lệch (dịch vụ id nhỏ nhận phần lớn đơn hàng), đơn hàng trải đều 1 năm gần nhất.
+SEED_SQL = [
+    ("services", 300, """
+        INSERT INTO services (name, description, price, category, is_active, featured, created_at, updated_at)
+        SELECT 'Dịch vụ in ' || i, 'In ấn chất lượng cao, giao hàng nhanh, mẫu ' || i, 50000 + (i % 50) * 10000,
+               'Danh mục ' || (i % 12), i % 10 <> 0, i % 25 = 0, now() - i * interval '1 hour', now()
+        FROM generate_series(1, {n}) AS i
+    """),
+    ("blogs", 2000, """
+        INSERT INTO blogs (title, content, category, is_active, created_at, updated_at)
+        SELECT 'Kinh nghiệm in ấn ' || i, 'Nội dung bài viết về in ấn, thiết kế và vật liệu ' || i,
+               'Chuyên mục ' || (i % 8), i % 8 <> 0, now() - i * interval '2 hours', now()
+        FROM generate_series(1, {n}) AS i
+    """),
+    ("orders", 20000, """
+        INSERT INTO orders (customer_name, customer_email, customer_phone, service_id, quantity, status,
+                            created_at, updated_at, status_changed_at)
+        SELECT 'Khách hàng ' || i, 'khach' || (i % 5000) || '@example.com', '09' || lpad((i % 100000000)::text, 8, '0'),
+               s.ids[1 + floor(power(random(), 3) * array_length(s.ids, 1))::int], 1 + i % 500,
+               (ARRAY['completed', 'completed', 'completed', 'processing', 'pending', 'cancelled'])[1 + i % 6],
+               now() - (i::float / {n}) * interval '365 days', now(), now()
+        FROM generate_series(1, {n}) AS i, (SELECT array_agg(id ORDER BY id) AS ids FROM services) AS s
+    """),
+    ("service_reviews", 5000, """
+        INSERT INTO service_reviews (service_id, author_name, is_anonymous, rating, content, created_at)
+        SELECT s.ids[1 + i % array_length(s.ids, 1)], 'Khách ' || i, i % 4 = 0, 1 + i % 5, 'Đánh giá ' || i,
+               now() - i * interval '30 minutes'
+        FROM generate_series(1, {n}) AS i, (SELECT array_agg(id) AS ids FROM services) AS s
+    """),
+    ("images", 2000, """
+        INSERT INTO images (filename, file_path, url, category, is_visible, created_at, updated_at)
+        SELECT 'anh_' || i || '.jpg', 'static/images/uploads/anh_' || i || '.jpg', '/static/images/uploads/anh_' || i || '.jpg',
+               (ARRAY['portfolio', 'blog', 'service'])[1 + i % 3], i % 6 <> 0, now() - i * interval '3 hours', now()
+        FROM generate_series(1, {n}) AS i
+    """),
+]
+
+
+class Recorder:
+    """Ghi độ trễ theo tên request; mỗi luồng ghi vào list riêng nên không cần khóa"""
+
+    def __init__(self):
+        self._samples: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self._errors: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def request(self, session: requests.Session, name: str, method: str, url: str, expected: int = 200,
+                **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        response = session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        thread_id = threading.get_ident()
+        if response.status_code == expected:
+            self._samples[thread_id][name].append(elapsed)
+        else:
+            self._errors[thread_id][name] += 1
+        return response
+
+    def results(self) -> Dict[str, dict]:
+        samples: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        for per_thread in self._samples.values():
+            for name, values in per_thread.items():
+                samples[name].extend(values)
+        for per_thread in self._errors.values():
+            for name, count in per_thread.items():
+                errors[name] += count
+        return {name: summarize(samples.get(name, []), errors.get(name, 0))
+                for name in sorted(set(samples) | set(errors))}
+
+
+def summarize(values: List[float], errors: int) -> dict:
+    values = sorted(values)
+    result = {"count": len(values), "errors": errors}
+    if values:
+        result["mean_ms"] = sum(values) / len(values) * 1000
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = values[min(len(values) - 1, int(len(values) * p / 100))] * 1000
+        result["max_ms"] = values[-1] * 1000
+    return result
+
+
+class Context:
+    """Thông tin dùng chung của các kịch bản: URL, id dữ liệu mẫu, token admin"""
+
+    def __init__(self, base_url: str, admin_username: str = ADMIN_USERNAME, admin_password: str = ADMIN_PASSWORD):
+        self.base_url = base_url.rstrip("/")
+        self.admin_username = admin_username
+        self.admin_password = admin_password
+        self.service_ids: List[int] = []
+        self.admin_headers: Dict[str, str] = {}
+        self.created_files: List[str] = []
+        self.image = make_png()
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def load(self):
+        response = requests.get(self.url("/api/services/"), params={"limit": 100})
+        response.raise_for_status()
+        self.service_ids = [service["id"] for service in response.json()]
+        if not self.service_ids:
+            raise SystemExit("Không có dịch vụ nào để chạy benchmark")
+        response = requests.post(self.url("/api/auth/login-json"),
+                                 json={"username": self.admin_username, "password": self.admin_password})
+        if response.status_code == 200:
+            self.admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def make_png() -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (64, 64), (200, 40, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# Kịch bản: một lượt thao tác của người dùng, có thể gồm nhiều request
+def catalog_scenario(session: requests.Session, ctx: Context, recorder: Recorder, rng: random.Random):
+    """Khách xem danh sách dịch vụ, chi tiết, đánh giá, tìm kiếm và blog"""
+    service_id = rng.choice(ctx.service_ids)
+    recorder.request(session, "GET /api/services/", "GET", ctx.url("/api/services/"), params={"limit": 20})
+    recorder.request(session, "GET /api/services/{id}", "GET", ctx.url(f"/api/services/{service_id}"))
+    recorder.request(session, "GET /api/services/{id}/reviews", "GET", ctx.url(f"/api/services/{service_id}/reviews"))
+    recorder.request(session, "GET /api/search", "GET", ctx.url("/api/search"),
+                     params={"q": rng.choice(["in ấn", "danh thiếp", "mẫu", "thiết kế"])})
+    recorder.request(session, "GET /api/blogs/", "GET", ctx.url("/api/blogs/"))
+
+
+def order_scenario(session: requests.Session, ctx: Context, recorder: Recorder, rng: random.Random):
+    """Khách đặt hàng kèm file thiết kế (có ghi file và gửi email xác nhận)"""
+    number = rng.randrange(10 ** 8)
+    response = recorder.request(session, "POST /api/orders/", "POST", ctx.url("/api/orders/"), data={
+        "customer_name": f"Khách benchmark {number}",
+        "customer_email": f"bench{number}@example.com",
+        "customer_phone": f"09{number:08d}",
+        "service_id": rng.choice(ctx.service_ids),
+        "quantity": rng.randint(1, 1000),
+        "size": "A4",
+        "material": "couche",
+    }, files={"design_file": (f"thiet_ke_{number}.pdf", b"%PDF-1.4 benchmark" * 512, "application/pdf")})
+    if response.status_code == 200 and response.json().get("design_file_url"):
+        ctx.created_files.append(response.json()["design_file_url"])
+
+
+def dashboard_scenario(session: requests.Session, ctx: Context, recorder: Recorder, rng: random.Random):
+    """Admin mở dashboard và trang danh sách đơn hàng"""
+    for path in ("/api/dashboard/summary", "/api/dashboard/revenue-by-date", "/api/dashboard/orders-by-service",
+                 "/api/dashboard/order-sla"):
+        recorder.request(session, f"GET {path}", "GET", ctx.url(path), headers=ctx.admin_headers)
+    recorder.request(session, "GET /api/orders/", "GET", ctx.url("/api/orders/"), headers=ctx.admin_headers,
+                     params={"skip": rng.randint(0, 20) * 20, "limit": 20})
+
+
+def export_scenario(session: requests.Session, ctx: Context, recorder: Recorder, rng: random.Random):
+    """Admin xuất đơn hàng ra CSV"""
+    recorder.request(session, "GET /api/orders/export/csv", "GET", ctx.url("/api/orders/export/csv"),
+                     headers=ctx.admin_headers)
+
+
+def image_scenario(session: requests.Session, ctx: Context, recorder: Recorder, rng: random.Random):
+    """Admin upload ảnh rồi xem thư viện ảnh"""
+    response = recorder.request(session, "POST /api/images/upload", "POST", ctx.url("/api/images/upload"),
+                                headers=ctx.admin_headers, data={"category": "portfolio"},
+                                files={"file": ("benchmark.png", ctx.image, "image/png")})
+    if response.status_code == 200:
+        ctx.created_files.append("/" + response.json()["image"]["file_path"])
+    recorder.request(session, "GET /api/images/", "GET", ctx.url("/api/images/"))
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "catalog": catalog_scenario,
+    "order": order_scenario,
+    "dashboard": dashboard_scenario,
+    "export": export_scenario,
+    "image": image_scenario,
+}
+# Kịch bản cần đăng nhập admin
+ADMIN_SCENARIOS = {"dashboard", "export", "image"}
+
+
+def run_scenario(name: str, ctx: Context, duration: float, concurrency: int, seed: int) -> dict:
+    scenario = SCENARIOS[name]
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    iterations = [0] * concurrency
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                scenario(session, ctx, recorder, rng)
+                iterations[index] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    requests_stats = recorder.results()
+    total = sum(stats["count"] for stats in requests_stats.values())
+    all_p95 = [stats["p95_ms"] for stats in requests_stats.values() if "p95_ms" in stats]
+    return {
+        "iterations": sum(iterations),
+        "requests": total,
+        "errors": sum(stats["errors"] for stats in requests_stats.values()),
+        "rps": total / elapsed,
+        # p95 của scenario: p95 lớn nhất trong các loại request (request chậm nhất quyết định)
+        "p95_ms": max(all_p95) if all_p95 else None,
+        "endpoints": requests_stats,
+    }
+
+
+def print_report(results: Dict[str, dict]):
+    header = f"{'Request':<38} {'count':>7} {'err':>5} {'mean':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    for name, result in results.items():
+        print(f"\n== {name}: {result['rps']:.1f} request/s, {result['iterations']} lượt, {result['errors']} lỗi")
+        print(header)
+        for endpoint, stats in result["endpoints"].items():
+            if not stats["count"]:
+                print(f"{endpoint:<38} {0:>7} {stats['errors']:>5}")
+                continue
+            print(f"{endpoint:<38} {stats['count']:>7} {stats['errors']:>5} {stats['mean_ms']:>8.1f} "
+                  + " ".join(f"{stats[f'p{p}_ms']:>8.1f}" for p in PERCENTILES) + f" {stats['max_ms']:>8.1f}")
+    print("\n(độ trễ tính bằng ms)")
+
+
+def compare_baseline(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Các kịch bản chậm hơn baseline quá `tolerance` (tỷ lệ, 0.2 = 20%)"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} lỗi (baseline {base.get('errors', 0)})")
+        if base.get("p95_ms") and result["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']:.1f}ms so với baseline {base['p95_ms']:.1f}ms")
+        if base.get("rps") and result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rps']:.1f} request/s so với baseline {base['rps']:.1f}")
+    return regressions
+
+
+class BenchEnvironment:
+    """Database riêng có dữ liệu mẫu, máy chủ SMTP giả lập và uvicorn chạy ở tiến trình con"""
+
+    def __init__(self, database: str, scale: float, app: str, workers: int, port: int):
+        self.database = database
+        self.scale = scale
+        self.app = app
+        self.workers = workers
+        self.port = port
+        self.upload_dir = tempfile.mkdtemp(prefix="phulong_bench_")
+        self.smtp: Optional[Controller] = None
+        self.server: Optional[subprocess.Popen] = None
+        self.created = False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _admin_connection(self):
+        connection = psycopg2.connect(dbname="postgres", user=settings.DATABASE_USER,
+                                      password=settings.DATABASE_PASSWORD, host=settings.DATABASE_HOST or None,
+                                      port=settings.DATABASE_PORT)
+        connection.autocommit = True
+        return connection
+
+    def _database_url(self) -> str:
+        return (f"postgresql://{settings.DATABASE_USER}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOST}:"
+                f"{settings.DATABASE_PORT}/{self.database}")
+
+    def create_database(self):
+        connection = self._admin_connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{self.database}"')
+            cursor.execute(f'CREATE DATABASE "{self.database}"')
+        connection.close()
+        self.created = True
+
+        from models.models import Base
+        from routers.auth import get_password_hash
+
+        engine = create_engine(self._database_url())
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for table, rows, sql in SEED_SQL:
+                conn.execute(text(sql.format(n=max(1, int(rows * self.scale)))))
+            conn.execute(text("""
+                INSERT INTO users (username, email, hashed_password, role, is_active, created_at, updated_at)
+                VALUES (:username, 'bench_admin@example.com', :password, 'admin', true, now(), now())
+            """), {"username": ADMIN_USERNAME, "password": get_password_hash(ADMIN_PASSWORD)})
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE"))
+        engine.dispose()
+
+    def drop_database(self):
+        connection = self._admin_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s",
+                           (self.database,))
+            cursor.execute(f'DROP DATABASE IF EXISTS "{self.database}"')
+        connection.close()
+
+    def start(self):
+        print(f"Tạo database {self.database} (scale {self.scale})...")
+        self.create_database()
+
+        self.smtp = Controller(CountingHandler(), hostname="127.0.0.1", port=free_port())
+        self.smtp.start()
+
+        env = dict(os.environ, DATABASE_NAME=self.database, UPLOAD_DIR=self.upload_dir,
+                   SMTP_SERVER="127.0.0.1", SMTP_PORT=str(self.smtp.port), SMTP_USE_TLS="false",
+                   SMTP_USERNAME="", LOG_CONSOLE="false", LOG_DIR=os.path.join(self.upload_dir, "logs"),
+                   # Mọi request benchmark đến từ 127.0.0.1, giới hạn tần suất sẽ trả 429 cho kịch bản đặt hàng
+                   RATE_LIMIT_ENABLED="false")
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--port", str(self.port), "--workers", str(self.workers),
+             "--log-level", "warning"],
+            cwd=APP_DIR, env=env
+        )
+        for _ in range(120):
+            try:
+                if requests.get(self.base_url + "/", timeout=1).status_code == 200:
+                    return
+            except requests.ConnectionError:
+                pass
+            if self.server.poll() is not None:
+                raise SystemExit("Không khởi động được server benchmark")
+            time.sleep(0.5)
+        raise SystemExit("Server benchmark không phản hồi")
+
+    def stop(self, created_files: List[str], keep_database: bool):
+        if self.server is not None:
+            self.server.terminate()
+            self.server.wait(30)
+        if self.smtp is not None:
+            self.smtp.stop()
+        # Ảnh upload nằm trong static/images/uploads của ứng dụng, file đơn hàng nằm trong thư mục tạm
+        for url in created_files:
+            path = os.path.join(APP_DIR, url.lstrip("/"))
+            if os.path.isfile(path):
+                os.remove(path)
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+        if self.created and not keep_database:
+            self.drop_database()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tải cho API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Các kịch bản cách nhau bởi dấu phẩy ({', '.join(SCENARIOS)})")
+    parser.add_argument("--duration", type=float, default=15.0, help="Số giây chạy mỗi kịch bản")
+    parser.add_argument("--concurrency", type=int, default=8, help="Số luồng gửi request đồng thời")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Số giây chạy làm nóng trước mỗi kịch bản (không tính)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed ngẫu nhiên của các kịch bản")
+    parser.add_argument("--url", help="Chạy với server có sẵn thay vì tự dựng database và server")
+    parser.add_argument("--admin-username", default=ADMIN_USERNAME, help="Tài khoản admin khi chạy với --url")
+    parser.add_argument("--admin-password", default=ADMIN_PASSWORD)
+    parser.add_argument("--database", default=f"{settings.DATABASE_NAME}_bench")
+    parser.add_argument("--scale", type=float, default=1.0, help="Hệ số nhân số dòng dữ liệu mẫu")
+    parser.add_argument("--keep-database", action="store_true", help="Không xóa database benchmark khi xong")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File kết quả baseline để so sánh")
+    parser.add_argument("--save-baseline", help="Ghi kết quả làm baseline mới")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Mức chậm hơn baseline được chấp nhận (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Kịch bản không tồn tại: {', '.join(unknown)}")
+
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    environment = None
+    if args.url:
+        ctx = Context(args.url, args.admin_username, args.admin_password)
+    else:
+        environment = BenchEnvironment(args.database, args.scale, args.app, args.workers, args.port or free_port())
+        ctx = Context(environment.base_url)
+
+    results: Dict[str, dict] = {}
+    try:
+        if environment is not None:
+            environment.start()
+        ctx.load()
+        for index, name in enumerate(names):
+            if name in ADMIN_SCENARIOS and not ctx.admin_headers:
+                print(f"Bỏ qua kịch bản {name}: không đăng nhập được tài khoản {ctx.admin_username}")
+                continue
+            print(f"Chạy kịch bản {name} ({args.duration:g}s, {args.concurrency} luồng)...")
+            if args.warmup:
+                run_scenario(name, ctx, args.warmup, args.concurrency, args.seed + 1000 + index)
+            results[name] = run_scenario(name, ctx, args.duration, args.concurrency, args.seed + index)
+    finally:
+        if environment is not None:
+            environment.stop(ctx.created_files, args.keep_database)
+
+    print_report(results)
+    report = {
+        "scenarios": results,
+        "config": {key: getattr(args, key) for key in ("duration", "concurrency", "scale", "workers", "seed")},
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"Đã ghi kết quả vào {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["scenarios"]
+        regressions = compare_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nChậm hơn baseline quá {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\nKhông có kịch bản nào chậm hơn baseline quá {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+"""
+Sinh dữ liệu lớn giống thực tế để thử giới hạn mở rộng: orders (kèm order_status_events, order_status_stats),
+service_reviews, admin_access_logs, images.
+
+- Tên khách hàng tiếng Việt (họ theo tỷ lệ phổ biến, một phần là cửa hàng/công ty), email suy ra từ tên,
+  số điện thoại di động theo đầu số các nhà mạng với nhiều cách viết (0912 345 678, +84 912..., 84912...)
+- Độ phổ biến dịch vụ lệch theo phân phối Zipf, khách quen đặt nhiều lần
+- Đơn hàng tăng dần theo thời gian, ít vào Chủ nhật, tập trung giờ hành chính, cao điểm cuối năm trước Tết;
+  trạng thái theo tuổi đơn hàng (đơn cũ phần lớn đã hoàn thành), lịch sử trạng thái và thống kê SLA khớp với đơn
+- Log truy cập admin chỉ nằm trong ACCESS_LOG_RETENTION_DAYS ngày gần nhất như sau khi tác vụ dọn log chạy
+
+Các bảng được ghi bằng COPY theo lô (không qua ORM), mỗi bảng một transaction; sau đó tính lại tổng hợp
+đánh giá của dịch vụ và chạy VACUUM ANALYZE để EXPLAIN phản ánh đúng dữ liệu. Dịch vụ và tài khoản admin
+được thêm khi chưa đủ --services/--admins. Cùng --seed và tham số thì dữ liệu sinh ra giống nhau (thời gian tính lùi từ lúc chạy).
+
+Chạy trên database đã alembic upgrade head (script kiểm tra phiên bản migration trước khi ghi),
+thường là database riêng:
+    DATABASE_NAME=phulong_scale alembic upgrade head
+    DATABASE_NAME=phulong_scale python -m benchmarks.generate_dataset --orders 2000000 --access-logs 5000000
+    python -m benchmarks.generate_dataset --orders 200000 --reviews 0 --truncate
+"""
+
+import argparse
+import bisect
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from config.database import engine
+from config.settings import settings
+from utils.order_status import LEAD_TIME_STAGE, STATS_UPSERT_SQL
+from utils.pricing import pricing_engine
+from utils.search_index import normalize
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCESS_LOG_RETENTION_DAYS = 90
+
+# (giá trị, trọng số)
+FAMILY_NAMES = [
+    ("Nguyễn", 38), ("Trần", 11), ("Lê", 9.5), ("Phạm", 7), ("Hoàng", 4), ("Huỳnh", 2), ("Phan", 4.5),
+    ("Vũ", 3.9), ("Võ", 2), ("Đặng", 2.1), ("Bùi", 2), ("Đỗ", 1.4), ("Hồ", 1.3), ("Ngô", 1.3),
+    ("Dương", 1), ("Lý", 0.5), ("Trương", 0.8), ("Đinh", 0.6)
+]
+MIDDLE_NAMES = {
+    "male": ["Văn", "Hữu", "Đức", "Minh", "Quốc", "Thành", "Công", "Xuân", "Anh", "Gia", "Hoàng", "Tuấn"],
+    "female": ["Thị", "Ngọc", "Thu", "Thanh", "Minh", "Bảo", "Khánh", "Phương", "Kim", "Hồng", "Mỹ", "Thùy"]
+}
+GIVEN_NAMES = {
+    "male": ["Anh", "Bình", "Cường", "Dũng", "Duy", "Đạt", "Hải", "Hiếu", "Hoàng", "Hùng", "Huy", "Khang", "Khoa",
+             "Long", "Minh", "Nam", "Phong", "Phúc", "Quân", "Sơn", "Tài", "Thắng", "Thịnh", "Toàn", "Trung",
+             "Tuấn", "Việt", "Vinh"],
+    "female": ["Anh", "Chi", "Dung", "Giang", "Hà", "Hạnh", "Hằng", "Hoa", "Hương", "Huyền", "Lan", "Linh", "Loan",
+               "Mai", "My", "Nga", "Ngân", "Nhung", "Oanh", "Phương", "Quyên", "Tâm", "Thảo", "Trang", "Trinh",
+               "Uyên", "Vân", "Yến"]
+}
+BUSINESS_TYPES = ["Công ty TNHH", "Công ty CP", "Cửa hàng", "Quán cà phê", "Nhà hàng", "Shop", "Spa", "Trung tâm"]
+BUSINESS_WORDS = ["An Phát", "Minh Long", "Hoàng Gia", "Thành Đạt", "Phú Quý", "Sao Việt", "Hòa Bình", "Đại Nam",
+                  "Bình Minh", "Tân Tiến", "Kim Ngân", "Hưng Thịnh", "Mộc Lan", "Cỏ May", "Ánh Dương", "Trường Sơn"]
+EMAIL_DOMAINS = [("gmail.com", 72), ("yahoo.com", 8), ("outlook.com", 5), ("icloud.com", 4), ("hotmail.com", 3),
+                 ("fpt.vn", 1)]
+# Đầu số di động (bỏ số 0) của Viettel, Vinaphone, Mobifone, Vietnamobile, Gmobile
+MOBILE_PREFIXES = ["32", "33", "34", "35", "36", "37", "38", "39", "56", "58", "59", "70", "76", "77", "78", "79",
+                   "81", "82", "83", "84", "85", "86", "88", "89", "90", "91", "92", "93", "94", "96", "97", "98", "99"]
+
+# (danh mục, tên, đơn giá một sản phẩm)
+SERVICE_CATALOG = [
+    ("Danh thiếp", "In danh thiếp", 600), ("Tờ rơi", "In tờ rơi", 1500), ("Brochure", "In brochure", 6000),
+    ("Catalogue", "In catalogue", 25000), ("Thiệp", "In thiệp cưới", 3500), ("Bao bì", "In hộp giấy", 9000),
+    ("Bao bì", "In túi giấy", 6500), ("Tem nhãn", "In tem nhãn decal", 300), ("Quảng cáo", "In standee", 250000),
+    ("Quảng cáo", "In băng rôn", 120000), ("Lịch", "In lịch Tết", 45000), ("Văn phòng", "In phong bì", 1200),
+    ("Văn phòng", "In hóa đơn", 2500), ("Nhà hàng", "In menu", 20000), ("Quảng cáo", "In poster", 8000)
+]
+SERVICE_VARIANTS = ["", " cao cấp", " giá rẻ", " ép kim", " bế nổi", " khổ lớn", " lấy nhanh", " số lượng ít",
+                    " cán màng", " 2 mặt"]
+
+QUANTITIES = [(50, 10), (100, 30), (200, 15), (500, 20), (1000, 15), (2000, 5), (5000, 3), (10000, 2)]
+SIZES = [("A4", 35), ("A5", 25), ("A3", 15), ("A2", 5), ("A1", 3), ("A0", 1), ("9x5.5cm", 10), (None, 6)]
+MATERIALS = [("Giấy couche 150gsm", 30), ("Giấy couche 300gsm", 15), ("Giấy ivory 350gsm", 15), ("Giấy kraft", 8),
+             ("Decal giấy", 10), ("Decal nhựa", 5), ("Bạt hiflex", 6), ("Formex 5mm", 3), ("Mica 3mm", 2), (None, 6)]
+ORDER_NOTES = [(None, 70), ("Giao trước 9h sáng", 5), ("Cần xuất hóa đơn VAT", 8), ("In 2 mặt", 5),
+               ("Cán màng mờ", 4), ("Bo góc", 2), ("Gọi trước khi giao", 4), ("Thiết kế gửi qua Zalo", 2)]
+# Phân bố trạng thái theo tuổi đơn hàng: (số ngày tối đa, [(trạng thái, trọng số)])
+STATUS_BY_AGE = [
+    (2, [("pending", 55), ("processing", 35), ("completed", 5), ("cancelled", 5)]),
+    (14, [("pending", 10), ("processing", 35), ("completed", 45), ("cancelled", 10)]),
+    (None, [("completed", 86), ("cancelled", 9), ("processing", 3), ("pending", 2)])
+]
+
+RATINGS = [(5, 55), (4, 25), (3, 10), (2, 4), (1, 6)]
+REVIEW_TEMPLATES = {
+    5: ["In đẹp, màu chuẩn, giao đúng hẹn.", "Rất hài lòng, sẽ đặt tiếp lần sau.", "Nhân viên tư vấn nhiệt tình, giá tốt."],
+    4: ["Chất lượng tốt, giao hơi trễ một chút.", "Giấy đẹp, màu hơi đậm so với file.", "Ổn, giá hợp lý."],
+    3: ["Tạm được, cắt chưa đều.", "Màu in lệch so với bản thiết kế.", "Giao chậm hơn cam kết."],
+    2: ["Giấy mỏng hơn mẫu, phải in lại.", "Sai kích thước, xử lý chậm."],
+    1: ["Giao trễ nhiều ngày, không báo trước.", "Chất lượng kém, không như quảng cáo."]
+}
+
+ACCESS_ENDPOINTS = [
+    ("GET", "/api/orders/", 30), ("GET", "/api/orders/{order}", 20), ("PUT", "/api/orders/{order}", 10),
+    ("GET", "/api/orders/{order}/timeline", 3), ("PUT", "/api/orders/bulk", 1), ("GET", "/api/orders/export/csv", 1),
+    ("GET", "/api/dashboard/stats", 8), ("GET", "/api/dashboard/order-sla", 1), ("GET", "/api/services/", 6),
+    ("PUT", "/api/services/{service}", 2), ("POST", "/api/services/", 0.5), ("GET", "/api/blogs/", 2),
+    ("POST", "/api/blogs/", 0.3), ("PUT", "/api/blogs/{blog}", 0.5), ("GET", "/api/users", 0.5),
+    ("GET", "/api/users/me", 3)
+]
+ACCESS_STATUSES = {
+    "GET": [(200, 96), (404, 2), (401, 1.5), (500, 0.1)],
+    "PUT": [(200, 92), (409, 3), (404, 2), (422, 2), (401, 1)],
+    "POST": [(200, 95), (422, 4), (401, 1)]
+}
+# Dải IP của các nhà mạng trong nước (VNPT, Viettel, FPT)
+IP_PREFIXES = ["113.161", "113.185", "14.161", "14.231", "27.72", "27.78", "42.112", "42.116", "171.224", "118.69"]
+
+IMAGE_CATEGORIES = [("portfolio", 50), ("service", 30), ("blog", 20)]
+IMAGE_FORMATS = [(".jpg", "image/jpeg", 70), (".png", "image/png", 20), (".webp", "image/webp", 10)]
+IMAGE_DIMENSIONS = [((1920, 1080), 30), ((1280, 720), 20), ((1080, 1080), 20), ((800, 600), 10), ((3000, 2000), 10),
+                    ((1200, 1600), 10)]
+IMAGE_ALT_TEXTS = ["Mẫu {} đã in cho khách hàng", "Sản phẩm {} thực tế", "Quy trình {} tại xưởng", "{} mẫu mới"]
+
+# Hệ số theo thứ trong tuần (thứ Hai = 0) và theo giờ trong ngày
+WEEKDAY_FACTORS = [1.0, 1.05, 1.05, 1.0, 1.0, 0.7, 0.35]
+HOUR_FACTORS = [0.1, 0.05, 0.02, 0.02, 0.03, 0.1, 0.3, 0.8, 1.6, 2.0, 2.0, 1.6, 0.8, 1.4, 1.8, 1.8, 1.6, 1.2,
+                0.9, 1.0, 1.0, 0.8, 0.5, 0.2]
+# Hệ số theo tháng: cao điểm lịch, thiệp, quà Tết tháng 11-1, nghỉ Tết tháng 2, khai giảng tháng 8-9
+MONTH_FACTORS = [1.4, 0.7, 1.0, 1.0, 1.0, 0.95, 0.95, 1.05, 1.1, 1.0, 1.2, 1.35]
+
+
+class Weighted:
+    """Chọn ngẫu nhiên theo trọng số bằng tìm kiếm nhị phân trên tổng tích lũy (nhanh hơn random.choices từng phần tử)"""
+
+    def __init__(self, items: Sequence[Tuple[Any, float]]):
+        self.values = [value for value, _ in items]
+        self.cumulative = []
+        total = 0.0
+        for _, weight in items:
+            total += weight
+            self.cumulative.append(total)
+        self.total = total
+
+    def pick(self, rng: random.Random) -> Any:
+        return self.values[bisect.bisect(self.cumulative, rng.random() * self.total)]
+
+
+def zipf(values: Sequence[Any], exponent: float = 1.1) -> Weighted:
+    """Phần tử đứng trước phổ biến hơn: trọng số 1 / hạng^exponent"""
+    return Weighted([(value, 1 / (rank + 1) ** exponent) for rank, value in enumerate(values)])
+
+
+class Clock:
+    """Thời điểm ngẫu nhiên trong `days` ngày trước `end`, theo xu hướng tăng trưởng, thứ, tháng và giờ trong ngày"""
+
+    def __init__(self, end: datetime, days: int, growth: float = 1.0):
+        self.start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end = end
+        day_weights = []
+        for offset in range(days + 1):
+            day = self.start + timedelta(days=offset)
+            trend = math.exp(growth * offset / max(days, 1))  # growth=1: cuối kỳ nhiều đơn gấp e lần đầu kỳ
+            day_weights.append((offset, trend * WEEKDAY_FACTORS[day.weekday()] * MONTH_FACTORS[day.month - 1]))
+        self.days = Weighted(day_weights)
+        self.hours = Weighted(list(enumerate(HOUR_FACTORS)))
+
+    def pick(self, rng: random.Random) -> datetime:
+        moment = self.start + timedelta(days=self.days.pick(rng), hours=self.hours.pick(rng),
+                                        seconds=rng.random() * 3600)
+        return min(moment, self.end)
+
+
+class People:
+    """Sinh tên, email, số điện thoại; khách quen (chỉ số nhỏ) được chọn lại nhiều lần"""
+
+    def __init__(self, rng: random.Random, pool_size: int):
+        self.rng = rng
+        self.pool_size = max(pool_size, 1)
+        self.family_names = Weighted(FAMILY_NAMES)
+        self.email_domains = Weighted(EMAIL_DOMAINS)
+        self._customers: Dict[int, Tuple[str, str, str]] = {}
+
+    def name(self) -> str:
+        rng = self.rng
+        gender = "female" if rng.random() < 0.5 else "male"
+        return f"{self.family_names.pick(rng)} {rng.choice(MIDDLE_NAMES[gender])} {rng.choice(GIVEN_NAMES[gender])}"
+
+    def phone(self) -> str:
+        rng = self.rng
+        number = rng.choice(MOBILE_PREFIXES) + f"{rng.randrange(10 ** 7):07d}"
+        style = rng.random()
+        if style < 0.5:
+            return "0" + number
+        if style < 0.7:
+            return f"0{number[:3]} {number[3:6]} {number[6:]}"
+        if style < 0.8:
+            return f"0{number[:3]}.{number[3:6]}.{number[6:]}"
+        if style < 0.9:
+            return f"+84 {number[:3]} {number[3:6]} {number[6:]}"
+        return "84" + number
+
+    def customer(self) -> Tuple[str, str, str]:
+        """(tên, email, số điện thoại) của một khách hàng trong tập khách"""
+        index = int(self.pool_size * self.rng.random() ** 2.5)
+        customer = self._customers.get(index)
+        if customer is None:
+            customer = self._customers[index] = self._new_customer(index)
+        return customer
+
+    def _new_customer(self, index: int) -> Tuple[str, str, str]:
+        rng = self.rng
+        if rng.random() < 0.15:
+            name = f"{rng.choice(BUSINESS_TYPES)} {rng.choice(BUSINESS_WORDS)}"
+            email = f"lienhe{index}@{normalize(name).split(' ', 2)[-1].replace(' ', '')}.vn"
+            return name, email, self.phone()
+        name = self.name()
+        words = normalize(name).split()
+        pattern = rng.random()
+        if pattern < 0.5:
+            local = "".join(words) + str(index % 1000)
+        elif pattern < 0.8:
+            local = f"{words[-1]}.{words[0]}{index}"
+        else:
+            local = words[-1] + "".join(word[0] for word in words[:-1]) + str(index)
+        return name, f"{local}@{self.email_domains.pick(rng)}", self.phone()
+
+
+def _cell(value: Any) -> Any:
+    return "\\N" if value is None else value
+
+
+class CopyWriter:
+    """Ghi dòng vào bảng bằng COPY theo lô; batch_rows=None thì chỉ ghi khi gọi flush()"""
+
+    def __init__(self, connection, table: str, columns: List[str], batch_rows: Optional[int]):
+        if not connection.in_transaction():
+            connection.begin()  # COPY chạy trên kết nối DBAPI, commit() của connection phải thấy transaction
+        self.cursor = connection.connection.cursor()
+        self.table = table
+        self.statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        self.batch_rows = batch_rows
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.pending = self.total = 0
+        self.started = time.perf_counter()
+
+    def add(self, row: Sequence[Any]):
+        self.writer.writerow([_cell(value) for value in row])
+        self.pending += 1
+        if self.batch_rows and self.pending >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.buffer.seek(0)
+        self.cursor.copy_expert(self.statement, self.buffer)
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.total, self.pending = self.total + self.pending, 0
+        print(f"  {self.table}: {self.total:,} dòng ({self.total / (time.perf_counter() - self.started):,.0f} dòng/s)",
+              end="\r")
+
+    def close(self) -> int:
+        self.flush()
+        self.cursor.close()
+        print(f"  {self.table}: {self.total:,} dòng trong {time.perf_counter() - self.started:.1f} s" + " " * 20)
+        return self.total
+
+
+def copy_rows(connection, table: str, columns: List[str], rows: Iterator[Sequence[Any]], batch_rows: int) -> int:
+    """COPY các dòng vào bảng theo lô `batch_rows` dòng, trả về số dòng đã ghi"""
+    writer = CopyWriter(connection, table, columns, batch_rows)
+    for row in rows:
+        writer.add(row)
+    return writer.close()
+
+
+def check_schema(connection):
+    """Chỉ ghi vào database đã chạy alembic upgrade head"""
+    config = Config(os.path.join(APP_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(APP_DIR, "migrations"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    current = set()
+    if connection.execute(text("SELECT to_regclass('alembic_version') IS NOT NULL")).scalar():
+        current = set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    connection.commit()
+    if current != heads:
+        raise SystemExit(f"Database {settings.DATABASE_NAME} đang ở phiên bản migration {sorted(current) or 'trống'}, "
+                         f"cần {sorted(heads)}: chạy alembic upgrade head trước")
+
+
+class DatasetGenerator:
+    def __init__(self, connection, args: argparse.Namespace):
+        self.connection = connection
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.utcnow().replace(microsecond=0)
+        self.clock = Clock(self.now, args.days)
+        self.people = People(self.rng, max(args.orders // 3, 1000))
+        self.services: List[Tuple[int, float, str]] = []  # (id, giá, tên), thứ tự ngẫu nhiên = thứ tự phổ biến
+        self.admin_ids: List[int] = []
+
+    def _query(self, sql: str, params: Optional[dict] = None) -> List[tuple]:
+        return [tuple(row) for row in self.connection.execute(text(sql), params or {})]
+
+    def truncate(self):
+        self.connection.execute(text("TRUNCATE order_status_events, order_status_stats, orders, service_reviews, "
+                                     "admin_access_logs, images RESTART IDENTITY"))
+        self.connection.commit()
+
+    def ensure_services(self):
+        missing = self.args.services - self.connection.execute(text("SELECT count(*) FROM services")).scalar()
+        if missing > 0:
+            rng = self.rng
+
+            def rows():
+                for i in range(missing):
+                    category, base, price = SERVICE_CATALOG[i % len(SERVICE_CATALOG)]
+                    variant = SERVICE_VARIANTS[(i // len(SERVICE_CATALOG)) % len(SERVICE_VARIANTS)]
+                    name = f"{base}{variant}"
+                    if i >= len(SERVICE_CATALOG) * len(SERVICE_VARIANTS):
+                        name += f" mẫu {i}"
+                    created_at = self.clock.start + timedelta(days=rng.random() * 30)
+                    yield (name, f"Dịch vụ {name.lower()} tại Phú Long: tư vấn thiết kế, in nhanh, giao tận nơi",
+                           round(price * rng.uniform(0.7, 1.5), -2), category, rng.random() > 0.05,
+                           rng.random() < 0.05, created_at, created_at)
+
+            copy_rows(self.connection, "services",
+                      ["name", "description", "price", "category", "is_active", "featured", "created_at", "updated_at"],
+                      rows(), self.args.batch_rows)
+            self.connection.commit()
+
+        services = self._query("SELECT id, price, name FROM services WHERE is_active AND price IS NOT NULL ORDER BY id")
+        if not services:
+            raise SystemExit("Không có dịch vụ đang hoạt động để tạo đơn hàng")
+        self.rng.shuffle(services)
+        self.services = services
+
+    def ensure_admins(self):
+        self.admin_ids = [row[0] for row in self._query(
+            "SELECT id FROM users WHERE role IN ('admin', 'root') ORDER BY id")]
+        missing = self.args.admins - len(self.admin_ids)
+        if missing > 0:
+            from routers.auth import get_password_hash
+
+            # Tài khoản chỉ để có người dùng cho log và ảnh, mật khẩu ngẫu nhiên không dùng được
+            rows = self._query("""
+                INSERT INTO users (username, email, hashed_password, role, is_active, created_at, updated_at)
+                SELECT 'seed_admin_' || :seed || '_' || i, 'seed_admin_' || :seed || '_' || i || '@phulong.com',
+                       :password, 'admin', true, now(), now()
+                FROM generate_series(1, :count) AS i
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """, {"seed": self.args.seed, "password": get_password_hash(os.urandom(16).hex()), "count": missing})
+            self.connection.commit()
+            self.admin_ids += [row[0] for row in rows]
+
+    def orders(self):
+        rng = self.rng
+        services = zipf(self.services)
+        quantities, sizes, materials, notes = (Weighted(QUANTITIES), Weighted(SIZES), Weighted(MATERIALS),
+                                               Weighted(ORDER_NOTES))
+        statuses = [(max_days, Weighted(weights)) for max_days, weights in STATUS_BY_AGE]
+        # Thành tiền tính như khi đặt hàng qua API; số tổ hợp dịch vụ/số lượng/kích thước/chất liệu có hạn nên nhớ lại
+        prices: Dict[tuple, Optional[float]] = {}
+        stats: Dict[Tuple[int, str], List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+
+        def add_stat(service_id: int, stage: str, seconds: float):
+            stat = stats[(service_id, stage)]
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+        orders = CopyWriter(self.connection, "orders", [
+            "id", "customer_name", "customer_email", "customer_phone", "service_id", "quantity", "size", "material",
+            "design_file_url", "notes", "total_price", "status", "version", "status_changed_at", "created_at",
+            "updated_at"
+        ], None)
+        # Lịch sử trạng thái tham chiếu đơn hàng: chỉ ghi sau khi lô đơn hàng tương ứng đã được COPY
+        events = CopyWriter(self.connection, "order_status_events", [
+            "order_id", "service_id", "from_status", "to_status", "version", "duration_seconds", "created_at"
+        ], None)
+
+        remaining = self.args.orders
+        while remaining:
+            # Lấy trước id từ sequence để ghi lịch sử trạng thái trong cùng lô
+            ids = self.connection.execute(
+                text("SELECT nextval(pg_get_serial_sequence('orders', 'id')) FROM generate_series(1, :count)"),
+                {"count": min(remaining, self.args.batch_rows)}
+            ).scalars().all()
+            remaining -= len(ids)
+            for order_id in ids:
+                service_id, price, _ = services.pick(rng)
+                name, email, phone = self.people.customer()
+                quantity, size, material = quantities.pick(rng), sizes.pick(rng), materials.pick(rng)
+                created_at = self.clock.pick(rng)
+                age_days = (self.now - created_at).days
+                status = next(weights for max_days, weights in statuses
+                              if max_days is None or age_days < max_days).pick(rng)
+
+                # (trạng thái cũ, trạng thái mới, thời điểm), thời gian chờ và xử lý phân phối log-normal
+                history = [(None, "pending", created_at)]
+                if status == "cancelled":
+                    history.append(("pending", "cancelled", created_at + timedelta(hours=rng.uniform(0.5, 72))))
+                elif status != "pending":
+                    history.append(("pending", "processing", created_at + timedelta(hours=rng.lognormvariate(1.5, 0.8))))
+                    if status == "completed":
+                        history.append(("processing", "completed",
+                                        history[-1][2] + timedelta(hours=rng.lognormvariate(3.5, 0.7))))
+                history = [(source, target, min(moment, self.now)) for source, target, moment in history]
+                for version, (source, target, moment) in enumerate(history, start=1):
+                    duration = (moment - history[version - 2][2]).total_seconds() if source else None
+                    events.add((order_id, service_id, source, target, version, duration, moment))
+                    if source:
+                        add_stat(service_id, source, duration)
+                    if target == "completed":
+                        add_stat(service_id, LEAD_TIME_STAGE, (moment - created_at).total_seconds())
+                changed_at = history[-1][2]
+                key = (service_id, quantity, size, material)
+                if key not in prices:
+                    prices[key] = pricing_engine.total_price(price, quantity, size, material)
+
+                orders.add((order_id, name, email, phone, service_id, quantity, size, material,
+                            f"/static/uploads/{rng.getrandbits(64):016x}.pdf" if rng.random() < 0.4 else None,
+                            notes.pick(rng), prices[key], status,
+                            len(history), changed_at, created_at, changed_at))
+            orders.flush()
+            events.flush()
+        orders.close()
+        events.close()
+
+        if stats:
+            # Cộng dồn vào thống kê SLA như khi đơn hàng đổi trạng thái qua API
+            keys = sorted(stats)
+            self.connection.execute(text(STATS_UPSERT_SQL), {
+                "now": self.now,
+                "service_ids": [key[0] for key in keys],
+                "stages": [key[1] for key in keys],
+                "counts": [stats[key][0] for key in keys],
+                "totals": [stats[key][1] for key in keys],
+                "maxima": [stats[key][2] for key in keys]
+            })
+        self.connection.commit()
+
+    def reviews(self):
+        rng = self.rng
+        services = zipf(self.services)
+        ratings = Weighted(RATINGS)
+
+        def rows():
+            for _ in range(self.args.reviews):
+                rating = ratings.pick(rng)
+                anonymous = rng.random() < 0.15
+                yield (services.pick(rng)[0], None if anonymous else self.people.name(), anonymous, rating,
+                       rng.choice(REVIEW_TEMPLATES[rating]), self.clock.pick(rng))
+
+        copy_rows(self.connection, "service_reviews",
+                  ["service_id", "author_name", "is_anonymous", "rating", "content", "created_at"],
+                  rows(), self.args.batch_rows)
+        # Tính lại các cột tổng hợp đánh giá trên services từ toàn bộ đánh giá
+        self.connection.execute(text("""
+            UPDATE services s
+            SET rating_count = coalesce(r.count, 0), rating_sum = coalesce(r.sum, 0),
+                rating_1 = coalesce(r.r1, 0), rating_2 = coalesce(r.r2, 0), rating_3 = coalesce(r.r3, 0),
+                rating_4 = coalesce(r.r4, 0), rating_5 = coalesce(r.r5, 0)
+            FROM services s2
+            LEFT JOIN (
+                SELECT service_id, count(*) AS count, sum(rating) AS sum,
+                       count(*) FILTER (WHERE rating = 1) AS r1, count(*) FILTER (WHERE rating = 2) AS r2,
+                       count(*) FILTER (WHERE rating = 3) AS r3, count(*) FILTER (WHERE rating = 4) AS r4,
+                       count(*) FILTER (WHERE rating = 5) AS r5
+                FROM service_reviews GROUP BY service_id
+            ) r ON r.service_id = s2.id
+            WHERE s.id = s2.id
+        """))
+        self.connection.commit()
+
+    def access_logs(self):
+        rng = self.rng
+        clock = Clock(self.now, ACCESS_LOG_RETENTION_DAYS, growth=0)
+        endpoints = Weighted([((method, path), weight) for method, path, weight in ACCESS_ENDPOINTS])
+        statuses = {method: Weighted(weights) for method, weights in ACCESS_STATUSES.items()}
+        # Mỗi admin làm việc từ vài địa chỉ IP, admin đứng đầu danh sách hoạt động nhiều hơn
+        admins = zipf([(admin_id, [f"{rng.choice(IP_PREFIXES)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+                                   for _ in range(rng.randint(1, 3))]) for admin_id in self.admin_ids], 0.8)
+        max_order_id = self.connection.execute(text("SELECT coalesce(max(id), 1) FROM orders")).scalar()
+        service_ids = [service[0] for service in self.services]
+
+        def rows():
+            for _ in range(self.args.access_logs):
+                (method, path), (admin_id, ips) = endpoints.pick(rng), admins.pick(rng)
+                path = path.format(order=rng.randint(1, max_order_id), service=rng.choice(service_ids),
+                                   blog=rng.randint(1, 500))
+                timestamp = clock.pick(rng)
+                yield (admin_id, path, method, statuses[method].pick(rng), rng.choice(ips), timestamp,
+                       timestamp + timedelta(days=ACCESS_LOG_RETENTION_DAYS))
+
+        copy_rows(self.connection, "admin_access_logs",
+                  ["user_id", "endpoint", "method", "status_code", "ip_address", "timestamp", "expires_at"],
+                  rows(), self.args.batch_rows)
+        self.connection.commit()
+
+    def images(self):
+        rng = self.rng
+        categories, dimensions = Weighted(IMAGE_CATEGORIES), Weighted(IMAGE_DIMENSIONS)
+        formats = Weighted([((extension, mime), weight) for extension, mime, weight in IMAGE_FORMATS])
+
+        def rows():
+            for _ in range(self.args.images):
+                extension, mime_type = formats.pick(rng)
+                filename = f"{rng.getrandbits(128):032x}{extension}"
+                width, height = dimensions.pick(rng)
+                created_at = self.clock.pick(rng)
+                yield (filename, f"static/images/uploads/{filename}", f"/static/images/uploads/{filename}",
+                       rng.choice(IMAGE_ALT_TEXTS).format(rng.choice(self.services)[2].lower()),
+                       int(rng.lognormvariate(12.8, 0.9)), mime_type, width, height, rng.random() > 0.1,
+                       categories.pick(rng), rng.choice(self.admin_ids), created_at, created_at)
+
+        copy_rows(self.connection, "images",
+                  ["filename", "file_path", "url", "alt_text", "file_size", "mime_type", "width", "height",
+                   "is_visible", "category", "uploaded_by", "created_at", "updated_at"],
+                  rows(), self.args.batch_rows)
+        self.connection.commit()
+
+    def run(self):
+        started = time.perf_counter()
+        # Dữ liệu sinh lại được nên không cần chờ ghi WAL xuống đĩa ở mỗi commit
+        self.connection.execute(text("SET synchronous_commit = off"))
+        if self.args.truncate:
+            self.truncate()
+        self.ensure_services()
+        self.ensure_admins()
+        print(f"Sinh dữ liệu vào {settings.DATABASE_NAME} ({len(self.services)} dịch vụ, {len(self.admin_ids)} admin, "
+              f"{self.args.days} ngày, seed {self.args.seed})")
+        if self.args.orders:
+            self.orders()
+        if self.args.reviews:
+            self.reviews()
+        if self.args.access_logs and self.admin_ids:
+            self.access_logs()
+        if self.args.images and self.admin_ids:
+            self.images()
+
+        print("VACUUM ANALYZE...")
+        connection = self.connection.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("services", "orders", "order_status_events", "order_status_stats", "service_reviews",
+                      "admin_access_logs", "images"):
+            connection.execute(text(f"VACUUM ANALYZE {table}"))
+        print(f"Hoàn thành trong {time.perf_counter() - started:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu lớn giống thực tế (ghi bằng COPY)")
+    parser.add_argument("--orders", type=int, default=1_000_000, help="Số đơn hàng")
+    parser.add_argument("--reviews", type=int, default=200_000, help="Số đánh giá dịch vụ")
+    parser.add_argument("--access-logs", type=int, default=1_000_000,
+                        help=f"Số log truy cập admin (trong {ACCESS_LOG_RETENTION_DAYS} ngày gần nhất)")
+    parser.add_argument("--images", type=int, default=50_000, help="Số ảnh")
+    parser.add_argument("--services", type=int, default=300, help="Số dịch vụ tối thiểu, thiếu thì tạo thêm")
+    parser.add_argument("--admins", type=int, default=8, help="Số tài khoản admin tối thiểu, thiếu thì tạo thêm")
+    parser.add_argument("--days", type=int, default=730, help="Đơn hàng, đánh giá, ảnh trải đều trong số ngày gần nhất")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="Số dòng mỗi lần COPY")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Xóa dữ liệu cũ của các bảng được sinh (không xóa dịch vụ, người dùng)")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        check_schema(connection)
+        DatasetGenerator(connection, args).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark gửi email: mở kết nối mới cho mỗi email so với pool kết nối SMTP.
+
+Dùng aiosmtpd làm máy chủ SMTP giả lập chạy local (pip install -r requirements-dev.txt).
+Độ trễ bắt tay (--handshake-ms) mô phỏng chi phí TCP + STARTTLS + AUTH của máy chủ thật.
+
+Chạy:
+    python -m benchmarks.smtp_pool_benchmark --messages 200 --handshake-ms 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import smtplib
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP as SMTPServer
+
+from utils.email import SMTPConnectionPool, build_message
+
+FROM_ADDR = "bench@phulong.local"
+TO_ADDR = "admin@phulong.local"
+MESSAGE = build_message(TO_ADDR, "Benchmark", "<html><body><p>Đơn hàng mới</p></body></html>")
+
+
+class CountingHandler:
+    """Handler aiosmtpd chỉ đếm số email nhận được"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+class SlowHandshakeSMTP(SMTPServer):
+    """Máy chủ SMTP thêm độ trễ vào EHLO để mô phỏng chi phí mở phiên"""
+
+    handshake_delay = 0.0
+
+    async def smtp_EHLO(self, hostname):
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        return await super().smtp_EHLO(hostname)
+
+
+class BenchController(Controller):
+    def factory(self):
+        return SlowHandshakeSMTP(self.handler)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def send_single(host, port, count, workers):
+    """Cách cũ: mỗi email một kết nối SMTP mới"""
+    def _send(_):
+        with smtplib.SMTP(host, port) as server:
+            server.sendmail(FROM_ADDR, TO_ADDR, MESSAGE)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_send, range(count)))
+
+
+def make_pool(host, port, size):
+    return SMTPConnectionPool(host=host, port=port, size=size, use_tls=False)
+
+
+def send_pooled(host, port, count, workers, pool_size):
+    """Pool kết nối: mỗi email mượn một kết nối đã mở sẵn"""
+    pool = make_pool(host, port, pool_size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: pool.send(FROM_ADDR, TO_ADDR, MESSAGE), range(count)))
+    pool.close_all()
+
+
+def run(label, func, handler, count):
+    handler.received = 0
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    assert handler.received == count, f"{label}: nhận {handler.received}/{count} email"
+    print(f"{label:<28} {count:>6} email  {elapsed:>8.3f}s  {count / elapsed:>10.1f} email/s")
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pool kết nối SMTP")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4, help="Số luồng gửi đồng thời")
+    parser.add_argument("--pool-size", type=int, default=3)
+    parser.add_argument("--handshake-ms", type=float, default=20.0,
+                        help="Độ trễ mô phỏng khi mở phiên SMTP")
+    args = parser.parse_args()
+
+    # Log của aiosmtpd và pool làm nhiễu kết quả đo
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    SlowHandshakeSMTP.handshake_delay = args.handshake_ms / 1000
+    handler = CountingHandler()
+    host, port = "127.0.0.1", free_port()
+    controller = BenchController(handler, hostname=host, port=port)
+    controller.start()
+
+    try:
+        print(f"Máy chủ SMTP giả lập {host}:{port}, độ trễ bắt tay {args.handshake_ms}ms\n")
+        single = run("Mỗi email một kết nối", lambda: send_single(host, port, args.messages, args.workers),
+                     handler, args.messages)
+        pooled = run(f"Pool {args.pool_size} kết nối",
+                     lambda: send_pooled(host, port, args.messages, args.workers, args.pool_size),
+                     handler, args.messages)
+        print(f"\nPool nhanh hơn {pooled / single:.1f}x")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
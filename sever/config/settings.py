@@ -25,7 +25,71 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "your-password")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "Phú Long <no-reply@phulong.com>")
     ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "inphulong@gmail.com")
+    SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "3"))
+    SMTP_KEEPALIVE_SECONDS: int = int(os.getenv("SMTP_KEEPALIVE_SECONDS", "30"))  # Gửi NOOP nếu kết nối rảnh lâu hơn
+    SMTP_MAX_IDLE_SECONDS: int = int(os.getenv("SMTP_MAX_IDLE_SECONDS", "240"))  # Đóng kết nối rảnh quá lâu
+    SMTP_TIMEOUT: int = int(os.getenv("SMTP_TIMEOUT", "30"))
+    SMTP_ASYNC_CONCURRENCY: int = int(os.getenv("SMTP_ASYNC_CONCURRENCY", "2"))  # Số phiên SMTP bất đồng bộ song song
+    SMTP_ASYNC_QUEUE_SIZE: int = int(os.getenv("SMTP_ASYNC_QUEUE_SIZE", "100"))  # Giới hạn hàng đợi email bất đồng bộ
+    CONTACT_DIGEST_SIZE: int = int(os.getenv("CONTACT_DIGEST_SIZE", "20"))  # Số liên hệ gộp vào một email khi quá tải
     
+    # Email tổng hợp cho admin, bật mặc định (gửi mỗi 900 giây tới ADMIN_EMAIL; 0 = tắt, gửi từng email như cũ)
+    ADMIN_DIGEST_WINDOW_SECONDS: int = int(os.getenv("ADMIN_DIGEST_WINDOW_SECONDS", "900"))
+    ADMIN_DIGEST_MAX_EVENTS: int = int(os.getenv("ADMIN_DIGEST_MAX_EVENTS", "500"))
+    ADMIN_DIGEST_URGENT_QUANTITY: int = int(os.getenv("ADMIN_DIGEST_URGENT_QUANTITY", "0"))  # Đơn hàng từ số lượng này gửi ngay (0 = không áp dụng)
+    ADMIN_DIGEST_URGENT_KEYWORDS: str = os.getenv("ADMIN_DIGEST_URGENT_KEYWORDS", "gấp,khẩn,urgent")  # Từ khóa trong ghi chú/tin nhắn để gửi ngay
+    
+    # Gợi ý dịch vụ liên quan (tính sẵn định kỳ vào bảng service_recommendations)
+    RECOMMENDATION_SIZE: int = int(os.getenv("RECOMMENDATION_SIZE", "4"))
+    RECOMMENDATION_REFRESH_SECONDS: int = int(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "3600"))
+    RECOMMENDATION_LOOKBACK_DAYS: int = int(os.getenv("RECOMMENDATION_LOOKBACK_DAYS", "365"))  # Chỉ xét đơn hàng trong khoảng này
+    
+    # Tính giá đơn hàng: hệ số theo kích thước/chất liệu ("A4:1,A3:1.8") và chiết khấu theo số lượng ("100:0.05,500:0.1")
+    PRICE_SIZE_MULTIPLIERS: str = os.getenv("PRICE_SIZE_MULTIPLIERS", "")
+    PRICE_MATERIAL_MULTIPLIERS: str = os.getenv("PRICE_MATERIAL_MULTIPLIERS", "")
+    PRICE_QUANTITY_DISCOUNTS: str = os.getenv("PRICE_QUANTITY_DISCOUNTS", "")
+    PRICE_CACHE_TTL_SECONDS: int = int(os.getenv("PRICE_CACHE_TTL_SECONDS", "300"))  # Thời gian giữ bảng đơn giá trong bộ nhớ
+    
+    # Luồng sự kiện đơn hàng (SSE /api/orders/events)
+    ORDER_EVENTS_BUFFER_SIZE: int = int(os.getenv("ORDER_EVENTS_BUFFER_SIZE", "1000"))  # Số sự kiện giữ lại để phát lại khi client kết nối lại
+    ORDER_EVENTS_KEEPALIVE_SECONDS: int = int(os.getenv("ORDER_EVENTS_KEEPALIVE_SECONDS", "15"))
+    ORDER_EVENTS_TICKET_SECONDS: int = int(os.getenv("ORDER_EVENTS_TICKET_SECONDS", "60"))  # Thời hạn vé kết nối luồng sự kiện (chỉ kiểm tra lúc kết nối)
+    
+    # Nhập dữ liệu từ file CSV/XLSX
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))  # Số lỗi tối đa trả về trong báo cáo
+    
+    # Logging (ghi qua hàng đợi, file JSON logs/app_YYYYMMDD.log, mỗi ngày một file)
+    LOG_DIR: str = os.getenv("LOG_DIR", "logs")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", "30"))  # Số file log theo ngày được giữ lại
+    LOG_CONSOLE: bool = os.getenv("LOG_CONSOLE", "true").lower() == "true"  # Ghi thêm ra console dạng văn bản
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")  # Tỷ lệ request được ghi log INFO theo tiền tố đường dẫn, ví dụ "/api/orders:0.1"
+    
+    # Chế độ debug: thêm header Server-Timing (thời gian truy vấn database) vào response
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    QUERY_PROFILER_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "10"))  # Cảnh báo N+1 khi một truy vấn chạy quá số lần này trong một request (0 = tắt)
+    
+    # Số liệu Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")  # Nếu đặt, /metrics yêu cầu header "Authorization: Bearer <token>"
+
+    # Tracing (span theo định dạng OpenTelemetry cho request, truy vấn SQL, lưu file upload, gửi email)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "file")  # "file" (JSON lines) hoặc "otlp" (OTLP/HTTP JSON)
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))  # Tỷ lệ request được ghi trace (khi client không gửi traceparent)
+    TRACING_MAX_QUEUE_SIZE: int = int(os.getenv("TRACING_MAX_QUEUE_SIZE", "10000"))  # Số span chờ xuất tối đa, vượt thì bỏ span
+
+    # Giới hạn tần suất cho endpoint ghi công khai, theo IP: "<số request>/<số giây>", để trống là không giới hạn
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" (riêng từng worker) hoặc "postgres" (dùng chung giữa các worker)
+    RATE_LIMIT_CONTACT: str = os.getenv("RATE_LIMIT_CONTACT", "5/600")  # POST /api/contact/submit
+    RATE_LIMIT_ORDERS: str = os.getenv("RATE_LIMIT_ORDERS", "10/600")  # POST /api/orders/
+    RATE_LIMIT_REVIEWS: str = os.getenv("RATE_LIMIT_REVIEWS", "5/600")  # POST /api/services/{id}/reviews
+    RATE_LIMIT_TRUSTED_PROXIES: int = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))  # Số proxy phía trước (nginx...) để lấy IP thật từ X-Forwarded-For
+
     # Upload settings
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "static/uploads")
     
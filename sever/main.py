@@ -1,38 +1,37 @@
-from fastapi import FastAPI, Request, status
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, Request, status, Header, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-import os
-from datetime import datetime
 import uvicorn
-from routers import services, blogs, orders, users, auth, dashboard, contact, config, images
+from routers import services, blogs, orders, users, auth, dashboard, contact, config, images, search
 from middlewares.auth_middleware import get_current_user, get_admin_user, get_root_user
 from middlewares.logging_middleware import AdminLoggingMiddleware
 from fastapi.staticfiles import StaticFiles
-from config.database import engine, Base
+from starlette.concurrency import run_in_threadpool
+from config.database import engine, Base, SessionLocal
 from models import models
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from fastapi_utils.tasks import repeat_every
 from utils.tasks import cleanup_expired_access_logs
+from utils.email import close_smtp_pool
+from utils.email_templates import load_templates
+from utils.async_email import async_mailer
+from utils.digest import admin_digest
+from utils.search_index import build_suggest_index
+from utils.recommendations import recommendation_cache
+from utils.order_events import order_events
+from utils.metrics import MetricsMiddleware, metrics
+from utils.query_profiler import QueryProfilerMiddleware, instrument_engine
+from utils.logging_pipeline import RequestContextMiddleware, setup_logging, shutdown_logging
+from utils.tracing import TracingMiddleware, tracer, instrument_engine as instrument_tracing
+from utils.rate_limit import RateLimitMiddleware, rate_limiter
 from config.settings import settings
 import json
+from typing import Optional
 
-# Tạo thư mục logs nếu chưa tồn tại
-logs_dir = "logs"
-if not os.path.exists(logs_dir):
-    os.makedirs(logs_dir)
-
-# Cấu hình logging
-log_filename = f"logs/app_{datetime.now().strftime('%Y%m%d')}.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(log_filename, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Cấu hình logging: ghi qua hàng đợi, file JSON theo ngày trong thư mục logs
+setup_logging()
 
 logger = logging.getLogger("phulong-api")
 
@@ -48,6 +47,11 @@ app = FastAPI(
     openapi_url=None  # Tắt endpoint OpenAPI mặc định
 )
 
+# Giới hạn tần suất endpoint ghi công khai (form liên hệ, đặt hàng, đánh giá): trả 429 trước khi đọc body
+# hay truy vấn database. Đăng ký trước CORS để response 429 vẫn có header CORS cho trình duyệt đọc được
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -55,11 +59,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Frontend khác origin chỉ đọc được các header được liệt kê ở đây (Retry-After của response 429)
+    expose_headers=["Retry-After"],
 )
 
 # Đăng ký Admin Logging Middleware
 app.add_middleware(AdminLoggingMiddleware)
 
+# Đếm truy vấn SQL của từng request: cảnh báo N+1, header Server-Timing khi DEBUG
+instrument_engine(engine)
+app.add_middleware(QueryProfilerMiddleware)
+
+# Đo thời gian và số câu truy vấn của mọi request, bao ngoài các middleware trên
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Span cho request, truy vấn SQL, lưu file upload và gửi email (TRACING_ENABLED)
+instrument_tracing(engine)
+app.add_middleware(TracingMiddleware)
+
+# Gán request_id cho log của từng request, đăng ký sau cùng để mọi middleware khác đều có request_id
+app.add_middleware(RequestContextMiddleware)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -80,6 +101,7 @@ app.include_router(dashboard.router, tags=["Dashboard"])
 app.include_router(contact.router, prefix="/api/contact", tags=["Contact"])
 app.include_router(config.router, prefix="/api/config", tags=["Configuration"])
 app.include_router(images.router, tags=["Images"])
+app.include_router(search.router, tags=["Search"])
 
 # Phục vụ tệp tĩnh nếu cần (ví dụ: tệp tải lên)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -92,11 +114,97 @@ async def cleanup_logs_task():
     cleanup_expired_access_logs()
     logging.info("Hoàn thành tác vụ xóa log admin hết hạn")
 
+# Biên dịch template email một lần khi khởi động
+@app.on_event("startup")
+async def compile_email_templates():
+    load_templates()
+    await async_mailer.start()
+
+@app.on_event("shutdown")
+async def close_smtp_connections():
+    admin_digest.flush()
+    await async_mailer.stop()
+    close_smtp_pool()
+
+# Nhận sự kiện đơn hàng từ Postgres (LISTEN/NOTIFY) cho luồng SSE /api/orders/events
+@app.on_event("startup")
+async def start_order_events():
+    await order_events.start()
+
+@app.on_event("shutdown")
+async def stop_order_events():
+    await order_events.stop()
+
+# Thread xuất span (chỉ chạy khi TRACING_ENABLED)
+@app.on_event("startup")
+async def start_tracing():
+    tracer.start()
+
+@app.on_event("shutdown")
+async def flush_traces():
+    tracer.stop()
+
+# Chạy sau cùng để ghi hết log của các tác vụ shutdown khác
+@app.on_event("shutdown")
+async def flush_logs():
+    shutdown_logging()
+
+# Xây dựng chỉ mục gợi ý tìm kiếm trong bộ nhớ
+@app.on_event("startup")
+async def load_suggest_index():
+    db = SessionLocal()
+    try:
+        build_suggest_index(db)
+    finally:
+        db.close()
+
+# Nạp bảng gợi ý đã tính sẵn trước khi nhận request, lần tính lại đầu tiên chạy nền bên dưới
+@app.on_event("startup")
+async def load_recommendations():
+    db = SessionLocal()
+    try:
+        recommendation_cache.load(db)
+    except Exception as e:
+        logging.error(f"Lỗi khi nạp gợi ý dịch vụ, dùng dịch vụ nổi bật tới lần tính lại sau: {str(e)}")
+    finally:
+        db.close()
+
+# Tính lại bảng gợi ý dịch vụ liên quan và nạp vào bộ nhớ
+@app.on_event("startup")
+@repeat_every(seconds=settings.RECOMMENDATION_REFRESH_SECONDS)
+async def refresh_recommendations_task():
+    # Truy vấn tính lại chạy vài giây, không được chặn vòng lặp asyncio của worker
+    await run_in_threadpool(recommendation_cache.refresh)
+
+# Gửi email tổng hợp đơn hàng/liên hệ mới cho admin sau mỗi cửa sổ thời gian
+@app.on_event("startup")
+@repeat_every(seconds=max(settings.ADMIN_DIGEST_WINDOW_SECONDS, 60))
+async def send_admin_digest_task():
+    # Dựng email (render template) trong thread pool, đưa vào hàng đợi trên vòng lặp asyncio
+    # vì hàng đợi email bất đồng bộ không an toàn khi gọi từ thread khác
+    email = await run_in_threadpool(admin_digest.build)
+    if email is not None:
+        async_mailer.enqueue(email)
+
+# Dọn bucket giới hạn tần suất đã hồi đầy trong bảng rate_limit_buckets (RATE_LIMIT_BACKEND=postgres)
+@app.on_event("startup")
+@repeat_every(seconds=60 * 60)
+async def prune_rate_limits_task():
+    await run_in_threadpool(rate_limiter.prune)
+
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed")
     return {"message": "Chào mừng đến với API của Phú Long"}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_TOKEN and authorization != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token không hợp lệ")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
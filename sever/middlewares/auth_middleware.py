@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from config.database import get_db
@@ -7,10 +7,16 @@ from models.models import User, UserRole
 from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
+
+# Scope của vé kết nối luồng sự kiện đơn hàng (POST /api/orders/events/ticket)
+ORDER_EVENTS_SCOPE = "order_events"
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    token_data = verify_token(token)
-    user = db.query(User).filter(User.username == token_data.username).first()
+    return _load_user(verify_token(token).username, db)
+
+def _load_user(username: str, db: Session) -> User:
+    user = db.query(User).filter(User.username == username).first()
     
     if not user:
         raise HTTPException(
@@ -40,4 +46,23 @@ def get_root_user(current_user: User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized. Root role required."
         )
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+def get_admin_user_header_or_ticket(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    ticket: Optional[str] = Query(None, description="Vé từ POST /api/orders/events/ticket khi không gửi được header (EventSource)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Admin qua header Authorization hoặc vé ngắn hạn trong query string. Không nhận access token trong
+    query string: URL bị ghi vào access log, log của proxy và lịch sử trình duyệt.
+    """
+    if header_token:
+        return get_admin_user(get_current_user(header_token, db))
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_admin_user(_load_user(verify_token(ticket, ORDER_EVENTS_SCOPE).username, db))
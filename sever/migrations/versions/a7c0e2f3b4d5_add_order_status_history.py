@@ -0,0 +1,57 @@
+"""add order status history and sla stats
+
+Revision ID: a7c0e2f3b4d5
+Revises: f6b9d1e2a3c4
+Create Date: 2025-07-13 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c0e2f3b4d5'
+down_revision: Union[str, None] = 'f6b9d1e2a3c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('status_changed_at', sa.DateTime(), nullable=True))
+    # Đơn hàng cũ: lần sửa gần nhất là lần đổi trạng thái gần nhất
+    op.execute("UPDATE orders SET status_changed_at = coalesce(updated_at, created_at)")
+
+    op.create_table(
+        'order_status_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=True),
+        sa.Column('from_status', sa.String(), nullable=True),
+        sa.Column('to_status', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_status_events_order_id_id', 'order_status_events', ['order_id', 'id'])
+
+    op.create_table(
+        'order_status_stats',
+        sa.Column('service_id', sa.Integer(), sa.ForeignKey('services.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('stage', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('max_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('service_id', 'stage')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('order_status_stats')
+    op.drop_index('ix_order_status_events_order_id_id', table_name='order_status_events')
+    op.drop_table('order_status_events')
+    op.drop_column('orders', 'status_changed_at')
@@ -0,0 +1,53 @@
+"""add composite and partial indexes for list filters
+
+Revision ID: a9c4e6f7b8d1
+Revises: f8b3d4e5a6c7
+Create Date: 2025-07-05 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e6f7b8d1'
+down_revision: Union[str, None] = 'f8b3d4e5a6c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên index, bảng, cột, điều kiện partial index)
+INDEXES = [
+    ('ix_orders_created_at', 'orders', ['created_at'], None),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at'], None),
+    ('ix_orders_service_id_created_at', 'orders', ['service_id', 'created_at'], None),
+    ('ix_services_is_active_featured', 'services', ['is_active', 'featured'], None),
+    ('ix_services_category_is_active', 'services', ['category', 'is_active'], None),
+    ('ix_blogs_created_at', 'blogs', ['created_at'], None),
+    ('ix_blogs_active_created_at', 'blogs', ['created_at'], 'is_active'),
+    ('ix_blogs_category_created_at', 'blogs', ['category', 'created_at'], None),
+    ('ix_service_reviews_service_id_created_at', 'service_reviews', ['service_id', 'created_at'], None),
+    ('ix_images_created_at', 'images', ['created_at'], None),
+    ('ix_images_visible_created_at', 'images', ['created_at'], 'is_visible'),
+    ('ix_images_category_created_at', 'images', ['category', 'created_at'], None),
+    ('ix_admin_access_logs_timestamp', 'admin_access_logs', ['timestamp'], None),
+    ('ix_admin_access_logs_user_id_timestamp', 'admin_access_logs', ['user_id', 'timestamp'], None),
+    ('ix_admin_access_logs_expires_at', 'admin_access_logs', ['expires_at'], None),
+    ('ix_login_history_login_time', 'login_history', ['login_time'], None),
+    ('ix_contacts_created_at', 'contacts', ['created_at'], None),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY để không khóa ghi trên bảng lớn, phải chạy ngoài transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True,
+                            postgresql_where=sa.text(where) if where else None)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
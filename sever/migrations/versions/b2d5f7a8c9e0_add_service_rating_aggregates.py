@@ -0,0 +1,55 @@
+"""add rating aggregates to services
+
+Revision ID: b2d5f7a8c9e0
+Revises: a9c4e6f7b8d1
+Create Date: 2025-07-07 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d5f7a8c9e0'
+down_revision: Union[str, None] = 'a9c4e6f7b8d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATING_COLUMNS = ['rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade() -> None:
+    for column in RATING_COLUMNS:
+        op.add_column('services', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+    # Tính lại từ các đánh giá đã có
+    op.execute("""
+        UPDATE services s
+        SET rating_count = r.count,
+            rating_sum = r.sum,
+            rating_1 = r.r1,
+            rating_2 = r.r2,
+            rating_3 = r.r3,
+            rating_4 = r.r4,
+            rating_5 = r.r5
+        FROM (
+            SELECT service_id,
+                   count(*) AS count,
+                   sum(rating) AS sum,
+                   count(*) FILTER (WHERE rating = 1) AS r1,
+                   count(*) FILTER (WHERE rating = 2) AS r2,
+                   count(*) FILTER (WHERE rating = 3) AS r3,
+                   count(*) FILTER (WHERE rating = 4) AS r4,
+                   count(*) FILTER (WHERE rating = 5) AS r5
+            FROM service_reviews
+            GROUP BY service_id
+        ) r
+        WHERE s.id = r.service_id
+    """)
+
+
+def downgrade() -> None:
+    for column in reversed(RATING_COLUMNS):
+        op.drop_column('services', column)
@@ -0,0 +1,35 @@
+"""add service recommendations table
+
+Revision ID: c3e6a8b9d0f1
+Revises: b2d5f7a8c9e0
+Create Date: 2025-07-08 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e6a8b9d0f1'
+down_revision: Union[str, None] = 'b2d5f7a8c9e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'service_recommendations',
+        sa.Column('service_id', sa.Integer(), sa.ForeignKey('services.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('recommended_id', sa.Integer(), sa.ForeignKey('services.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('service_id', 'position')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('service_recommendations')
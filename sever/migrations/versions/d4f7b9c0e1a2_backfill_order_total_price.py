@@ -0,0 +1,33 @@
+"""backfill order total price
+
+Revision ID: d4f7b9c0e1a2
+Revises: c3e6a8b9d0f1
+Create Date: 2025-07-10 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b9c0e1a2'
+down_revision: Union[str, None] = 'c3e6a8b9d0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Đơn hàng cũ chưa có thành tiền: tính theo giá hiện tại của dịch vụ x số lượng
+    # (không áp dụng hệ số kích thước/chất liệu vì cấu hình nằm trong .env của ứng dụng)
+    op.execute("""
+        UPDATE orders o
+        SET total_price = o.quantity * s.price
+        FROM services s
+        WHERE s.id = o.service_id AND o.total_price IS NULL AND o.quantity IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    # Không thể phân biệt thành tiền được điền bởi migration với thành tiền tính khi tạo đơn
+    pass
@@ -0,0 +1,27 @@
+"""add order event sequence
+
+Revision ID: e5a8c0d1f2b3
+Revises: d4f7b9c0e1a2
+Create Date: 2025-07-11 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c0d1f2b3'
+down_revision: Union[str, None] = 'd4f7b9c0e1a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Mã sự kiện của luồng SSE /api/orders/events, dùng chung giữa các worker
+    op.execute(sa.schema.CreateSequence(sa.Sequence('order_event_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('order_event_seq')))
@@ -0,0 +1,61 @@
+"""add full-text search to services and blogs
+
+Revision ID: e7a1c2d3f4b5
+Revises: d6e9f8b53c1a
+Create Date: 2025-07-01 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1c2d3f4b5'
+down_revision: Union[str, None] = 'd6e9f8b53c1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SERVICE_SEARCH_EXPR = (
+    "setweight(to_tsvector('vietnamese_unaccent', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('vietnamese_unaccent', coalesce(description, '')), 'B')"
+)
+BLOG_SEARCH_EXPR = (
+    "setweight(to_tsvector('vietnamese_unaccent', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('vietnamese_unaccent', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # Cấu hình tìm kiếm bỏ dấu tiếng Việt: "in ấn" khớp với "in an"
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'vietnamese_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION vietnamese_unaccent (COPY = simple);
+                ALTER TEXT SEARCH CONFIGURATION vietnamese_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+            END IF;
+        END
+        $$;
+    """)
+
+    # Cột tsvector được Postgres tự tính khi ghi (generated column) + GIN index
+    op.add_column('services', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                        sa.Computed(SERVICE_SEARCH_EXPR, persisted=True), nullable=True))
+    op.create_index('ix_services_search_vector', 'services', ['search_vector'], postgresql_using='gin')
+
+    op.add_column('blogs', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                     sa.Computed(BLOG_SEARCH_EXPR, persisted=True), nullable=True))
+    op.create_index('ix_blogs_search_vector', 'blogs', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blogs_search_vector', table_name='blogs')
+    op.drop_column('blogs', 'search_vector')
+    op.drop_index('ix_services_search_vector', table_name='services')
+    op.drop_column('services', 'search_vector')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS vietnamese_unaccent")
@@ -0,0 +1,26 @@
+"""add order version
+
+Revision ID: f6b9d1e2a3c4
+Revises: e5a8c0d1f2b3
+Create Date: 2025-07-12 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b9d1e2a3c4'
+down_revision: Union[str, None] = 'e5a8c0d1f2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('orders', 'version')
@@ -0,0 +1,43 @@
+"""add trigram search indexes to orders
+
+Revision ID: f8b3d4e5a6c7
+Revises: e7a1c2d3f4b5
+Create Date: 2025-07-03 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8b3d4e5a6c7'
+down_revision: Union[str, None] = 'e7a1c2d3f4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Chỉ giữ chữ số, đổi đầu số 84 (+84) thành 0: "+84 977-007-763" -> "0977007763"
+PHONE_NORMALIZED_EXPR = "regexp_replace(regexp_replace(coalesce(customer_phone, ''), '[^0-9]', '', 'g'), '^84', '0')"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('orders', sa.Column('customer_phone_normalized', sa.String(),
+                                      sa.Computed(PHONE_NORMALIZED_EXPR, persisted=True), nullable=True))
+
+    # GIN trigram index phục vụ cả ILIKE '%x%' lẫn tìm kiếm gần đúng (similarity)
+    op.create_index('ix_orders_customer_name_trgm', 'orders', ['customer_name'],
+                    postgresql_using='gin', postgresql_ops={'customer_name': 'gin_trgm_ops'})
+    op.create_index('ix_orders_customer_email_trgm', 'orders', ['customer_email'],
+                    postgresql_using='gin', postgresql_ops={'customer_email': 'gin_trgm_ops'})
+    op.create_index('ix_orders_customer_phone_trgm', 'orders', ['customer_phone_normalized'],
+                    postgresql_using='gin', postgresql_ops={'customer_phone_normalized': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_customer_phone_trgm', table_name='orders')
+    op.drop_index('ix_orders_customer_email_trgm', table_name='orders')
+    op.drop_index('ix_orders_customer_name_trgm', table_name='orders')
+    op.drop_column('orders', 'customer_phone_normalized')
@@ -1,9 +1,35 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Enum, Computed, Index, DDL, Sequence, event, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import enum
 from config.database import Base
 
+# Cấu hình full-text search bỏ dấu tiếng Việt, cần có trước khi tạo cột search_vector
+SEARCH_CONFIG = "vietnamese_unaccent"
+
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+event.listen(Base.metadata, "before_create", DDL(f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+            CREATE EXTENSION IF NOT EXISTS unaccent;
+            CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = simple);
+            ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+        END IF;
+    END
+    $$;
+"""))
+
+def _search_vector(title_column: str, body_column: str):
+    """Cột tsvector do Postgres tự tính: tiêu đề trọng số A, nội dung trọng số B"""
+    return deferred(Column(TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({title_column}, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({body_column}, '')), 'B')",
+        persisted=True
+    )))
+
 class UserRole(str, enum.Enum):
     ROOT = "root"
     ADMIN = "admin"
@@ -33,6 +59,10 @@ class LoginHistory(Base):
     ip_address = Column(String)
     user_agent = Column(String)
     
+    __table_args__ = (
+        Index("ix_login_history_login_time", "login_time"),
+    )
+    
     # Relationship
     user = relationship("User", back_populates="login_history")
 
@@ -48,6 +78,13 @@ class AdminAccessLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, default=lambda: datetime.utcnow().replace(month=datetime.utcnow().month + 3 if datetime.utcnow().month <= 9 else datetime.utcnow().month - 9, year=datetime.utcnow().year if datetime.utcnow().month <= 9 else datetime.utcnow().year + 1))
     
+    __table_args__ = (
+        # Danh sách log sắp theo thời gian, lọc theo user; dọn log hết hạn theo expires_at
+        Index("ix_admin_access_logs_timestamp", "timestamp"),
+        Index("ix_admin_access_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_admin_access_logs_expires_at", "expires_at"),
+    )
+    
     # Relationship
     user = relationship("User", back_populates="access_logs")
 
@@ -64,10 +101,37 @@ class Service(Base):
     featured = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    search_vector = _search_vector("name", "description")
+    # Tổng hợp đánh giá, cập nhật cùng transaction khi thêm đánh giá mới
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    __table_args__ = (
+        Index("ix_services_search_vector", "search_vector", postgresql_using="gin"),
+        # Lọc dịch vụ nổi bật/đang hoạt động và lọc theo danh mục
+        Index("ix_services_is_active_featured", "is_active", "featured"),
+        Index("ix_services_category_is_active", "category", "is_active"),
+    )
     
     # Relationship
     orders = relationship("Order", back_populates="service")
     reviews = relationship("ServiceReview", back_populates="service", cascade="all, delete-orphan")
+    
+    @property
+    def rating_average(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+    
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}") or 0 for star in range(1, 6)}
+
 
 class Blog(Base):
     __tablename__ = "blogs"
@@ -80,6 +144,15 @@ class Blog(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    search_vector = _search_vector("title", "content")
+    
+    __table_args__ = (
+        Index("ix_blogs_search_vector", "search_vector", postgresql_using="gin"),
+        # Danh sách bài viết sắp theo created_at: trang công khai chỉ đọc bài đang hoạt động
+        Index("ix_blogs_created_at", "created_at"),
+        Index("ix_blogs_active_created_at", "created_at", postgresql_where=text("is_active")),
+        Index("ix_blogs_category_created_at", "category", "created_at"),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -96,12 +169,70 @@ class Order(Base):
     notes = Column(Text, nullable=True)
     total_price = Column(Float, nullable=True)
     status = Column(String, default="pending")  # pending, processing, completed, cancelled
+    # Tăng mỗi lần đổi trạng thái, dùng để phát hiện cập nhật đồng thời
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Thời điểm chuyển sang trạng thái hiện tại, dùng để tính thời gian ở mỗi trạng thái
+    status_changed_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Số điện thoại chỉ còn chữ số, đầu số 84 đổi thành 0 (Postgres tự tính)
+    customer_phone_normalized = deferred(Column(String, Computed(
+        "regexp_replace(regexp_replace(coalesce(customer_phone, ''), '[^0-9]', '', 'g'), '^84', '0')",
+        persisted=True
+    )))
+    
+    __table_args__ = (
+        # GIN trigram index cho tìm kiếm khách hàng (ILIKE và gần đúng)
+        Index("ix_orders_customer_name_trgm", "customer_name", postgresql_using="gin",
+              postgresql_ops={"customer_name": "gin_trgm_ops"}),
+        Index("ix_orders_customer_email_trgm", "customer_email", postgresql_using="gin",
+              postgresql_ops={"customer_email": "gin_trgm_ops"}),
+        Index("ix_orders_customer_phone_trgm", "customer_phone_normalized", postgresql_using="gin",
+              postgresql_ops={"customer_phone_normalized": "gin_trgm_ops"}),
+        # Danh sách đơn hàng sắp theo created_at, lọc theo trạng thái hoặc dịch vụ
+        Index("ix_orders_created_at", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_service_id_created_at", "service_id", "created_at"),
+    )
     
     # Relationship
     service = relationship("Service", back_populates="orders")
 
+class OrderStatusEvent(Base):
+    """Lịch sử trạng thái đơn hàng, chỉ thêm mới, ghi cùng transaction với thay đổi (utils/order_status.py)"""
+    __tablename__ = "order_status_events"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    service_id = Column(Integer, nullable=True)
+    from_status = Column(String, nullable=True)  # None khi đơn hàng được tạo
+    to_status = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)  # Phiên bản đơn hàng sau thay đổi
+    duration_seconds = Column(Float, nullable=True)  # Thời gian đã ở trạng thái from_status
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_order_status_events_order_id_id", "order_id", "id"),
+    )
+
+class OrderStatusStat(Base):
+    """
+    Thống kê SLA theo dịch vụ, cộng dồn mỗi lần đổi trạng thái nên không phải quét lịch sử.
+    stage là trạng thái đã rời đi (thời gian ở trạng thái đó) hoặc "lead_time" (từ lúc tạo đến khi hoàn thành).
+    """
+    __tablename__ = "order_status_stats"
+
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    max_seconds = Column(Float, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Mã sự kiện đơn hàng cho luồng SSE /api/orders/events, giống nhau trên mọi worker
+order_event_seq = Sequence("order_event_seq", metadata=Base.metadata)
+
 class ServiceReview(Base):
     __tablename__ = "service_reviews"
 
@@ -113,9 +244,38 @@ class ServiceReview(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_service_reviews_service_id_created_at", "service_id", "created_at"),
+    )
+
     # Relationship
     service = relationship("Service", back_populates="reviews") 
 
+class ServiceRecommendation(Base):
+    """Dịch vụ gợi ý cho từng dịch vụ, được tính lại định kỳ (utils/recommendations.py)"""
+    __tablename__ = "service_recommendations"
+
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    recommended_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), nullable=False)
+    reason = Column(String, nullable=False)  # co_ordered, same_category, featured, active
+    score = Column(Float, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class RateLimitBucket(Base):
+    """
+    Bucket giới hạn tần suất dùng chung giữa các worker (RATE_LIMIT_BACKEND=postgres, utils/rate_limit.py).
+    UNLOGGED: không ghi WAL, mất dữ liệu khi Postgres khởi động lại cũng không sao (bucket đầy lại từ đầu).
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)  # <route>:<ip>
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False)  # Lần kiểm tra gần nhất có được phép không
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
 class Contact(Base):
     __tablename__ = "contacts"
     
@@ -127,6 +287,10 @@ class Contact(Base):
     message = Column(Text, nullable=False)
     status = Column(String, default="new")  # new, read
     created_at = Column(DateTime, default=datetime.utcnow) 
+    
+    __table_args__ = (
+        Index("ix_contacts_created_at", "created_at"),
+    )
 
 class Image(Base):
     __tablename__ = "images"
@@ -146,5 +310,12 @@ class Image(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Thư viện ảnh sắp theo created_at: trang công khai chỉ đọc ảnh đang hiển thị
+        Index("ix_images_created_at", "created_at"),
+        Index("ix_images_visible_created_at", "created_at", postgresql_where=text("is_visible")),
+        Index("ix_images_category_created_at", "category", "created_at"),
+    )
+    
     # Relationship
     uploader = relationship("User", backref="uploaded_images") 
\ No newline at end of file
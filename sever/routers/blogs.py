@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from config.database import get_db
-from schemas.schemas import BlogCreate, BlogOut, BlogUpdate
+from schemas.schemas import (BlogCreate, BlogOut, BlogUpdate, BlogBulkCreate, BlogBulkUpdate,
+                             BulkDelete, BulkResult, BulkItemStatus)
 from models.models import Blog, User
 from middlewares.auth_middleware import get_current_user, get_admin_user
+from utils.search_index import suggest_index
+from utils.bulk import bulk_create, bulk_update, bulk_delete, bulk_result
 
 router = APIRouter(prefix="/api/blogs", tags=["Blogs"])
 
@@ -21,6 +24,43 @@ async def get_blogs(db: Session = Depends(get_db), skip: int = 0, limit: int = 1
     blogs = query.order_by(Blog.created_at.desc()).offset(skip).limit(limit).all()
     return blogs
 
+# Các endpoint hàng loạt phải khai báo trước /{blog_id} để "bulk" không bị hiểu là ID
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_blogs(payload: BlogBulkCreate, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Tạo nhiều bài viết trong một transaction, kết quả trả về theo thứ tự gửi lên"""
+    ids = bulk_create(db, Blog, payload.items)
+    db.commit()
+    
+    for blog_id, item in zip(ids, payload.items):
+        suggest_index.upsert("blog", blog_id, item.title, item.category, item.is_active)
+    return bulk_result([
+        {"index": index, "id": blog_id, "status": BulkItemStatus.CREATED}
+        for index, blog_id in enumerate(ids)
+    ])
+
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_blogs(payload: BlogBulkUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Cập nhật nhiều bài viết trong một transaction, ID không tồn tại được báo trong kết quả"""
+    results = bulk_update(db, Blog, payload.items)
+    db.commit()
+    
+    updated_ids = [item["id"] for item in results if item["status"] == BulkItemStatus.UPDATED]
+    if updated_ids:
+        for row in db.query(Blog.id, Blog.title, Blog.category, Blog.is_active).filter(Blog.id.in_(updated_ids)):
+            suggest_index.upsert("blog", row.id, row.title, row.category, row.is_active)
+    return bulk_result(results)
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_blogs(payload: BulkDelete, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Xóa nhiều bài viết trong một transaction"""
+    results = bulk_delete(db, Blog, payload.ids)
+    db.commit()
+    
+    for item in results:
+        if item["status"] == BulkItemStatus.DELETED:
+            suggest_index.remove("blog", item["id"])
+    return bulk_result(results)
+
 @router.get("/{blog_id}", response_model=BlogOut)
 async def get_blog(blog_id: int, db: Session = Depends(get_db)):
     blog = db.query(Blog).filter(Blog.id == blog_id).first()
@@ -46,6 +86,7 @@ async def create_blog(blog: BlogCreate, db: Session = Depends(get_db), current_u
     db.add(new_blog)
     db.commit()
     db.refresh(new_blog)
+    suggest_index.upsert("blog", new_blog.id, new_blog.title, new_blog.category, new_blog.is_active)
     
     return new_blog
 
@@ -78,6 +119,7 @@ async def update_blog(
     
     db.commit()
     db.refresh(db_blog)
+    suggest_index.upsert("blog", db_blog.id, db_blog.title, db_blog.category, db_blog.is_active)
     
     return db_blog
 
@@ -93,5 +135,6 @@ async def delete_blog(blog_id: int, db: Session = Depends(get_db), current_user:
     
     db.delete(db_blog)
     db.commit()
+    suggest_index.remove("blog", blog_id)
     
     return None 
\ No newline at end of file
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
 from config.database import get_db
-from utils.email import send_email
+from utils.digest import admin_digest
 from models.models import Contact
 import schemas.contact
 from middlewares.auth_middleware import get_admin_user
@@ -14,7 +14,6 @@ router = APIRouter()
 @router.post("/submit", response_model=schemas.contact.ContactResponse)
 async def submit_contact(
     contact: schemas.contact.ContactCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -34,50 +33,19 @@ async def submit_contact(
     db.commit()
     db.refresh(db_contact)
     
-    # Gửi email thông báo trong background
-    email_subject = f"Liên hệ mới từ: {contact.name}"
-    email_body = f"""
-    <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; }}
-                .container {{ width: 100%; max-width: 600px; margin: 0 auto; }}
-                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; }}
-                .info-item {{ margin-bottom: 10px; }}
-                .message-box {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-top: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>Thông tin liên hệ mới</h2>
-                </div>
-                <div class="content">
-                    <div class="info-item"><strong>Họ tên:</strong> {contact.name}</div>
-                    <div class="info-item"><strong>Email:</strong> {contact.email}</div>
-                    <div class="info-item"><strong>Số điện thoại:</strong> {contact.phone}</div>
-                    <div class="info-item"><strong>Tiêu đề:</strong> {contact.subject}</div>
-                    <div class="info-item"><strong>Thời gian:</strong> {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</div>
-                    
-                    <div class="message-box">
-                        <h3>Nội dung tin nhắn:</h3>
-                        <p>{contact.message}</p>
-                    </div>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
+    # Thông tin cho email thông báo admin
+    email_context = {
+        "name": contact.name,
+        "email": contact.email,
+        "phone": contact.phone,
+        "subject": contact.subject,
+        "message": contact.message,
+        "submitted_at": datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+    }
     
-    # Thực hiện gửi email trong background
-    admin_email = "admin@phulong.com"  # Thay email người nhận thực tế vào đây
-    background_tasks.add_task(
-        send_email,
-        admin_email,  # to_email
-        email_subject,  # subject
-        email_body  # html_content
-    )
+    # Thông báo admin: gộp vào email tổng hợp định kỳ, liên hệ khẩn được gửi ngay
+    # qua hàng đợi email bất đồng bộ (không chiếm thread của threadpool)
+    admin_digest.add_contact(email_context)
     
     return {
         "id": db_contact.id,
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, cast, Integer
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from config.database import get_db
-from models.models import User, Order, Service
+from models.models import User, Order, OrderStatusStat, Service
+from schemas.schemas import OrderStageStat
 from middlewares.auth_middleware import get_admin_user, get_current_user
 from datetime import datetime, timedelta
 
@@ -23,9 +25,8 @@ async def get_dashboard_summary(current_user: User = Depends(get_admin_user), db
     # Số lượng khách hàng (ước tính qua email)
     customers_count = db.query(Order.customer_email).distinct().count()
     
-    # Ước tính doanh thu (chưa có trường giá trong order nên tạm tính giá trung bình)
-    avg_service_price = 500000  # Giá trung bình ước tính
-    revenue = db.query(Order).filter(Order.status.in_(["completed"])).count() * avg_service_price
+    # Doanh thu thực tế từ thành tiền của các đơn hàng đã hoàn thành
+    revenue = db.query(func.coalesce(func.sum(Order.total_price), 0)).filter(Order.status == "completed").scalar()
     
     return {
         "new_orders": new_orders_count,
@@ -39,32 +40,24 @@ async def get_revenue_by_date(current_user: User = Depends(get_admin_user), db:
     """
     Trả về dữ liệu doanh thu theo ngày cho biểu đồ
     """
-    # Tính doanh thu 7 ngày gần nhất
+    # Doanh thu 7 ngày gần nhất, mỗi ngày là 24 giờ tính lùi từ hiện tại, nhãn là ngày bắt đầu của khoảng đó.
+    # Cộng trong một câu truy vấn; created_at lưu giờ UTC nên mốc thời gian cũng tính theo UTC.
+    now = datetime.utcnow()
+    # 0: 24 giờ vừa qua, 6: từ 7 ngày trước tới 6 ngày trước
+    days_ago = cast(func.floor(func.extract("epoch", now - Order.created_at) / 86400), Integer)
+    rows = db.query(days_ago, func.sum(Order.total_price)).filter(
+        Order.status == "completed",
+        Order.created_at >= now - timedelta(days=7),
+        Order.created_at < now
+    ).group_by(days_ago).all()
+    revenue_by_day = {row[0]: row[1] or 0 for row in rows}
+    
     labels = []
     values = []
-    
-    # Giá trung bình ước tính
-    avg_service_price = 500000
-    
-    # Lấy 7 ngày gần nhất
     for i in range(7, 0, -1):
-        date = datetime.now() - timedelta(days=i)
-        next_date = datetime.now() - timedelta(days=i-1)
-        
-        # Format ngày
-        date_label = date.strftime("%d/%m")
-        labels.append(date_label)
-        
-        # Đếm đơn hàng hoàn thành trong ngày
-        completed_orders = db.query(Order).filter(
-            Order.status == "completed",
-            Order.created_at >= date,
-            Order.created_at < next_date
-        ).count()
-        
-        # Tính doanh thu (đơn vị: triệu VNĐ)
-        revenue = completed_orders * avg_service_price / 1000000
-        values.append(revenue)
+        labels.append((datetime.now() - timedelta(days=i)).strftime("%d/%m"))
+        # Đơn vị: triệu VNĐ
+        values.append(revenue_by_day.get(i - 1, 0) / 1000000)
     
     return {
         "labels": labels,
@@ -77,17 +70,36 @@ async def get_orders_by_service(current_user: User = Depends(get_admin_user), db
     Trả về dữ liệu số đơn hàng theo dịch vụ cho biểu đồ
     """
     # Lấy 5 dịch vụ có nhiều đơn hàng nhất
-    services = db.query(Service).limit(5).all()
-    
-    labels = []
-    values = []
-    
-    for service in services:
-        labels.append(service.name)
-        orders_count = db.query(Order).filter(Order.service_id == service.id).count()
-        values.append(orders_count)
+    orders_count = func.count(Order.id)
+    rows = db.query(Service.name, orders_count).join(Order, Order.service_id == Service.id).group_by(
+        Service.id, Service.name
+    ).order_by(orders_count.desc(), Service.id).limit(5).all()
     
     return {
-        "labels": labels,
-        "values": values
-    } 
\ No newline at end of file
+        "labels": [row[0] for row in rows],
+        "values": [row[1] for row in rows]
+    }
+
+@router.get("/order-sla", response_model=List[OrderStageStat])
+async def get_order_sla(
+    service_id: Optional[int] = None,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Thời gian xử lý đơn hàng theo dịch vụ: thời gian trung bình/lâu nhất ở mỗi trạng thái
+    và từ lúc tạo đến khi hoàn thành (stage = lead_time). Đọc từ bảng cộng dồn, không quét lịch sử.
+    """
+    query = db.query(OrderStatusStat, Service.name).join(Service, Service.id == OrderStatusStat.service_id)
+    if service_id:
+        query = query.filter(OrderStatusStat.service_id == service_id)
+    rows = query.order_by(OrderStatusStat.service_id, OrderStatusStat.stage).all()
+    
+    return [{
+        "service_id": stat.service_id,
+        "service_name": name,
+        "stage": stat.stage,
+        "count": stat.count,
+        "avg_seconds": stat.total_seconds / stat.count if stat.count else 0,
+        "max_seconds": stat.max_seconds
+    } for stat, name in rows]
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, File, Uplo
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import logging
 import os
 import uuid
 from datetime import datetime
@@ -10,9 +11,13 @@ from PIL import Image as PILImage
 from pathlib import Path
 
 from config.database import get_db
-from schemas.schemas import ImageOut, ImageCreate, ImageUpdate, ImageUploadResponse
+from schemas.schemas import (ImageOut, ImageCreate, ImageUpdate, ImageUploadResponse, ImageBulkUpdate,
+                             BulkDelete, BulkResult, BulkItemStatus)
 from models.models import Image, User
 from middlewares.auth_middleware import get_current_user, get_admin_user
+from utils.bulk import bulk_update, bulk_delete, bulk_result
+from utils.eager_loading import eager_load
+from utils.tracing import tracer
 
 router = APIRouter(prefix="/api/images", tags=["Images"])
 
@@ -93,8 +98,9 @@ async def upload_image(
     
     # Lưu file
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        with tracer.span("upload.save", {"file.path": file_path, "file.size": len(file_content)}):
+            with open(file_path, "wb") as buffer:
+                buffer.write(file_content)
         
         # Lấy thông tin ảnh
         image_info = get_image_info(file_path)
@@ -150,7 +156,7 @@ async def get_images(
     - skip: Số lượng bản ghi bỏ qua (phân trang)
     - limit: Số lượng bản ghi tối đa trả về
     """
-    query = db.query(Image)
+    query = eager_load(db.query(Image), ImageOut)
     
     if is_visible is not None:
         query = query.filter(Image.is_visible == is_visible)
@@ -161,10 +167,48 @@ async def get_images(
     images = query.order_by(Image.created_at.desc()).offset(skip).limit(limit).all()
     return images
 
+# Các endpoint hàng loạt phải khai báo trước /{image_id} để "bulk" không bị hiểu là ID
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_images(
+    payload: ImageBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Cập nhật alt_text, is_visible, category cho nhiều ảnh trong một transaction
+    - ID không tồn tại được báo trong kết quả, các ảnh khác vẫn được cập nhật
+    """
+    results = bulk_update(db, Image, payload.items)
+    db.commit()
+    return bulk_result(results)
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_images(
+    payload: BulkDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Xóa nhiều ảnh trong một transaction
+    - File vật lý chỉ bị xóa sau khi transaction thành công
+    """
+    file_paths = dict(db.query(Image.id, Image.file_path).filter(Image.id.in_(payload.ids)).all())
+    results = bulk_delete(db, Image, payload.ids)
+    db.commit()
+    
+    for item in results:
+        if item["status"] == BulkItemStatus.DELETED:
+            try:
+                if os.path.exists(file_paths[item["id"]]):
+                    os.remove(file_paths[item["id"]])
+            except Exception as e:
+                logging.warning(f"Lỗi khi xóa file ảnh {file_paths[item['id']]}: {e}")
+    return bulk_result(results)
+
 @router.get("/{image_id}", response_model=ImageOut)
 async def get_image(image_id: int, db: Session = Depends(get_db)):
     """Lấy thông tin chi tiết một ảnh"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = eager_load(db.query(Image), ImageOut).filter(Image.id == image_id).first()
     
     if not image:
         raise HTTPException(
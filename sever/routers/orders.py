@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Header
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session, contains_eager
 from typing import List, Optional
 import pandas as pd
 import os
 import shutil
 from datetime import datetime, date
 from config.database import get_db
-from schemas.schemas import OrderCreate, OrderOut, OrderUpdate, PaginatedResponse
-from models.models import Order, Service, User
-from middlewares.auth_middleware import get_current_user, get_admin_user
+from schemas.schemas import (OrderCreate, OrderOut, OrderUpdate, PaginatedResponse, ImportResult, OrderQuoteRequest, OrderQuote,
+                             OrderBulkStatusUpdate, BulkResult, OrderTimeline)
+from models.models import Order, OrderStatusEvent, Service, User
+from middlewares.auth_middleware import (get_current_user, get_admin_user, get_admin_user_header_or_ticket,
+                                        ORDER_EVENTS_SCOPE)
+from utils.jwt import create_ticket
 from utils.email import send_order_confirmation
+from utils.digest import admin_digest
+from utils.importer import import_orders
+from utils.pricing import pricing_engine
+from utils.order_events import order_events, publish_order_event, publish_order_events, order_event_data
+from utils.order_status import change_order_status, bulk_change_status, record_order_created
+from utils.bulk import bulk_result
+from utils.eager_loading import eager_load
+from utils.tracing import tracer
 from config.settings import settings
 import logging
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, literal
+import re
 
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
@@ -59,8 +71,11 @@ async def create_order(
             logging.info(f"Lưu file thiết kế: {filename}")
             
             # Lưu file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(design_file.file, buffer)
+            with tracer.span("upload.save", {"file.path": file_path}) as span:
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(design_file.file, buffer)
+                    if span is not None:
+                        span.set_attribute("file.size", buffer.tell())
             
             design_file_url = f"/static/uploads/{filename}"
             logging.info(f"Đã lưu file thiết kế thành công: {design_file_url}")
@@ -75,11 +90,16 @@ async def create_order(
             size=size,
             material=material,
             notes=notes,
-            design_file_url=design_file_url
+            design_file_url=design_file_url,
+            # Tính theo giá dịch vụ vừa đọc từ database, không dùng bảng giá trong bộ nhớ
+            total_price=pricing_engine.total_price(service.price, quantity, size, material)
         )
         
         logging.info(f"Lưu đơn hàng mới vào database")
         db.add(new_order)
+        db.flush()
+        record_order_created(db, new_order)
+        publish_order_event(db, "order_created", new_order)
         db.commit()
         db.refresh(new_order)
         logging.info(f"Đã tạo đơn hàng mới thành công, ID: {new_order.id}")
@@ -95,6 +115,12 @@ async def create_order(
         except Exception as e:
             logging.error(f"Lỗi khi gửi email xác nhận đơn hàng #{new_order.id}: {str(e)}")
         
+        # Thông báo admin: gộp vào email tổng hợp, đơn khẩn được gửi ngay
+        try:
+            admin_digest.add_order(new_order, service)
+        except Exception as e:
+            logging.error(f"Lỗi khi thông báo admin đơn hàng #{new_order.id}: {str(e)}")
+        
         return new_order
     except HTTPException:
         # Re-raise HTTP exceptions để FastAPI xử lý
@@ -108,24 +134,91 @@ async def create_order(
             detail=error_msg
         )
 
-@router.get("/")
-async def get_orders(
+@router.post("/quote", response_model=OrderQuote)
+async def quote_order(request: OrderQuoteRequest, db: Session = Depends(get_db)):
+    """Báo giá trước khi đặt hàng, cùng cách tính với total_price của đơn hàng"""
+    quote = pricing_engine.quote(db, request.service_id, request.quantity, request.size, request.material)
+    if quote is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dịch vụ với ID {request.service_id} không tồn tại hoặc chưa có giá"
+        )
+    return quote
+
+# Khai báo không async để việc đọc file và COPY chạy trong threadpool, không chặn event loop
+@router.post("/import", response_model=ImportResult)
+def import_orders_file(
+    file: UploadFile = File(..., description="File .csv hoặc .xlsx, dòng đầu là tiêu đề cột"),
+    dry_run: bool = Query(False, description="Chỉ kiểm tra và trả về báo cáo lỗi, không ghi vào database"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_admin_user),
-    skip: int = 0,
-    limit: int = 100,
-    customer_name: Optional[str] = None,
-    service_id: Optional[int] = None,
-    status: Optional[str] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    current_user: User = Depends(get_admin_user)
 ):
-    # Xây dựng query
-    query = db.query(Order).join(Service, Order.service_id == Service.id, isouter=True)
+    """
+    Nhập đơn hàng ngoại tuyến từ file. Cột giống OrderCreate (hoặc tiêu đề của file xuất CSV),
+    thêm cột status và created_at nếu có. Không gửi email xác nhận cho đơn hàng được nhập.
+    """
+    report = import_orders(db, file, current_user.id)
+    if dry_run:
+        db.rollback()
+        return report.as_dict(dry_run=True)
     
-    # Áp dụng các bộ lọc
-    if customer_name:
-        query = query.filter(Order.customer_name.ilike(f"%{customer_name}%"))
+    if report.created:
+        publish_order_event(db, "orders_imported", count=report.created)
+    db.commit()
+    return report.as_dict()
+
+def escape_like(value: str) -> str:
+    """Escape ký tự đặc biệt của LIKE để tìm đúng chuỗi người dùng nhập"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def normalize_phone(value: str) -> str:
+    """Giống cột customer_phone_normalized: chỉ giữ chữ số, đầu số 84 đổi thành 0"""
+    digits = re.sub(r"\D", "", value)
+    return re.sub(r"^84", "0", digits)
+
+def customer_search_filter(term: str, fuzzy: bool = False, name_only: bool = False):
+    """
+    Điều kiện tìm khách hàng, trả về (điều kiện, điểm tương đồng hoặc None).
+    Các cột đều có GIN trigram index nên ILIKE '%x%' và toán tử <% không phải quét toàn bảng
+    (từ khóa cần ít nhất 3 ký tự để dùng được index).
+    - Từ khóa chỉ gồm số và ký tự điện thoại: tìm trên cột số điện thoại đã chuẩn hóa
+    - fuzzy: so khớp theo word_similarity của pg_trgm, chấp nhận gõ sai vài ký tự
+    """
+    term = term.strip()
+    if not name_only and re.fullmatch(r"[\d\s+().-]+", term) and len(re.sub(r"\D", "", term)) >= 3:
+        # Chỉ đổi đầu số 84 khi người dùng nhập số đầy đủ, "845" có thể là một đoạn giữa số
+        phone = normalize_phone(term) if term.startswith("+") or len(re.sub(r"\D", "", term)) >= 11 else re.sub(r"\D", "", term)
+        condition = Order.customer_phone_normalized.like(f"%{phone}%")
+        if not fuzzy:
+            return condition, None
+        score = func.similarity(Order.customer_phone_normalized, phone)
+        return or_(condition, Order.customer_phone_normalized.op("%")(phone)), score
+
+    columns = [Order.customer_name] if name_only else [Order.customer_name, Order.customer_email]
+    if not fuzzy:
+        pattern = f"%{escape_like(term)}%"
+        return or_(*[column.ilike(pattern) for column in columns]), None
+
+    # word_similarity so khớp từ khóa với phần giống nhất trong chuỗi (ví dụ một từ trong họ tên),
+    # trigram không phân biệt hoa thường nên so trực tiếp trên cột để dùng được index
+    condition = or_(*[literal(term).op("<%")(column) for column in columns])
+    scores = [func.word_similarity(term, column) for column in columns]
+    return condition, func.greatest(*scores) if len(scores) > 1 else scores[0]
+
+def filter_orders(query, customer_name: Optional[str] = None, search: Optional[str] = None, fuzzy: bool = False,
+                  service_id: Optional[int] = None, status: Optional[str] = None,
+                  start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Áp dụng bộ lọc chung cho danh sách và xuất CSV đơn hàng, trả về (query, thứ tự sắp xếp)"""
+    ordering = [Order.created_at.desc()]
+    
+    for term, name_only in ((customer_name, True), (search, False)):
+        if not term or not term.strip():
+            continue
+        condition, score = customer_search_filter(term, fuzzy, name_only)
+        query = query.filter(condition)
+        if score is not None:
+            # Tìm gần đúng: kết quả giống nhất lên đầu
+            ordering.insert(0, score.desc())
     
     if service_id:
         query = query.filter(Order.service_id == service_id)
@@ -140,9 +233,28 @@ async def get_orders(
         # Thêm 1 ngày cho end_date để bao gồm cả đơn hàng trong ngày cuối
         query = query.filter(Order.created_at <= datetime.combine(end_date, datetime.max.time()))
     
-    # Thực hiện query
+    return query, ordering
+
+@router.get("/", response_model=PaginatedResponse[OrderOut])
+async def get_orders(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user),
+    skip: int = 0,
+    limit: int = 100,
+    customer_name: Optional[str] = None,
+    search: Optional[str] = Query(None, description="Tìm theo tên, email hoặc số điện thoại khách hàng"),
+    fuzzy: bool = Query(False, description="Tìm gần đúng theo độ tương đồng (chấp nhận gõ sai)"),
+    service_id: Optional[int] = None,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    # Xây dựng query
+    query, ordering = filter_orders(db.query(Order), customer_name, search, fuzzy, service_id, status, start_date, end_date)
+    
+    # Thực hiện query: một câu đếm và một câu lấy trang kèm dịch vụ (không nạp lazy từng dòng)
     total = query.count()
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    orders = eager_load(query, OrderOut).order_by(*ordering).offset(skip).limit(limit).all()
     
     # Xử lý các đơn hàng không có service hoặc service đã bị xóa
     valid_orders = []
@@ -156,6 +268,38 @@ async def get_orders(
         "total": total
     }
 
+@router.post("/events/ticket")
+async def create_order_events_ticket(current_user: User = Depends(get_admin_user)):
+    """
+    Vé kết nối luồng sự kiện cho EventSource (không gửi được header Authorization):
+    chỉ dùng được cho GET /api/orders/events?ticket=..., hết hạn sau ORDER_EVENTS_TICKET_SECONDS giây
+    """
+    ticket = create_ticket(current_user.username, current_user.role, ORDER_EVENTS_SCOPE,
+                           settings.ORDER_EVENTS_TICKET_SECONDS)
+    return {"ticket": ticket, "expires_in": settings.ORDER_EVENTS_TICKET_SECONDS}
+
+@router.get("/events")
+async def order_events_stream(
+    last_event_id: Optional[int] = Query(None, description="Phát lại các sự kiện sau mã này"),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user_header_or_ticket)
+):
+    """
+    Luồng sự kiện đơn hàng (text/event-stream) thay cho việc gọi lại danh sách định kỳ:
+    order_created, order_status_changed, orders_imported. Trình duyệt tự gửi Last-Event-ID khi kết nối lại;
+    sự kiện reset nghĩa là không phát lại đủ các sự kiện bị lỡ, cần tải lại danh sách.
+    EventSource không gửi được header nên truyền vé từ POST /api/orders/events/ticket qua tham số `ticket`
+    (lấy vé mới trước mỗi lần kết nối lại).
+    """
+    # Trả kết nối database về pool, luồng sự kiện có thể mở rất lâu
+    db.close()
+    return StreamingResponse(
+        order_events.stream(last_event_id_header or last_event_id, settings.ORDER_EVENTS_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{order_id}", response_model=OrderOut)
 async def get_order(
     order_id: int,
@@ -163,7 +307,7 @@ async def get_order(
     current_user: User = Depends(get_admin_user)
 ):
     # Lấy đơn hàng và kiểm tra service
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = eager_load(db.query(Order), OrderOut).filter(Order.id == order_id).first()
     
     if not order:
         raise HTTPException(
@@ -180,34 +324,80 @@ async def get_order(
     
     return order
 
-@router.put("/{order_id}", response_model=OrderOut)
-async def update_order_status(
+@router.get("/{order_id}/timeline", response_model=OrderTimeline)
+async def get_order_timeline(
     order_id: int,
-    order: OrderUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    db_order = db.query(Order).filter(Order.id == order_id).first()
-    
-    if not db_order:
+    """Lịch sử trạng thái của đơn hàng theo thứ tự thời gian, kèm thời gian ở mỗi trạng thái và người thay đổi"""
+    order = db.query(Order.id, Order.status, Order.version).filter(Order.id == order_id).first()
+    if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Đơn hàng với ID {order_id} không tồn tại"
         )
     
-    # Cập nhật trạng thái
-    db_order.status = order.status
+    rows = db.query(OrderStatusEvent, User.username).outerjoin(
+        User, User.id == OrderStatusEvent.user_id
+    ).filter(OrderStatusEvent.order_id == order_id).order_by(OrderStatusEvent.id).all()
+    events = [{
+        "id": event.id,
+        "from_status": event.from_status,
+        "to_status": event.to_status,
+        "version": event.version,
+        "duration_seconds": event.duration_seconds,
+        "user_id": event.user_id,
+        "username": username,
+        "created_at": event.created_at
+    } for event, username in rows]
     
+    return {"order_id": order.id, "status": order.status, "version": order.version, "events": events}
+
+# Khai báo trước /{order_id} để "bulk" không bị hiểu là ID
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_order_status(
+    payload: OrderBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Chuyển nhiều đơn hàng sang cùng một trạng thái bằng một câu UPDATE.
+    Đơn hàng sai phiên bản (conflict) hoặc không được phép chuyển (invalid_transition) được báo riêng, các đơn khác vẫn được cập nhật.
+    """
+    results, changed = bulk_change_status(db, payload.status, payload.items, current_user.id)
+    publish_order_events(db, [order_event_data("order_status_changed", row, row.previous_status) for row in changed])
+    db.commit()
+    return bulk_result(results)
+
+@router.put("/{order_id}", response_model=OrderOut)
+async def update_order_status(
+    order_id: int,
+    order: OrderUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Đổi trạng thái đơn hàng theo máy trạng thái (xem ORDER_STATUS_TRANSITIONS).
+    Gửi kèm `version` để chỉ cập nhật khi không ai khác đã sửa đơn hàng, sai phiên bản trả về 409.
+    """
+    db_order, previous_status = change_order_status(db, order_id, order.status, order.version, current_user.id)
+    if previous_status is not None:
+        publish_order_event(db, "order_status_changed", db_order, previous_status)
+    
+    # Chuyển sang dữ liệu trả về trước khi commit để không phải đọc lại đơn hàng sau commit
+    result = OrderOut.model_validate(db_order)
     db.commit()
-    db.refresh(db_order)
     
-    return db_order
+    return result
 
 @router.get("/export/csv")
 async def export_orders_csv(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user),
     customer_name: Optional[str] = None,
+    search: Optional[str] = Query(None, description="Tìm theo tên, email hoặc số điện thoại khách hàng"),
+    fuzzy: bool = Query(False, description="Tìm gần đúng theo độ tương đồng (chấp nhận gõ sai)"),
     service_id: Optional[int] = None,
     status: Optional[str] = None,
     start_date: Optional[date] = None,
@@ -216,32 +406,15 @@ async def export_orders_csv(
 ):
     # Xây dựng query
     query = db.query(Order).join(Service, Order.service_id == Service.id, isouter=True)
+    query, ordering = filter_orders(query, customer_name, search, fuzzy, service_id, status, start_date, end_date)
     
-    # Áp dụng các bộ lọc
-    if customer_name:
-        query = query.filter(Order.customer_name.ilike(f"%{customer_name}%"))
-    
-    if service_id:
-        query = query.filter(Order.service_id == service_id)
-    
-    if status:
-        query = query.filter(Order.status == status)
-    
-    if start_date:
-        query = query.filter(Order.created_at >= start_date)
-    
-    if end_date:
-        # Thêm 1 ngày cho end_date để bao gồm cả đơn hàng trong ngày cuối
-        query = query.filter(Order.created_at <= datetime.combine(end_date, datetime.max.time()))
-    
-    # Thực hiện query
-    orders = query.order_by(Order.created_at.desc()).all()
+    # Thực hiện query, dịch vụ được nạp từ chính phép join (không truy vấn lại từng đơn hàng)
+    orders = query.options(contains_eager(Order.service)).order_by(*ordering).all()
     
     # Tạo DataFrame từ đơn hàng
     data = []
     for order in orders:
-        service = db.query(Service).filter(Service.id == order.service_id).first()
-        service_name = service.name if service else "Unknown"
+        service_name = order.service.name if order.service else "Unknown"
         
         data.append({
             "ID": order.id,
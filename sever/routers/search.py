@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional
+from config.database import get_db
+from models.models import SEARCH_CONFIG
+from schemas.schemas import SearchResponse, Suggestion
+from utils.search_index import suggest_index
+from utils.pagination import encode_cursor, decode_cursor
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+# Chỉ tính ts_headline cho các dòng của trang hiện tại vì hàm này khá tốn kém
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+TITLE_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+
+SEARCH_SQL = f"""
+WITH q AS (
+    SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query
+),
+hits AS (
+    SELECT 'service' AS kind, s.id, ts_rank(s.search_vector, q.query)::float8 AS rank
+    FROM services s, q
+    WHERE s.is_active = true AND s.search_vector @@ q.query
+    UNION ALL
+    SELECT 'blog' AS kind, b.id, ts_rank(b.search_vector, q.query)::float8 AS rank
+    FROM blogs b, q
+    WHERE b.is_active = true AND b.search_vector @@ q.query
+),
+page AS (
+    SELECT kind, id, rank FROM hits
+    {{cursor_filter}}
+    ORDER BY rank DESC, kind DESC, id DESC
+    LIMIT :limit
+)
+SELECT
+    page.kind,
+    page.id,
+    page.rank,
+    coalesce(s.name, b.title) AS title,
+    ts_headline('{SEARCH_CONFIG}', coalesce(s.name, b.title, ''), q.query, '{TITLE_HEADLINE_OPTIONS}') AS title_highlight,
+    ts_headline('{SEARCH_CONFIG}', coalesce(s.description, b.content, ''), q.query, '{HEADLINE_OPTIONS}') AS snippet
+FROM page
+CROSS JOIN q
+LEFT JOIN services s ON page.kind = 'service' AND s.id = page.id
+LEFT JOIN blogs b ON page.kind = 'blog' AND b.id = page.id
+ORDER BY page.rank DESC, page.kind DESC, page.id DESC
+"""
+
+@router.get("/suggest", response_model=List[Suggestion])
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """
+    Gợi ý khi gõ (autocomplete) theo tên dịch vụ, danh mục và tiêu đề bài viết
+    - Tra cứu trong chỉ mục bộ nhớ, không truy vấn cơ sở dữ liệu
+    - Không phân biệt dấu, khớp theo đầu của từng từ
+    """
+    return [suggestion._asdict() for suggestion in suggest_index.lookup(prefix, limit)]
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Từ khóa tìm kiếm, hỗ trợ \"cụm từ\", OR và -loại trừ"),
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="Giá trị next_cursor của trang trước"),
+    db: Session = Depends(get_db)
+):
+    """
+    Tìm kiếm toàn văn trong dịch vụ (tên, mô tả) và bài viết (tiêu đề, nội dung)
+    - Không phân biệt dấu tiếng Việt
+    - Kết quả sắp xếp theo độ liên quan, có đoạn trích với từ khóa được đánh dấu <mark>
+    - Phân trang bằng cursor: truyền next_cursor của trang trước để lấy trang tiếp theo
+    """
+    params = {"q": q, "limit": limit + 1}
+    cursor_filter = ""
+    if cursor:
+        params["cursor_rank"], params["cursor_kind"], params["cursor_id"] = decode_cursor(cursor, float, str, int)
+        cursor_filter = "WHERE (rank, kind, id) < (:cursor_rank, :cursor_kind, :cursor_id)"
+    
+    rows = db.execute(text(SEARCH_SQL.format(cursor_filter=cursor_filter)), params).mappings().all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["rank"], last["kind"], last["id"])
+    
+    return {
+        "items": [dict(row) for row in rows],
+        "next_cursor": next_cursor
+    }
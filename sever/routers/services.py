@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 from config.database import get_db
-from schemas.schemas import ServiceCreate, ServiceOut, ServiceUpdate, ServiceReviewCreate, ServiceReviewOut
-from models.models import Service, User, ServiceReview
+from schemas.schemas import (ServiceCreate, ServiceOut, ServiceUpdate, ServiceReviewCreate, ServiceReviewOut,
+                             ServiceReviewPage, ServiceBulkCreate, ServiceBulkUpdate, BulkDelete, BulkResult,
+                             BulkItemStatus, ImportResult)
+from models.models import Service, User, ServiceReview, Order
 from middlewares.auth_middleware import get_current_user, get_admin_user
+from utils.search_index import suggest_index, build_suggest_index
+from utils.pagination import encode_cursor, decode_cursor
+from utils.recommendations import recommendation_cache
+from utils.bulk import bulk_create, bulk_update, bulk_delete, bulk_result
+from utils.importer import import_services
+from utils.pricing import pricing_engine
 
 router = APIRouter(prefix="/api/services", tags=["Services"])
 
@@ -43,34 +53,91 @@ async def get_services(
 
 @router.get("/suggested", response_model=List[ServiceOut])
 async def get_suggested_services(current_id: int = Query(...), db: Session = Depends(get_db)):
-    # Lấy tối đa 4 dịch vụ khác với current_id, ưu tiên dịch vụ featured và active
-    services = db.query(Service).filter(
-        Service.id != current_id, 
-        Service.is_active == True,
-        Service.featured == True
-    ).limit(4).all()
-    
-    # Nếu chưa đủ 4 dịch vụ featured, lấy thêm các dịch vụ active khác
-    if len(services) < 4:
-        existing_ids = [s.id for s in services]
-        extra = db.query(Service).filter(
-            Service.id != current_id, 
-            Service.is_active == True,
-            ~Service.id.in_(existing_ids)
-        ).limit(4 - len(services)).all()
-        services += extra
-        
-    # Nếu vẫn chưa đủ 4, lấy bất kỳ dịch vụ nào khác
-    if len(services) < 4:
-        existing_ids = [s.id for s in services]
-        extra = db.query(Service).filter(
-            Service.id != current_id, 
-            ~Service.id.in_(existing_ids)
-        ).limit(4 - len(services)).all()
-        services += extra
-        
+    # Danh sách gợi ý được tính sẵn (cùng khách đặt, cùng danh mục, nổi bật) và giữ trong bộ nhớ,
+    # chỉ còn một truy vấn theo khóa chính để lấy thông tin dịch vụ
+    if recommendation_cache.loaded_at is None:
+        # Worker chưa nạp được bảng gợi ý: lấy dịch vụ nổi bật, đang hoạt động như trước khi có bảng gợi ý
+        return db.query(Service).filter(Service.id != current_id, Service.is_active == True).order_by(
+            Service.featured.desc(), Service.rating_count.desc(), Service.id
+        ).limit(recommendation_cache.size).all()
+    
+    ids = recommendation_cache.get(current_id)
+    if not ids:
+        return []
+    
+    services = db.query(Service).filter(Service.id.in_(ids), Service.is_active == True).all()
+    services.sort(key=lambda service: ids.index(service.id))
     return services
 
+# Các endpoint hàng loạt phải khai báo trước /{service_id} để "bulk" không bị hiểu là ID
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_services(payload: ServiceBulkCreate, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Tạo nhiều dịch vụ trong một transaction, kết quả trả về theo thứ tự gửi lên"""
+    ids = bulk_create(db, Service, payload.items)
+    db.commit()
+    pricing_engine.invalidate()
+    
+    for service_id, item in zip(ids, payload.items):
+        suggest_index.upsert("service", service_id, item.name, item.category, item.is_active)
+    return bulk_result([
+        {"index": index, "id": service_id, "status": BulkItemStatus.CREATED}
+        for index, service_id in enumerate(ids)
+    ])
+
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_services(payload: ServiceBulkUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """
+    Cập nhật nhiều dịch vụ trong một transaction (ví dụ cập nhật giá hàng loạt)
+    - Mỗi phần tử gồm id và các trường cần đổi
+    - ID không tồn tại được báo trong kết quả, các phần tử khác vẫn được cập nhật
+    """
+    results = bulk_update(db, Service, payload.items)
+    db.commit()
+    pricing_engine.invalidate()
+    
+    updated_ids = [item["id"] for item in results if item["status"] == BulkItemStatus.UPDATED]
+    if updated_ids:
+        for row in db.query(Service.id, Service.name, Service.category, Service.is_active).filter(Service.id.in_(updated_ids)):
+            suggest_index.upsert("service", row.id, row.name, row.category, row.is_active)
+    return bulk_result(results)
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_services(payload: BulkDelete, db: Session = Depends(get_db), current_user: User = Depends(get_admin_user)):
+    """Xóa nhiều dịch vụ; đánh giá bị xóa theo, đơn hàng được giữ lại và bỏ liên kết như khi xóa từng dịch vụ"""
+    db.query(Order).filter(Order.service_id.in_(payload.ids)).update({Order.service_id: None}, synchronize_session=False)
+    db.query(ServiceReview).filter(ServiceReview.service_id.in_(payload.ids)).delete(synchronize_session=False)
+    results = bulk_delete(db, Service, payload.ids)
+    db.commit()
+    pricing_engine.invalidate()
+    
+    for item in results:
+        if item["status"] == BulkItemStatus.DELETED:
+            suggest_index.remove("service", item["id"])
+    return bulk_result(results)
+
+# Khai báo không async để việc đọc file và COPY chạy trong threadpool, không chặn event loop
+@router.post("/import", response_model=ImportResult)
+def import_services_file(
+    file: UploadFile = File(..., description="File .csv hoặc .xlsx, dòng đầu là tiêu đề cột"),
+    dry_run: bool = Query(False, description="Chỉ kiểm tra và trả về báo cáo lỗi, không ghi vào database"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Nhập bảng giá dịch vụ từ file. Cột là tên trường (name, price, ...) hoặc tên tiếng Việt (Tên dịch vụ, Giá, ...).
+    Dịch vụ trùng tên được cập nhật các cột có trong file, dịch vụ mới được thêm; dòng lỗi được bỏ qua và liệt kê trong báo cáo.
+    """
+    report = import_services(db, file)
+    if dry_run:
+        # Số dòng thêm mới/cập nhật là kết quả nếu nhập thật
+        db.rollback()
+        return report.as_dict(dry_run=True)
+    
+    db.commit()
+    pricing_engine.invalidate()
+    build_suggest_index(db)
+    return report.as_dict()
+
 @router.get("/{service_id}", response_model=ServiceOut)
 async def get_service(service_id: int, db: Session = Depends(get_db)):
     service = db.query(Service).filter(Service.id == service_id).first()
@@ -97,7 +164,9 @@ async def create_service(service: ServiceCreate, db: Session = Depends(get_db),
     
     db.add(new_service)
     db.commit()
+    pricing_engine.invalidate()
     db.refresh(new_service)
+    suggest_index.upsert("service", new_service.id, new_service.name, new_service.category, new_service.is_active)
     
     return new_service
 
@@ -133,7 +202,9 @@ async def update_service(
         db_service.featured = service.featured
     
     db.commit()
+    pricing_engine.invalidate()
     db.refresh(db_service)
+    suggest_index.upsert("service", db_service.id, db_service.name, db_service.category, db_service.is_active)
     
     return db_service
 
@@ -149,21 +220,55 @@ async def delete_service(service_id: int, db: Session = Depends(get_db), current
     
     db.delete(db_service)
     db.commit()
+    pricing_engine.invalidate()
+    suggest_index.remove("service", service_id)
     
     return None
 
-@router.get("/{service_id}/reviews", response_model=List[ServiceReviewOut])
-async def get_service_reviews(service_id: int, db: Session = Depends(get_db)):
-    service = db.query(Service).filter(Service.id == service_id).first()
+@router.get("/{service_id}/reviews", response_model=ServiceReviewPage)
+async def get_service_reviews(
+    service_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Giá trị next_cursor của trang trước"),
+    db: Session = Depends(get_db)
+):
+    """
+    Danh sách đánh giá mới nhất trước, phân trang bằng cursor:
+    next_cursor là cursor của trang tiếp theo (null nếu đã hết), giống /api/search
+    """
+    service = db.query(Service.id).filter(Service.id == service_id).first()
     if not service:
         raise HTTPException(status_code=404, detail="Dịch vụ không tồn tại")
-    return db.query(ServiceReview).filter(ServiceReview.service_id == service_id).order_by(ServiceReview.created_at.desc()).all()
+    
+    query = db.query(ServiceReview).filter(ServiceReview.service_id == service_id)
+    if cursor:
+        created_at, review_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        query = query.filter(tuple_(ServiceReview.created_at, ServiceReview.id) < tuple_(created_at, review_id))
+    reviews = query.order_by(ServiceReview.created_at.desc(), ServiceReview.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+    
+    return {
+        "items": reviews,
+        "next_cursor": next_cursor
+    }
 
 @router.post("/{service_id}/reviews", response_model=ServiceReviewOut)
 async def create_service_review(service_id: int, review: ServiceReviewCreate, db: Session = Depends(get_db)):
-    service = db.query(Service).filter(Service.id == service_id).first()
-    if not service:
+    # Cập nhật tổng hợp đánh giá bằng một câu UPDATE cộng dồn, an toàn khi nhiều đánh giá gửi cùng lúc
+    rating_column = getattr(Service, f"rating_{review.rating}")
+    updated = db.query(Service).filter(Service.id == service_id).update({
+        Service.rating_count: Service.rating_count + 1,
+        Service.rating_sum: Service.rating_sum + review.rating,
+        rating_column: rating_column + 1
+    }, synchronize_session=False)
+    if not updated:
         raise HTTPException(status_code=404, detail="Dịch vụ không tồn tại")
+    
     new_review = ServiceReview(
         service_id=service_id,
         author_name=review.author_name if not review.is_anonymous else None,
@@ -174,4 +279,4 @@ async def create_service_review(service_id: int, review: ServiceReviewCreate, db
     db.add(new_review)
     db.commit()
     db.refresh(new_review)
-    return new_review 
\ No newline at end of file
+    return new_review
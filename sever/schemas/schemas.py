@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, create_model
-from typing import Optional, List, Generic, TypeVar, Dict, Any
+from typing import Optional, List, Generic, TypeVar, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -101,6 +101,10 @@ class ServiceOut(ServiceBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    rating_count: int = 0
+    rating_sum: int = 0
+    rating_average: Optional[float] = None
+    rating_histogram: Dict[int, int] = {}
     
     class Config:
         from_attributes = True
@@ -131,9 +135,38 @@ class BlogOut(BlogBase):
     class Config:
         from_attributes = True
 
+# Search Schemas
+class SearchResultKind(str, Enum):
+    SERVICE = "service"
+    BLOG = "blog"
+
+class SearchResult(BaseModel):
+    kind: SearchResultKind
+    id: int
+    title: str
+    title_highlight: str
+    snippet: Optional[str] = None
+    rank: float
+
+class SearchResponse(BaseModel):
+    items: List[SearchResult]
+    next_cursor: Optional[str] = None
+
+class SuggestionKind(str, Enum):
+    SERVICE = "service"
+    BLOG = "blog"
+    CATEGORY = "category"
+
+class Suggestion(BaseModel):
+    kind: SuggestionKind
+    id: Optional[int] = None
+    label: str
+
 # Generic Pagination Model
-class PaginatedResponse(BaseModel):
-    items: List[Any]
+T = TypeVar("T")
+
+class PaginatedResponse(BaseModel, Generic[T]):
+    items: List[T]
     total: int
     
     class Config:
@@ -161,12 +194,14 @@ class OrderCreate(OrderBase):
 
 class OrderUpdate(BaseModel):
     status: OrderStatus
+    version: Optional[int] = None  # Phiên bản client đang xem, gửi lên để không ghi đè thay đổi của người khác
 
 class OrderOut(OrderBase):
     id: int
     design_file_url: Optional[str] = None
     total_price: Optional[float] = None
     status: OrderStatus
+    version: int = 1
     created_at: datetime
     updated_at: datetime
     service: Optional[ServiceOut] = None
@@ -174,6 +209,48 @@ class OrderOut(OrderBase):
     class Config:
         from_attributes = True
 
+class OrderQuoteRequest(BaseModel):
+    service_id: int
+    quantity: int = Field(..., gt=0)
+    size: Optional[str] = None
+    material: Optional[str] = None
+
+class OrderQuote(BaseModel):
+    service_id: int
+    quantity: int
+    base_price: float
+    size_key: Optional[str] = None  # Mục cấu hình kích thước khớp (None = không áp dụng hệ số)
+    size_multiplier: float
+    material_key: Optional[str] = None
+    material_multiplier: float
+    discount_rate: float
+    unit_price: float
+    total_price: float
+
+class OrderStatusEventOut(BaseModel):
+    id: int
+    from_status: Optional[OrderStatus] = None  # None: đơn hàng được tạo
+    to_status: OrderStatus
+    version: int
+    duration_seconds: Optional[float] = None  # Thời gian đã ở trạng thái from_status
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    created_at: datetime
+
+class OrderTimeline(BaseModel):
+    order_id: int
+    status: OrderStatus
+    version: int
+    events: List[OrderStatusEventOut]
+
+class OrderStageStat(BaseModel):
+    service_id: int
+    service_name: Optional[str] = None
+    stage: str  # Trạng thái (thời gian ở trạng thái đó) hoặc "lead_time" (từ lúc tạo đến khi hoàn thành)
+    count: int
+    avg_seconds: float
+    max_seconds: float
+
 # Service Review Schemas
 class ServiceReviewBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
@@ -190,6 +267,10 @@ class ServiceReviewOut(ServiceReviewBase):
     class Config:
         from_attributes = True
 
+class ServiceReviewPage(BaseModel):
+    items: List[ServiceReviewOut]
+    next_cursor: Optional[str] = None
+
 # Contact Schemas
 class ContactBase(BaseModel):
     name: str
@@ -251,4 +332,86 @@ class ImageOut(BaseModel):
 
 class ImageUploadResponse(BaseModel):
     message: str
-    image: ImageOut 
\ No newline at end of file
+    image: ImageOut 
+
+# Bulk Schemas
+BULK_MAX_ITEMS = 1000
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    CONFLICT = "conflict"  # Sai phiên bản
+    INVALID_TRANSITION = "invalid_transition"
+
+class BulkItemResult(BaseModel):
+    index: int  # Vị trí phần tử trong mảng gửi lên
+    id: Optional[int] = None
+    status: BulkItemStatus
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    items: List[BulkItemResult]
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class ServiceBulkCreate(BaseModel):
+    items: List[ServiceCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class ServiceBulkUpdateItem(ServiceUpdate):
+    id: int
+
+class ServiceBulkUpdate(BaseModel):
+    items: List[ServiceBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BlogBulkCreate(BaseModel):
+    items: List[BlogCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BlogBulkUpdateItem(BlogUpdate):
+    id: int
+
+class BlogBulkUpdate(BaseModel):
+    items: List[BlogBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class ImageBulkUpdateItem(ImageUpdate):
+    id: int
+
+class ImageBulkUpdate(BaseModel):
+    items: List[ImageBulkUpdateItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class OrderBulkStatusItem(BaseModel):
+    id: int
+    version: Optional[int] = None
+
+class OrderBulkStatusUpdate(BaseModel):
+    status: OrderStatus
+    items: List[OrderBulkStatusItem] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+# Import Schemas
+class ServiceImportRow(ServiceUpdate):
+    # Dòng của file chỉ dùng để cập nhật dịch vụ đã có, tìm theo tên
+    name: str
+
+class OrderImportRow(OrderCreate):
+    # Đơn hàng ngoại tuyến có thể đã xử lý xong, giữ ngày tạo gốc nếu file có
+    status: OrderStatus = OrderStatus.PENDING
+    created_at: Optional[datetime] = None
+    total_price: Optional[float] = None  # Để trống thì tính theo bảng giá hiện tại
+
+class ImportRowError(BaseModel):
+    row: int  # Số dòng trong file (dòng tiêu đề là dòng 1)
+    field: Optional[str] = None
+    message: str
+
+class ImportResult(BaseModel):
+    total_rows: int
+    created: int
+    updated: int = 0
+    failed: int
+    dry_run: bool = False
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
@@ -0,0 +1,173 @@
+"""
+Fixture dùng chung: test gọi API trong cùng tiến trình qua TestClient, không cần server đang chạy.
+
+- Mỗi tiến trình pytest (mỗi worker của pytest-xdist) dùng database riêng <DATABASE_NAME>_test_<worker>,
+  tạo từ models khi bắt đầu và xóa khi kết thúc, nên chạy song song được: pytest -n auto
+- Mỗi test chạy trong một transaction được rollback khi xong: SessionLocal (get_db, middleware...)
+  gắn vào kết nối của test, commit trong router chỉ giải phóng savepoint
+- Email không gửi qua SMTP mà ghi vào fixture `outbox`, file upload ghi vào thư mục tạm của test
+- Bộ đếm giới hạn tần suất được làm mới cho từng test (fixture `rate_limits`)
+- Dữ liệu mẫu tạo bằng tests/factories.py qua fixture `db`
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+# Phải đặt trước khi import config.settings (engine được tạo khi import config.database)
+load_dotenv()
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "main")
+os.environ["DATABASE_NAME"] = os.getenv("TEST_DATABASE_NAME", f"{os.getenv('DATABASE_NAME', 'phulong')}_test_{WORKER}")
+
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+from fastapi.testclient import TestClient
+
+from config.database import Base, SessionLocal, engine
+from config.settings import settings
+from models.models import UserRole
+from tests import factories
+from tests.fakes import FakeMailer, FakeSMTPPool, Outbox
+from utils.query_profiler import capture_queries
+
+
+def _admin_connection():
+    connection = psycopg2.connect(dbname="postgres", user=settings.DATABASE_USER, password=settings.DATABASE_PASSWORD,
+                                  host=settings.DATABASE_HOST or None, port=settings.DATABASE_PORT)
+    connection.autocommit = True
+    return connection
+
+
+def _is_xdist_controller(config) -> bool:
+    # Tiến trình điều phối của pytest-xdist không chạy test nên không cần database
+    return getattr(config.option, "numprocesses", None) and not hasattr(config, "workerinput")
+
+
+def pytest_configure(config):
+    if _is_xdist_controller(config):
+        return
+    connection = _admin_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{settings.DATABASE_NAME}"')
+        cursor.execute(f'CREATE DATABASE "{settings.DATABASE_NAME}"')
+    connection.close()
+    import models.models  # noqa: F401 - đăng ký các bảng vào Base.metadata
+    Base.metadata.create_all(bind=engine)
+
+
+def pytest_unconfigure(config):
+    if _is_xdist_controller(config):
+        return
+    engine.dispose()
+    connection = _admin_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{settings.DATABASE_NAME}"')
+    connection.close()
+
+
+@pytest.fixture
+def connection():
+    """Kết nối có transaction được rollback sau test, mọi session của ứng dụng dùng chung kết nối này"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    SessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    yield connection
+    SessionLocal.configure(bind=engine, join_transaction_mode="conservative_savepoint")
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def db(connection):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def outbox(monkeypatch):
+    """Email đã "gửi" trong test (SMTP và hàng đợi email bất đồng bộ đều được thay bằng bản giả)"""
+    import utils.digest
+    import utils.email
+
+    outbox = Outbox()
+    monkeypatch.setattr(utils.email, "_smtp_pool", FakeSMTPPool(outbox))
+    monkeypatch.setattr(utils.digest, "async_mailer", FakeMailer(outbox))
+    return outbox
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch, tmp_path):
+    """Thư mục tạm nhận file upload (file thiết kế, file xuất CSV, ảnh)"""
+    import routers.images
+
+    uploads = tmp_path / "uploads"
+    images = tmp_path / "images"
+    uploads.mkdir()
+    images.mkdir()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(routers.images, "UPLOAD_DIR", str(images))
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def rate_limits():
+    """Bộ đếm giới hạn tần suất làm mới cho từng test (mọi request của TestClient cùng một IP)"""
+    from utils.rate_limit import rate_limiter
+
+    rate_limiter.reset()
+    yield rate_limiter
+    rate_limiter.reset()
+
+
+@pytest.fixture
+def client(db):
+    import main
+
+    # Không dùng "with" để bỏ qua các tác vụ startup (tác vụ định kỳ, LISTEN sự kiện đơn hàng...)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def admin_user(db):
+    return factories.create_user(db, role=UserRole.ADMIN)
+
+
+@pytest.fixture
+def root_user(db):
+    return factories.create_user(db, role=UserRole.ROOT)
+
+
+@pytest.fixture
+def admin_headers(admin_user):
+    return factories.auth_headers(admin_user)
+
+
+@pytest.fixture
+def root_headers(root_user):
+    return factories.auth_headers(root_user)
+
+
+@pytest.fixture
+def service(db):
+    return factories.create_service(db)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Giới hạn số câu truy vấn SQL của một đoạn code (thường là một lần gọi endpoint qua TestClient):
+
+        with query_budget(2):
+            client.get("/api/orders/")
+
+    Vượt giới hạn thì test lỗi, kèm danh sách truy vấn theo fingerprint để tìm chỗ N+1.
+    """
+    @contextmanager
+    def check(limit: int):
+        with capture_queries() as profile:
+            yield profile
+        assert profile.count <= limit, f"Vượt ngân sách {limit} truy vấn: {profile.summary()}"
+    return check
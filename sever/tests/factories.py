@@ -0,0 +1,73 @@
+"""
+Tạo dữ liệu mẫu cho test trực tiếp qua session (không gọi API).
+
+Mỗi hàm nhận session của test (fixture `db`), các trường không truyền vào có giá trị mặc định hợp lệ
+và duy nhất (username, email...) nên test không phụ thuộc dữ liệu của test khác. Dữ liệu chỉ được
+flush, transaction của test được rollback khi test kết thúc.
+"""
+
+import itertools
+from functools import lru_cache
+
+from sqlalchemy.orm import Session
+
+from models.models import Blog, Order, Service, User, UserRole
+from routers.auth import get_password_hash
+from utils.jwt import create_access_token
+
+DEFAULT_PASSWORD = "test123456"
+
+_sequence = itertools.count(1)
+
+
+@lru_cache(maxsize=None)
+def hashed_password(password: str) -> str:
+    # bcrypt chậm có chủ đích: mỗi mật khẩu chỉ băm một lần cho cả phiên test
+    return get_password_hash(password)
+
+
+def _save(db: Session, obj):
+    db.add(obj)
+    db.flush()
+    return obj
+
+
+def create_user(db: Session, role: str = UserRole.ADMIN, password: str = DEFAULT_PASSWORD, **fields) -> User:
+    number = next(_sequence)
+    fields.setdefault("username", f"user_{number}")
+    fields.setdefault("email", f"user_{number}@phulong.com")
+    return _save(db, User(role=role, hashed_password=hashed_password(password), **fields))
+
+
+def auth_headers(user: User) -> dict:
+    """Header Authorization cho user, giống token do /api/auth/login-json cấp"""
+    token = create_access_token(data={"sub": user.username, "role": user.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_service(db: Session, **fields) -> Service:
+    number = next(_sequence)
+    fields.setdefault("name", f"Dịch vụ in {number}")
+    fields.setdefault("description", f"Dịch vụ in ấn mẫu số {number}")
+    fields.setdefault("price", 100000)
+    return _save(db, Service(**fields))
+
+
+def create_blog(db: Session, **fields) -> Blog:
+    number = next(_sequence)
+    fields.setdefault("title", f"Bài viết {number}")
+    fields.setdefault("content", f"Nội dung bài viết mẫu số {number}")
+    return _save(db, Blog(**fields))
+
+
+def create_order(db: Session, service: Service = None, **fields) -> Order:
+    number = next(_sequence)
+    if service is None and "service_id" not in fields:
+        service = create_service(db)
+    if service is not None:
+        fields["service_id"] = service.id
+    fields.setdefault("customer_name", f"Khách hàng {number}")
+    fields.setdefault("customer_email", f"khach{number}@example.com")
+    fields.setdefault("customer_phone", f"09{number:08d}")
+    fields.setdefault("quantity", 100)
+    return _save(db, Order(**fields))
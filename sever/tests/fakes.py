@@ -0,0 +1,72 @@
+"""
+Thay thế gửi email cho test: email được ghi vào Outbox thay vì gửi qua SMTP.
+
+- FakeSMTPPool thay pool SMTP của utils.email (send_email)
+- FakeMailer thay hàng đợi email bất đồng bộ của utils.digest (thông báo admin, liên hệ)
+"""
+
+from email import message_from_string
+from email.policy import default as default_policy
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config.settings import settings
+from utils.email_templates import render_email
+
+
+class SentEmail(NamedTuple):
+    to_email: str
+    subject: str
+    body: str
+
+
+class Outbox:
+    def __init__(self):
+        self.emails: List[SentEmail] = []
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def to(self, address: str) -> List[SentEmail]:
+        return [email for email in self.emails if email.to_email == address]
+
+    def record_message(self, to_email: str, message: str):
+        """Ghi email dạng MIME (chuỗi do build_message tạo)"""
+        parsed = message_from_string(message, policy=default_policy)
+        body = parsed.get_body(("html", "plain"))
+        self.emails.append(SentEmail(to_email, str(parsed["Subject"]), body.get_content() if body else ""))
+
+
+class FakeSMTPPool:
+    def __init__(self, outbox: Outbox):
+        self.outbox = outbox
+
+    def send(self, from_addr: str, to_addr: str, message: str):
+        self.outbox.record_message(to_addr, message)
+
+    def close_all(self):
+        pass
+
+
+class FakeMailer:
+    """Cùng giao diện với AsyncEmailSender, ghi email ngay khi được đưa vào hàng đợi"""
+
+    def __init__(self, outbox: Outbox):
+        self.outbox = outbox
+        self.running = True
+
+    async def start(self):
+        pass
+
+    async def stop(self, timeout: float = 10):
+        pass
+
+    def enqueue(self, email) -> bool:
+        self.outbox.emails.append(SentEmail(email.to_email, email.subject, email.html))
+        return True
+
+    def enqueue_contact(self, context: Dict[str, Any]):
+        rendered = render_email("contact_notification", context)
+        self.outbox.emails.append(SentEmail(settings.ADMIN_EMAIL, rendered.subject, rendered.html))
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {"sent": len(self.outbox)}
@@ -0,0 +1,145 @@
+import asyncio
+import socket
+from email import message_from_bytes
+from email.header import decode_header, make_header
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from config.settings import settings
+from utils.async_email import AsyncEmailSender, QueuedEmail
+
+CONTACT = {
+    "name": "Nguyễn Văn Test",
+    "email": "test@phulong.com",
+    "phone": "0987654321",
+    "subject": "Báo giá",
+    "message": "Nội dung",
+    "submitted_at": "01/01/2025 10:00:00"
+}
+
+
+class RecordingHandler:
+    """Handler aiosmtpd ghi lại tiêu đề các email nhận được, số phiên được mở (EHLO) và được đóng (QUIT)"""
+
+    def __init__(self):
+        self.subjects = []
+        self.sessions = 0
+        self.quits = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        message = message_from_bytes(envelope.content)
+        self.subjects.append(str(make_header(decode_header(message["Subject"]))))
+        return "250 OK"
+
+    async def handle_QUIT(self, server, session, envelope):
+        self.quits += 1
+        return "221 Bye"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SMTPServer:
+    """Máy chủ SMTP giả lập (aiosmtpd) trên một cổng cố định, khởi động lại được"""
+
+    def __init__(self):
+        self.handler = RecordingHandler()
+        self.port = free_port()
+        self.controller = None
+
+    @property
+    def received(self):
+        return self.handler.subjects
+
+    def start(self):
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+    def restart(self):
+        # Controller đã dừng không khởi động lại được, tạo mới trên cùng cổng
+        self.stop()
+        self.start()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = SMTPServer()
+    server.start()
+    monkeypatch.setattr(settings, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.port)
+    monkeypatch.setattr(settings, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_USERNAME", "")
+    yield server
+    server.stop()
+
+
+def email(number: int) -> QueuedEmail:
+    return QueuedEmail("admin@phulong.com", f"Email {number}", f"<p>Email {number}</p>")
+
+
+def test_stop_drains_queue(smtp_server):
+    """Kiểm tra stop() gửi hết email còn trong hàng đợi, dừng worker rồi đóng các phiên SMTP"""
+    async def scenario():
+        sender = AsyncEmailSender(concurrency=2, queue_size=10)
+        await sender.start()
+        for number in range(5):
+            assert sender.enqueue(email(number))
+        await sender.stop()
+        return sender
+
+    sender = asyncio.run(scenario())
+    assert sorted(smtp_server.received) == [f"Email {number}" for number in range(5)]
+    assert sender.stats()["sent"] == 5
+    assert not sender.running
+    assert smtp_server.handler.sessions >= 1
+    assert smtp_server.handler.quits == smtp_server.handler.sessions
+
+
+def test_full_queue_sheds_and_coalesces_contacts(smtp_server):
+    """Kiểm tra hàng đợi đầy: email thường bị bỏ, thông báo liên hệ được gộp thành một email tổng hợp"""
+    async def scenario():
+        sender = AsyncEmailSender(concurrency=1, queue_size=2, digest_size=3)
+        # Worker chưa chạy (chưa nhường vòng lặp) nên hàng đợi đầy sau hai email
+        assert sender.enqueue(email(1))
+        assert sender.enqueue(email(2))
+        assert not sender.enqueue(email(3))
+        for _ in range(3):
+            sender.enqueue_contact(CONTACT)
+        await sender.stop()
+        return sender
+
+    sender = asyncio.run(scenario())
+    stats = sender.stats()
+    assert stats["shed"] == 1
+    assert stats["coalesced"] == 3
+    assert stats["pending_contacts"] == 0
+    assert smtp_server.received == ["Email 1", "Email 2", "[PHÚ LONG] 3 liên hệ mới"]
+
+
+def test_reconnects_after_server_disconnect(smtp_server):
+    """Kiểm tra phiên SMTP bị máy chủ đóng được mở lại và email vẫn được gửi"""
+    async def scenario():
+        sender = AsyncEmailSender(concurrency=1)
+        await sender.start()
+        client = await sender.send(email(1))
+        # Máy chủ khởi động lại: phiên đang giữ không còn dùng được
+        smtp_server.restart()
+        reconnected = await sender.send(email(2), client)
+        await sender.stop()
+        return client, reconnected
+
+    client, reconnected = asyncio.run(scenario())
+    assert reconnected is not client
+    assert smtp_server.received == ["Email 1", "Email 2"]
@@ -1,11 +1,6 @@
-import requests
 import pytest
-import json
-from tests.test_services import get_admin_token
-from tests.test_auth import API_URL
 
-# Biến lưu trữ ID blog test
-test_blog_id = None
+from tests import factories
 
 # Dữ liệu test
 TEST_BLOG = {
@@ -19,21 +14,19 @@ UPDATE_BLOG = {
     "content": "Cập nhật bài viết về các xu hướng in ấn mới nhất trong năm 2025."
 }
 
-def test_create_blog():
+@pytest.fixture
+def blog(db):
+    return factories.create_blog(db, **TEST_BLOG)
+
+def test_create_blog(client, admin_headers):
     """Kiểm tra tạo blog mới"""
-    global test_blog_id
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API tạo blog
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(
-        f"{API_URL}/blogs/",
-        headers=headers,
+    response = client.post(
+        "/api/blogs/",
+        headers=admin_headers,
         json=TEST_BLOG
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
@@ -41,90 +34,53 @@ def test_create_blog():
     assert data["content"] == TEST_BLOG["content"]
     assert data["is_active"] == TEST_BLOG["is_active"]
     assert "id" in data
-    
-    # Lưu ID blog cho các test sau
-    test_blog_id = data["id"]
 
-def test_get_all_blogs():
+def test_get_all_blogs(client, blog):
     """Kiểm tra lấy danh sách blog"""
     # Gọi API lấy danh sách blog
-    response = requests.get(f"{API_URL}/blogs/")
-    
+    response = client.get("/api/blogs/")
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
+    assert any(item["id"] == blog.id for item in data)
 
-def test_get_blog_by_id():
+def test_get_blog_by_id(client, blog):
     """Kiểm tra lấy chi tiết blog theo ID"""
-    global test_blog_id
-    
-    # Đảm bảo đã có ID blog test
-    if not test_blog_id:
-        test_create_blog()
-    
     # Gọi API lấy chi tiết blog
-    response = requests.get(f"{API_URL}/blogs/{test_blog_id}")
-    
+    response = client.get(f"/api/blogs/{blog.id}")
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_blog_id
+    assert data["id"] == blog.id
     assert data["title"] == TEST_BLOG["title"]
 
-def test_update_blog():
+def test_update_blog(client, admin_headers, blog):
     """Kiểm tra cập nhật blog"""
-    global test_blog_id
-    
-    # Đảm bảo đã có ID blog test
-    if not test_blog_id:
-        test_create_blog()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API cập nhật blog
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.put(
-        f"{API_URL}/blogs/{test_blog_id}",
-        headers=headers,
+    response = client.put(
+        f"/api/blogs/{blog.id}",
+        headers=admin_headers,
         json=UPDATE_BLOG
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_blog_id
+    assert data["id"] == blog.id
     assert data["title"] == UPDATE_BLOG["title"]
     assert data["content"] == UPDATE_BLOG["content"]
-    
-def test_delete_blog():
+
+def test_delete_blog(client, admin_headers, blog):
     """Kiểm tra xóa blog"""
-    global test_blog_id
-    
-    # Đảm bảo đã có ID blog test
-    if not test_blog_id:
-        test_create_blog()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API xóa blog
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.delete(
-        f"{API_URL}/blogs/{test_blog_id}",
-        headers=headers
+    response = client.delete(
+        f"/api/blogs/{blog.id}",
+        headers=admin_headers
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 204
-
-if __name__ == "__main__":
-    # Chạy các test theo thứ tự
-    test_create_blog()
-    test_get_all_blogs()
-    test_get_blog_by_id()
-    test_update_blog()
-    test_delete_blog()
-    
-    print("Tất cả test blogs đã pass!") 
\ No newline at end of file
+    assert client.get(f"/api/blogs/{blog.id}").status_code == 404
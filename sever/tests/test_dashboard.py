@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+from tests import factories
+
+
+def test_revenue_by_date(client, db, service, admin_headers):
+    """Kiểm tra doanh thu 7 ngày gần nhất theo từng khoảng 24 giờ, mốc thời gian theo UTC như created_at"""
+    now = datetime.utcnow()
+    for hours_ago, total_price, status in [
+        (1, 2000000, "completed"),
+        (1, 9000000, "pending"),
+        (6 * 24 + 12, 1500000, "completed"),
+        (7 * 24 + 12, 4000000, "completed"),
+    ]:
+        factories.create_order(db, service, status=status, total_price=total_price,
+                               created_at=now - timedelta(hours=hours_ago))
+
+    response = client.get("/api/dashboard/revenue-by-date", headers=admin_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["labels"] == [(datetime.now() - timedelta(days=i)).strftime("%d/%m") for i in range(7, 0, -1)]
+    assert [float(value) for value in data["values"]] == [1.5, 0, 0, 0, 0, 0, 2.0]
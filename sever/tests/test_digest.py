@@ -0,0 +1,91 @@
+import pytest
+
+from config.settings import settings
+from utils.digest import AdminDigest
+
+CONTACT_DATA = {
+    "name": "Nguyễn Văn Test",
+    "email": "test@phulong.com",
+    "phone": "0987654321",
+    "subject": "Báo giá in tờ rơi",
+    "message": "Cho tôi xin báo giá in 1000 tờ rơi A5"
+}
+
+
+def get_test_order_data(service):
+    return {
+        "customer_name": "Nguyễn Văn Test",
+        "customer_email": "khachhang@phulong.com",
+        "customer_phone": "0987654321",
+        "service_id": service.id,
+        "quantity": 100,
+        "size": "A4",
+        "material": "Giấy couche 150gsm",
+        "notes": "Đơn hàng test"
+    }
+
+
+@pytest.fixture
+def digest(monkeypatch):
+    """Bộ gom thông báo admin riêng cho từng test (bộ đệm của admin_digest dùng chung cả tiến trình)"""
+    import routers.contact
+    import routers.orders
+
+    digest = AdminDigest(window_seconds=900, max_events=3, urgent_quantity=1000, urgent_keywords=["gấp"])
+    monkeypatch.setattr(routers.contact, "admin_digest", digest)
+    monkeypatch.setattr(routers.orders, "admin_digest", digest)
+    return digest
+
+
+def test_digest_buffers_until_flush(client, service, outbox, digest):
+    """Kiểm tra đơn hàng và liên hệ mới được gom lại, flush gửi một email tổng hợp cho ADMIN_EMAIL"""
+    assert client.post("/api/orders/", data=get_test_order_data(service)).status_code == 200
+    assert client.post("/api/contact/submit", json=CONTACT_DATA).status_code == 200
+    assert not outbox.to(settings.ADMIN_EMAIL)
+
+    assert digest.flush()
+    emails = outbox.to(settings.ADMIN_EMAIL)
+    assert [email.subject for email in emails] == ["[PHÚ LONG] Tổng hợp: 1 đơn hàng, 1 liên hệ mới"]
+    assert "Nguyễn Văn Test" in emails[0].body
+    assert CONTACT_DATA["subject"] in emails[0].body
+
+    # Cửa sổ mới bắt đầu rỗng
+    assert not digest.flush()
+    assert len(outbox.to(settings.ADMIN_EMAIL)) == 1
+
+
+def test_urgent_events_bypass_digest(client, service, outbox, digest):
+    """Kiểm tra đơn hàng số lượng lớn và liên hệ có từ khóa khẩn được gửi ngay"""
+    order_data = {**get_test_order_data(service), "quantity": 1000}
+    assert client.post("/api/orders/", data=order_data).status_code == 200
+    contact_data = {**CONTACT_DATA, "subject": "Cần in GẤP"}
+    assert client.post("/api/contact/submit", json=contact_data).status_code == 200
+
+    emails = outbox.to(settings.ADMIN_EMAIL)
+    assert len(emails) == 2
+    assert emails[1].subject == "Liên hệ mới từ: Nguyễn Văn Test"
+    assert "Cần in GẤP" in emails[1].body
+    assert not digest.flush()
+
+
+def test_digest_counts_events_over_limit(outbox, digest):
+    """Kiểm tra sự kiện vượt max_events chỉ được đếm và ghi chú trong email tổng hợp"""
+    for index in range(5):
+        digest.add_contact({**CONTACT_DATA, "name": f"Khách {index}", "submitted_at": "01/01/2026 10:00:00"})
+
+    email = digest.build()
+    assert email.to_email == settings.ADMIN_EMAIL
+    assert email.subject == "[PHÚ LONG] Tổng hợp: 0 đơn hàng, 3 liên hệ mới"
+    assert "Khách 2" in email.html and "Khách 3" not in email.html
+    assert "Và 2 sự kiện khác không được liệt kê." in email.text
+    # build không tự gửi, flush mới đưa vào hàng đợi
+    assert not outbox.to(settings.ADMIN_EMAIL)
+
+
+def test_digest_disabled_sends_immediately(outbox):
+    """Kiểm tra window_seconds = 0 tắt chế độ tổng hợp, liên hệ được gửi ngay"""
+    digest = AdminDigest(window_seconds=0)
+    digest.add_contact({**CONTACT_DATA, "submitted_at": "01/01/2026 10:00:00"})
+
+    assert len(outbox.to(settings.ADMIN_EMAIL)) == 1
+    assert not digest.flush()
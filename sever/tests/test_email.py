@@ -0,0 +1,41 @@
+import smtplib
+
+import pytest
+
+from utils.email import SMTPConnectionPool
+
+
+class FakeServer:
+    """Phiên SMTP giả, sendmail từ chối người nhận"""
+
+    def __init__(self):
+        self.closed = False
+
+    def sendmail(self, from_addr, to_addrs, message):
+        raise smtplib.SMTPRecipientsRefused({to_addrs: (550, b"Mailbox unavailable")})
+
+    def quit(self):
+        self.closed = True
+
+
+def test_pool_closes_connection_on_any_error(monkeypatch):
+    """Kiểm tra kết nối gặp lỗi không phải SMTPResponseException vẫn được đóng và trả slot cho pool"""
+    pool = SMTPConnectionPool("localhost", 25, size=1)
+    servers = []
+    monkeypatch.setattr(pool, "_connect", lambda: servers.append(FakeServer()) or servers[-1])
+
+    for _ in range(2):
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send("from@phulong.com", "khong-ton-tai@example.com", "Subject: test\n\nx")
+
+    # Mỗi lần gửi mở kết nối mới, kết nối lỗi đã được đóng và không quay lại pool
+    assert len(servers) == 2
+    assert all(server.closed for server in servers)
+    assert pool._idle == []
+
+    # Lỗi trong khối with của người gọi cũng vậy
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("lỗi của người gọi")
+    assert servers[-1].closed
+    assert pool._idle == []
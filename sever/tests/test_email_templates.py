@@ -0,0 +1,55 @@
+import pytest
+from utils.email_templates import inline_css, compile_template, load_templates, render_email
+
+def test_inline_css_descendant_and_existing_style():
+    """Kiểm tra inline CSS theo class, thẻ con cháu và giữ style có sẵn"""
+    html = """
+    <html><head><style>
+        .box { padding: 10px; }
+        .box td { color: red; }
+        a:hover { color: blue; }
+    </style></head>
+    <body><div class="box"><table><tr><td style="font-weight: bold">x</td></tr></table></div>
+    <td>ngoài</td><a href="#">link</a></body></html>
+    """
+    result = inline_css(html)
+    assert '<div class="box" style="padding: 10px">' in result
+    assert '<td style="color: red; font-weight: bold">x</td>' in result
+    # Thẻ td nằm ngoài .box không bị áp dụng
+    assert "<td>ngoài</td>" in result
+    # Luật :hover không inline được nên được giữ trong <style>
+    assert "a:hover { color: blue !important }" in result
+
+def test_render_escapes_html_but_not_text():
+    """Kiểm tra phần HTML được escape còn phần text giữ nguyên"""
+    template = compile_template(
+        "demo",
+        "<p>{{ name }}</p>",
+        "Subject: Xin chào {{ name }}\n\nTên: {{ name }}\n"
+    )
+    rendered = template.render({"name": "<Phú Long>"})
+    assert rendered.subject == "Xin chào <Phú Long>"
+    assert rendered.html == "<p>&lt;Phú Long&gt;</p>"
+    assert rendered.text == "Tên: <Phú Long>\n"
+
+def test_render_missing_variable():
+    """Kiểm tra báo lỗi khi thiếu biến"""
+    template = compile_template("demo", "<p>{{ name }}</p>", "Subject: {{ title }}\n\n")
+    with pytest.raises(KeyError):
+        template.render({"name": "x"})
+
+def test_bundled_templates_render():
+    """Kiểm tra các template đi kèm đều biên dịch và render được"""
+    templates = load_templates()
+    assert {"order_confirmation", "admin_new_order", "contact_notification"} <= set(templates)
+    rendered = render_email("contact_notification", {
+        "name": "Nguyễn Văn Test",
+        "email": "test@phulong.com",
+        "phone": "0987654321",
+        "subject": "Báo giá",
+        "message": "Nội dung",
+        "submitted_at": "01/01/2025 10:00:00"
+    })
+    assert rendered.subject == "Liên hệ mới từ: Nguyễn Văn Test"
+    assert "fonts.googleapis.com" not in rendered.html
+    assert "<style" not in rendered.html
@@ -0,0 +1,36 @@
+import logging
+from datetime import date
+
+import utils.logging_pipeline
+from utils.logging_pipeline import DailyFileHandler
+
+
+def test_daily_file_handler_shared_by_workers(tmp_path, monkeypatch):
+    """Kiểm tra hai worker cùng ghi file theo ngày, sang ngày mới không mất log và file quá hạn bị xóa"""
+    today = [date(2026, 3, 1)]
+
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return today[0]
+
+    monkeypatch.setattr(utils.logging_pipeline, "date", FakeDate)
+    (tmp_path / "app_20260101.log").write_text("cũ\n")
+    workers = [DailyFileHandler(str(tmp_path), retention_days=30) for _ in range(2)]
+    for handler in workers:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def log(message):
+        for index, handler in enumerate(workers):
+            handler.emit(logging.LogRecord("test", logging.INFO, __file__, 0, f"{message} {index}", None, None))
+            handler.flush()
+
+    log("ngày 1")
+    today[0] = date(2026, 3, 2)
+    log("ngày 2")
+    for handler in workers:
+        handler.close()
+
+    assert (tmp_path / "app_20260301.log").read_text().splitlines() == ["ngày 1 0", "ngày 1 1"]
+    assert (tmp_path / "app_20260302.log").read_text().splitlines() == ["ngày 2 0", "ngày 2 1"]
+    assert not (tmp_path / "app_20260101.log").exists()
@@ -0,0 +1,25 @@
+def parse_metrics(text: str) -> dict:
+    """Đọc các dòng số liệu (bỏ comment) thành {tên{nhãn}: giá trị}"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+def test_metrics_endpoint(client):
+    """Kiểm tra /metrics ghi nhận request theo mẫu route, kèm số câu truy vấn database"""
+    before = parse_metrics(client.get("/metrics").text)
+    response = client.get("/api/services/999999")
+    assert response.status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = parse_metrics(response.text)
+
+    labels = 'route="/api/services/{service_id}",method="GET",status="404"'
+    count = f"http_request_duration_seconds_count{{{labels}}}"
+    assert after[count] == before.get(count, 0) + 1
+    assert after[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == after[count]
+    assert after[f"http_request_db_queries_sum{{{labels}}}"] >= 1
@@ -1,173 +1,301 @@
-import requests
-import pytest
+import asyncio
 import json
-import os
-from tests.test_services import get_admin_token, test_create_service
-from tests.test_auth import API_URL
 
-# Biến lưu trữ ID
-test_service_id = None
-test_order_id = None
+import pytest
+
+import utils.order_events
+from utils.order_events import OrderEvent, OrderEventBroker
 
 # Dữ liệu test
-def get_test_order_data():
+def get_test_order_data(service):
     """Lấy dữ liệu mẫu cho đơn hàng test"""
-    global test_service_id
-    
-    # Nếu chưa có service ID, tạo service mới
-    if not test_service_id:
-        response = requests.get(f"{API_URL}/services/")
-        if response.status_code == 200 and len(response.json()) > 0:
-            test_service_id = response.json()[0]["id"]
-        else:
-            # Import trực tiếp để tránh circular import
-            from tests.test_services import test_create_service
-            test_create_service()
-            test_service_id = requests.get(f"{API_URL}/services/").json()[0]["id"]
-    
-    # Tạo dữ liệu đơn hàng
     return {
         "customer_name": "Nguyễn Văn Test",
         "customer_email": "anhvietho113@gmail.com",
         "customer_phone": "0987654321",
-        "service_id": test_service_id,
+        "service_id": service.id,
         "quantity": 100,
         "size": "A4",
         "material": "Giấy couche 150gsm",
         "notes": "Đơn hàng test"
     }
 
-def test_create_order():
+@pytest.fixture
+def order(client, service):
+    """Đơn hàng tạo qua API (có thành tiền, lịch sử trạng thái như đơn thật)"""
+    response = client.post("/api/orders/", data=get_test_order_data(service))
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    return response.json()
+
+@pytest.fixture
+def published_events(monkeypatch):
+    """Sự kiện đơn hàng được phát trong test (NOTIFY không đến được listener vì transaction bị rollback)"""
+    import routers.orders
+
+    events = []
+
+    def record(db, batch):
+        events.extend(batch)
+
+    monkeypatch.setattr(utils.order_events, "publish_order_events", record)
+    monkeypatch.setattr(routers.orders, "publish_order_events", record)
+    return events
+
+def test_create_order(client, service, outbox):
     """Kiểm tra tạo đơn hàng mới"""
-    global test_order_id
-    
     # Gọi API tạo đơn hàng
-    order_data = get_test_order_data()
-    response = requests.post(
-        f"{API_URL}/orders/",
-        data=order_data
+    order_data = get_test_order_data(service)
+    response = client.post(
+        "/api/orders/",
+        data=order_data,
+        files={"design_file": ("thiet_ke.pdf", b"%PDF-1.4 test", "application/pdf")}
     )
-    
+
     # Kiểm tra kết quả
-    assert response.status_code == 200 or response.status_code == 422
-    
-    # Nếu lỗi do không thể gửi file, thử lại không có file
-    if response.status_code == 422:
-        # Thông thường lỗi sẽ xảy ra khi API yêu cầu multipart/form-data
-        # Chúng ta sẽ lấy một đơn hàng từ danh sách để test tiếp
-        token = get_admin_token()
-        headers = {"Authorization": f"Bearer {token}"}
-        orders_response = requests.get(f"{API_URL}/orders/", headers=headers)
-        
-        if orders_response.status_code == 200 and len(orders_response.json()) > 0:
-            test_order_id = orders_response.json()[0]["id"]
-            return
-        
-        # Nếu không có đơn hàng, báo lỗi
-        assert False, "Không thể tạo hoặc lấy đơn hàng để test"
-    else:
-        data = response.json()
-        assert data["customer_name"] == order_data["customer_name"]
-        assert data["customer_email"] == order_data["customer_email"]
-        assert data["service_id"] == order_data["service_id"]
-        assert "id" in data
-        
-        # Lưu ID đơn hàng cho các test sau
-        test_order_id = data["id"]
-
-def test_get_all_orders():
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    data = response.json()
+    assert data["customer_name"] == order_data["customer_name"]
+    assert data["customer_email"] == order_data["customer_email"]
+    assert data["service_id"] == order_data["service_id"]
+    assert "id" in data
+
+    # Khách hàng nhận email xác nhận
+    assert outbox.to(order_data["customer_email"])
+
+def test_get_all_orders(client, admin_headers, order):
     """Kiểm tra lấy danh sách đơn hàng"""
-    # Lấy token admin
-    token = get_admin_token()
-    print(f"Token: {token[:20]}... (được lấy cho test orders)")
-    
     # Gọi API lấy danh sách đơn hàng
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{API_URL}/orders/", headers=headers)
-    
-    # In ra thông tin lỗi
-    print(f"Status code: {response.status_code}")
-    
-    # Thử in ra nội dung response để debug
-    try:
-        json_response = response.json()
-        print(f"Response content (first 200 chars): {str(json_response)[:200]}")
-    except Exception as e:
-        print(f"Lỗi khi parse JSON response: {str(e)}")
-        print(f"Raw response: {response.text[:200]}")
-    
+    response = client.get("/api/orders/", headers=admin_headers)
+
     # Kiểm tra kết quả
     assert response.status_code == 200, f"API trả về lỗi: {response.text}"
     data = response.json()
-    assert isinstance(data, list)
+    assert isinstance(data["items"], list)
+    assert data["total"] >= 1
+    assert any(item["id"] == order["id"] for item in data["items"])
 
-def test_get_order_by_id():
+def test_get_order_by_id(client, admin_headers, order):
     """Kiểm tra lấy chi tiết đơn hàng theo ID"""
-    global test_order_id
-    
-    # Đảm bảo đã có ID đơn hàng test
-    if not test_order_id:
-        test_create_order()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API lấy chi tiết đơn hàng
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{API_URL}/orders/{test_order_id}", headers=headers)
-    
+    response = client.get(f"/api/orders/{order['id']}", headers=admin_headers)
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_order_id
+    assert data["id"] == order["id"]
 
-def test_update_order_status():
+def test_update_order_status(client, admin_headers, order):
     """Kiểm tra cập nhật trạng thái đơn hàng"""
-    global test_order_id
-    
-    # Đảm bảo đã có ID đơn hàng test
-    if not test_order_id:
-        test_create_order()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API cập nhật trạng thái đơn hàng
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.put(
-        f"{API_URL}/orders/{test_order_id}",
-        headers=headers,
+    response = client.put(
+        f"/api/orders/{order['id']}",
+        headers=admin_headers,
         json={"status": "processing"}
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_order_id
+    assert data["id"] == order["id"]
     assert data["status"] == "processing"
 
-def test_export_orders_csv():
+def test_export_orders_csv(client, admin_headers, order):
     """Kiểm tra xuất đơn hàng ra CSV"""
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API xuất đơn hàng
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{API_URL}/orders/export/csv", headers=headers)
-    
+    response = client.get("/api/orders/export/csv", headers=admin_headers)
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     # Content-Type phải là text/csv
     assert "text/csv" in response.headers.get("Content-Type", "")
     # Kiểm tra response chứa dữ liệu
-    assert len(response.content) > 0
-
-if __name__ == "__main__":
-    # Chạy các test theo thứ tự
-    test_create_order()
-    test_get_all_orders()
-    test_get_order_by_id()
-    test_update_order_status()
-    test_export_orders_csv()
-    
-    print("Tất cả test orders đã pass!") 
\ No newline at end of file
+    assert order["customer_name"] in response.content.decode("utf-8-sig")
+
+def test_search_orders_by_customer(client, admin_headers, order):
+    """Kiểm tra tìm đơn hàng theo số điện thoại chuẩn hóa và tìm gần đúng theo tên"""
+    # "+84 987 654 321" tương đương "0987654321"
+    response = client.get("/api/orders/", headers=admin_headers, params={"search": "+84 987 654 321"})
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    assert any(item["id"] == order["id"] for item in response.json()["items"])
+
+    # Gõ sai một ký tự vẫn tìm được khi bật fuzzy
+    response = client.get("/api/orders/", headers=admin_headers, params={"search": "Nguyễn Văn Tets", "fuzzy": "true"})
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    assert any(item["id"] == order["id"] for item in response.json()["items"])
+
+def test_quote_matches_order_total(client, service):
+    """Kiểm tra báo giá và thành tiền lưu trong đơn hàng được tính giống nhau từ giá dịch vụ"""
+    order_data = get_test_order_data(service)
+    response = client.post("/api/orders/quote", json={
+        "service_id": order_data["service_id"],
+        "quantity": order_data["quantity"],
+        "size": order_data["size"],
+        "material": order_data["material"]
+    })
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    quote = response.json()
+    assert quote["total_price"] > 0
+    assert quote["unit_price"] == round(quote["base_price"] * quote["size_multiplier"] * quote["material_multiplier"], 2)
+
+    response = client.post("/api/orders/", data=order_data)
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    assert response.json()["total_price"] == quote["total_price"]
+
+    response = client.post("/api/orders/quote", json={"service_id": 999999, "quantity": 1})
+    assert response.status_code == 404
+    response = client.post("/api/orders/quote", json={"service_id": order_data["service_id"], "quantity": 0})
+    assert response.status_code == 422
+
+def test_import_orders(client, admin_headers, service):
+    """Kiểm tra nhập đơn hàng từ CSV: mã dịch vụ không tồn tại và email sai được báo theo dòng"""
+    csv_content = (
+        "customer_name,customer_email,customer_phone,service_id,quantity,status,created_at\n"
+        f"Khách nhập file,nhapfile@example.com,0901234567,{service.id},50,completed,2024-05-01 09:30:00\n"
+        f"Khách nhập file,email-sai,0901234567,{service.id},50,,\n"
+        "Khách nhập file,nhapfile@example.com,0901234567,999999,50,,\n"
+    )
+
+    response = client.post(
+        "/api/orders/import",
+        headers=admin_headers,
+        files={"file": ("don_hang.csv", csv_content.encode(), "text/csv")}
+    )
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    data = response.json()
+    assert data["total_rows"] == 3
+    assert data["created"] == 1
+    assert data["failed"] == 2
+    assert [(error["row"], error["field"]) for error in data["errors"]] == [(3, "customer_email"), (4, "service_id")]
+
+    response = client.get("/api/orders/", headers=admin_headers, params={"search": "nhapfile@example.com"})
+    orders = response.json()["items"]
+    assert any(item["status"] == "completed" and item["created_at"].startswith("2024-05-01") for item in orders)
+
+def test_order_status_version_conflict(client, admin_headers, order):
+    """Kiểm tra cập nhật với phiên bản cũ bị từ chối và chuyển trạng thái không hợp lệ trả về 409"""
+    assert order["version"] == 1
+
+    response = client.put(f"/api/orders/{order['id']}", headers=admin_headers, json={"status": "processing", "version": 1})
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    assert response.json()["version"] == 2
+
+    # Admin khác vẫn đang xem phiên bản 1
+    response = client.put(f"/api/orders/{order['id']}", headers=admin_headers, json={"status": "cancelled", "version": 1})
+    assert response.status_code == 409
+
+    response = client.put(f"/api/orders/{order['id']}", headers=admin_headers, json={"status": "completed", "version": 2})
+    assert response.status_code == 200
+
+    # Đơn đã hoàn thành không thể hủy
+    response = client.put(f"/api/orders/{order['id']}", headers=admin_headers, json={"status": "cancelled"})
+    assert response.status_code == 409
+    assert client.get(f"/api/orders/{order['id']}", headers=admin_headers).json()["status"] == "completed"
+
+def test_bulk_update_order_status(client, admin_headers, service):
+    """Kiểm tra chuyển trạng thái hàng loạt với kết quả theo từng đơn hàng"""
+    ids = [client.post("/api/orders/", data=get_test_order_data(service)).json()["id"] for _ in range(3)]
+
+    response = client.put("/api/orders/bulk", headers=admin_headers, json={
+        "status": "processing",
+        "items": [{"id": ids[0]}, {"id": ids[1], "version": 1}, {"id": ids[2], "version": 5}, {"id": 999999}]
+    })
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    data = response.json()
+    assert data["succeeded"] == 2
+    assert [item["status"] for item in data["items"]] == ["updated", "updated", "conflict", "not_found"]
+    assert client.get(f"/api/orders/{ids[1]}", headers=admin_headers).json()["version"] == 2
+
+def test_order_timeline(client, admin_headers, order):
+    """Kiểm tra lịch sử trạng thái đơn hàng và thống kê thời gian xử lý theo dịch vụ"""
+    for target in ("processing", "completed"):
+        response = client.put(f"/api/orders/{order['id']}", headers=admin_headers, json={"status": target})
+        assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+
+    response = client.get(f"/api/orders/{order['id']}/timeline", headers=admin_headers)
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    timeline = response.json()
+    transitions = [(event["from_status"], event["to_status"]) for event in timeline["events"]]
+    assert transitions == [(None, "pending"), ("pending", "processing"), ("processing", "completed")]
+    assert timeline["events"][-1]["version"] == timeline["version"] == 3
+    assert timeline["events"][1]["username"] is not None
+
+    response = client.get("/api/dashboard/order-sla", headers=admin_headers,
+                          params={"service_id": order["service_id"]})
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    stages = {stat["stage"]: stat for stat in response.json()}
+    assert {"pending", "processing", "lead_time"} <= set(stages)
+    assert stages["lead_time"]["count"] >= 1
+
+def test_order_events_published(client, admin_headers, service, published_events):
+    """Kiểm tra tạo đơn và đổi trạng thái (kể cả hàng loạt) phát sự kiện cho luồng SSE"""
+    created = client.post("/api/orders/", data=get_test_order_data(service)).json()
+    client.put(f"/api/orders/{created['id']}", headers=admin_headers, json={"status": "processing"})
+    client.put("/api/orders/bulk", headers=admin_headers, json={"status": "completed", "items": [{"id": created["id"]}]})
+
+    assert [event["type"] for event in published_events] == ["order_created", "order_status_changed", "order_status_changed"]
+    assert published_events[1]["order_id"] == created["id"]
+    assert published_events[1]["previous_status"] == "pending"
+    assert published_events[2]["previous_status"] == "processing"
+
+def test_order_events_requires_admin(client):
+    """Kiểm tra luồng SSE cần token admin"""
+    assert client.get("/api/orders/events").status_code == 401
+    assert client.get("/api/orders/events", params={"token": "khong-hop-le"}).status_code == 401
+
+def read_sse_events(chunks, stop_after: int = 1):
+    """Đọc các sự kiện SSE (bỏ qua retry và ping) cho đến khi đủ `stop_after` sự kiện"""
+    async def read():
+        events = []
+        async for chunk in chunks:
+            current = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if not line.startswith(":"))
+            if "event" in current:
+                events.append({"id": int(current["id"]), "event": current["event"], "data": json.loads(current["data"])})
+                if len(events) >= stop_after:
+                    break
+        return events
+    return asyncio.wait_for(read(), 5)
+
+def test_order_events_stream():
+    """Kiểm tra luồng SSE nhận sự kiện đã phát, phát lại khi kết nối lại với Last-Event-ID"""
+    async def scenario():
+        broker = OrderEventBroker(buffer_size=10)
+        broker._loop = asyncio.get_running_loop()
+        broker._ready.set()
+
+        stream = broker.stream()
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        broker._publish(OrderEvent(1, "order_created", json.dumps({"type": "order_created", "order_id": 7})))
+        broker._publish(OrderEvent(2, "order_status_changed", json.dumps({"type": "order_status_changed", "order_id": 7})))
+        events = await read_sse_events(stream, stop_after=2)
+        await stream.aclose()
+        assert [event["event"] for event in events] == ["order_created", "order_status_changed"]
+        assert broker.stats()["subscribers"] == 0
+
+        # Kết nối lại từ sự kiện đầu tiên: sự kiện đổi trạng thái được phát lại
+        replayed = await read_sse_events(broker.stream(last_event_id=1))
+        assert replayed[0]["id"] == 2
+
+        # Sự kiện đã ra khỏi bộ đệm: client nhận "reset" để tải lại danh sách
+        for event_id in range(3, 15):
+            broker._publish(OrderEvent(event_id, "order_created", json.dumps({"type": "order_created"})))
+        replayed = await read_sse_events(broker.stream(last_event_id=1))
+        assert replayed[0]["event"] == "reset"
+
+    asyncio.run(scenario())
+
+def test_order_events_ticket(client, db, admin_user, admin_headers):
+    """Kiểm tra luồng sự kiện chỉ nhận vé ngắn hạn qua query string, vé không dùng được như access token"""
+    from middlewares.auth_middleware import get_admin_user_header_or_ticket
+
+    response = client.post("/api/orders/events/ticket", headers=admin_headers)
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert get_admin_user_header_or_ticket(None, ticket, db).id == admin_user.id
+
+    # Access token đầy đủ trong query string không còn được nhận
+    access_token = admin_headers["Authorization"].split()[1]
+    assert client.get("/api/orders/events", params={"token": access_token}).status_code == 401
+    assert client.get("/api/orders/events", params={"ticket": access_token}).status_code == 401
+    # Vé không thay được access token cho các endpoint khác
+    assert client.get("/api/orders/", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+    assert client.post("/api/orders/events/ticket").status_code == 401
@@ -0,0 +1,251 @@
+"""
+Kiểm tra kế hoạch thực thi của các truy vấn trong router trên dữ liệu lớn.
+
+Dữ liệu mẫu được tạo trong một transaction riêng (rollback khi xong nên không ảnh hưởng
+database đang dùng), các endpoint được gọi trực tiếp qua TestClient với session dùng chung
+transaction đó. Mọi câu SELECT được ghi lại rồi chạy EXPLAIN với enable_seqscan = off:
+nếu Postgres vẫn phải dùng Seq Scan trên bảng lớn nghĩa là không có index nào phục vụ được
+truy vấn, cần thêm index vào models.py và migration.
+
+test_router_query_budgets dùng cùng dữ liệu để giới hạn số câu truy vấn của mỗi endpoint (phát hiện N+1).
+
+Chạy: pytest tests/test_query_plans.py (database test được tạo từ models trong tests/conftest.py)
+"""
+
+import pytest
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import main
+import routers.services
+from config.database import engine, get_db
+from middlewares.auth_middleware import get_current_user, get_admin_user, get_root_user
+from models.models import User
+from utils.recommendations import RecommendationCache, recommendation_cache
+
+LARGE_TABLES = {
+    "orders", "services", "blogs", "service_reviews", "images",
+    "contacts", "admin_access_logs", "login_history"
+}
+
+# Phân phối gần với thực tế: ít dịch vụ nổi bật, đa số đơn hàng đã hoàn thành
+SEED_SQL = [
+    """
+    INSERT INTO services (name, description, price, category, is_active, featured, created_at, updated_at)
+    SELECT 'Dịch vụ ' || i, 'Mô tả dịch vụ in ấn ' || i, 100000 + i, 'Danh mục ' || (i % 40),
+           i % 10 <> 0, i % 30 = 0, now() - i * interval '1 hour', now()
+    FROM generate_series(1, 3000) AS i
+    """,
+    """
+    INSERT INTO blogs (title, content, category, is_active, created_at, updated_at)
+    SELECT 'Bài viết ' || i, 'Nội dung bài viết ' || i, 'Chuyên mục ' || (i % 25),
+           i % 8 <> 0, now() - i * interval '10 minutes', now()
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO orders (customer_name, customer_email, customer_phone, service_id, quantity, status, created_at, updated_at)
+    SELECT 'Khách hàng ' || i, 'khach' || (i % 9000) || '@example.com', '09' || lpad((i % 100000000)::text, 8, '0'),
+           s.ids[1 + i % array_length(s.ids, 1)], 1 + i % 500,
+           (ARRAY['completed', 'completed', 'completed', 'completed', 'processing', 'pending', 'cancelled'])[1 + i % 7],
+           now() - i * interval '5 minutes', now()
+    FROM generate_series(1, 60000) AS i, (SELECT array_agg(id) AS ids FROM services) AS s
+    """,
+    """
+    INSERT INTO service_reviews (service_id, author_name, is_anonymous, rating, content, created_at)
+    SELECT s.ids[1 + i % array_length(s.ids, 1)], 'Khách ' || i, false, 1 + i % 5, 'Đánh giá ' || i,
+           now() - i * interval '15 minutes'
+    FROM generate_series(1, 30000) AS i, (SELECT array_agg(id) AS ids FROM services) AS s
+    """,
+    """
+    INSERT INTO images (filename, file_path, url, category, is_visible, created_at, updated_at)
+    SELECT 'anh_' || i || '.jpg', 'uploads/anh_' || i || '.jpg', '/uploads/anh_' || i || '.jpg',
+           (ARRAY['portfolio', 'blog', 'service'])[1 + i % 3], i % 6 <> 0, now() - i * interval '7 minutes', now()
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO contacts (name, email, phone, subject, message, status, created_at)
+    SELECT 'Liên hệ ' || i, 'lienhe' || i || '@example.com', '0900000000', 'Báo giá', 'Nội dung ' || i, 'new',
+           now() - i * interval '20 minutes'
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO users (username, email, hashed_password, role, is_active, created_at, updated_at)
+    VALUES ('plan_root', 'plan_root@example.com', '', 'root', true, now(), now()),
+           ('plan_admin', 'plan_admin@example.com', '', 'admin', true, now(), now())
+    """,
+    """
+    INSERT INTO admin_access_logs (user_id, endpoint, method, status_code, ip_address, timestamp, expires_at)
+    SELECT u.id, '/api/orders/', 'GET', 200, '127.0.0.1', now() - i * interval '3 minutes',
+           now() + interval '90 days' - i * interval '3 minutes'
+    FROM generate_series(1, 40000) AS i, users u WHERE u.username = 'plan_admin'
+    """,
+    """
+    INSERT INTO login_history (user_id, login_time, ip_address, user_agent)
+    SELECT u.id, now() - i * interval '30 minutes', '127.0.0.1', 'pytest'
+    FROM generate_series(1, 20000) AS i, users u WHERE u.username = 'plan_admin'
+    """,
+]
+
+# Endpoint cần kiểm tra; {service_id}, {start_date}... được thay bằng giá trị trong dữ liệu mẫu
+ENDPOINTS = [
+    "/api/services/",
+    "/api/services/?is_active=true&featured=true",
+    "/api/services/?is_active=true&category=Danh mục 7",
+    "/api/services/suggested?current_id={service_id}",
+    "/api/services/{service_id}",
+    "/api/services/{service_id}/reviews",
+    "/api/blogs/",
+    "/api/blogs/?is_active=true",
+    "/api/blogs/?category=Chuyên mục 3",
+    "/api/blogs/{blog_id}",
+    "/api/orders/",
+    "/api/orders/?status=pending",
+    "/api/orders/?service_id={service_id}",
+    "/api/orders/?status=processing&start_date={start_date}&end_date={end_date}",
+    "/api/orders/?search=0900012345",
+    "/api/orders/?search=khach123@example",
+    "/api/orders/{order_id}",
+    "/api/images/",
+    "/api/images/?is_visible=true",
+    "/api/images/?category=portfolio",
+    "/api/images/categories/list",
+    "/api/contact/list",
+    "/api/auth/login-history",
+    "/api/dashboard/summary",
+    "/api/dashboard/revenue-by-date",
+    "/api/dashboard/orders-by-service",
+    "/api/search?q=dịch vụ 1234",
+]
+
+# Số câu truy vấn tối đa của mỗi endpoint (gồm cả câu đếm tổng số của danh sách phân trang),
+# không phụ thuộc số dòng trả về. Endpoint không có trong bảng được phép tối đa DEFAULT_QUERY_BUDGET câu.
+DEFAULT_QUERY_BUDGET = 2
+QUERY_BUDGETS = {
+    "/api/orders/{order_id}": 1,
+    "/api/orders/export/csv?status=pending": 1,
+    # Số đơn hàng mới, số dịch vụ, số khách hàng, doanh thu
+    "/api/dashboard/summary": 4,
+}
+
+# Truy vấn bắt buộc đọc toàn bộ bảng theo thiết kế (endpoint -> bảng được phép Seq Scan)
+ALLOWED_SEQ_SCANS = {
+    # Đếm số email khách hàng khác nhau phải đọc mọi đơn hàng
+    "/api/dashboard/summary": {"orders"},
+}
+
+
+@pytest.fixture(scope="module")
+def seeded_connection():
+    connection = engine.connect()
+    transaction = connection.begin()
+    for statement in SEED_SQL:
+        connection.execute(text(statement))
+    for table in LARGE_TABLES:
+        connection.execute(text(f"ANALYZE {table}"))
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="module")
+def client(seeded_connection):
+    # Session dùng chung transaction của dữ liệu mẫu, commit trong router chỉ tạo savepoint
+    session = Session(bind=seeded_connection, join_transaction_mode="create_savepoint")
+    root = session.query(User).filter(User.username == "plan_root").one()
+
+    def override_get_db():
+        yield session
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    for dependency in (get_current_user, get_admin_user, get_root_user):
+        main.app.dependency_overrides[dependency] = lambda: root
+    # Không dùng "with" để bỏ qua các tác vụ startup (gửi email, xây chỉ mục...),
+    # bảng gợi ý dịch vụ được tính và nạp từ dữ liệu mẫu như tác vụ định kỳ
+    cache = RecommendationCache(size=recommendation_cache.size)
+    cache.compute(session)
+    cache.load(session)
+    original_cache, routers.services.recommendation_cache = routers.services.recommendation_cache, cache
+    yield TestClient(main.app)
+    routers.services.recommendation_cache = original_cache
+    main.app.dependency_overrides.clear()
+    session.close()
+
+
+@pytest.fixture(scope="module")
+def sample_ids(seeded_connection):
+    def newest(table):
+        return seeded_connection.execute(text(f"SELECT max(id) FROM {table}")).scalar()
+    return {
+        "service_id": newest("services"),
+        "blog_id": newest("blogs"),
+        "order_id": newest("orders"),
+        "start_date": date.today() - timedelta(days=30),
+        "end_date": date.today()
+    }
+
+
+def find_seq_scans(plan, limited: bool = False) -> set:
+    """
+    Tên các bảng bị Seq Scan trong cây kế hoạch EXPLAIN (FORMAT JSON).
+    Bỏ qua Seq Scan không có điều kiện lọc nằm dưới LIMIT: chỉ đọc vài dòng đầu của bảng.
+    """
+    tables = set()
+    node_type = plan.get("Node Type")
+    if node_type == "Limit":
+        limited = True
+    elif node_type not in ("Seq Scan", "Subquery Scan"):
+        limited = False
+    if node_type == "Seq Scan" and not (limited and "Filter" not in plan):
+        tables.add(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        tables |= find_seq_scans(child, limited)
+    return tables
+
+
+def capture_selects(connection, path: str, client: TestClient):
+    """Gọi endpoint và trả về các câu SELECT (kèm tham số) mà router đã chạy"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200, f"{path} trả về {response.status_code}: {response.text[:200]}"
+    return statements
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_router_queries_use_indexes(client, seeded_connection, sample_ids, endpoint):
+    """Kiểm tra không truy vấn nào của endpoint phải quét tuần tự bảng lớn"""
+    statements = capture_selects(seeded_connection, endpoint.format(**sample_ids), client)
+    assert statements, f"{endpoint} không chạy truy vấn nào"
+
+    allowed = ALLOWED_SEQ_SCANS.get(endpoint, set())
+    problems = []
+    seeded_connection.exec_driver_sql("SET enable_seqscan = off")
+    try:
+        for statement, parameters in statements:
+            plan = seeded_connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            scanned = (find_seq_scans(plan[0]["Plan"]) & LARGE_TABLES) - allowed
+            if scanned:
+                problems.append(f"Seq Scan trên {', '.join(sorted(scanned))}:\n{statement}")
+    finally:
+        seeded_connection.exec_driver_sql("RESET enable_seqscan")
+
+    assert not problems, "\n\n".join(problems)
+
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS + ["/api/orders/export/csv?status=pending"])
+def test_router_query_budgets(client, sample_ids, endpoint, query_budget):
+    """Kiểm tra số câu truy vấn của endpoint không tăng theo số dòng trả về"""
+    with query_budget(QUERY_BUDGETS.get(endpoint, DEFAULT_QUERY_BUDGET)):
+        response = client.get(endpoint.format(**sample_ids))
+    assert response.status_code == 200, f"{endpoint} trả về {response.status_code}: {response.text[:200]}"
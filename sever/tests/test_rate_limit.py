@@ -0,0 +1,60 @@
+from models.models import Contact
+from config.settings import settings
+from utils.rate_limit import MemoryBackend, PostgresBackend, make_rule
+
+TEST_CONTACT = {
+    "name": "Nguyễn Văn Test",
+    "email": "lienhe@example.com",
+    "phone": "0987654321",
+    "subject": "Báo giá in ấn",
+    "message": "Tôi muốn nhận báo giá in danh thiếp"
+}
+
+def test_contact_rate_limited(client, db, rate_limits, monkeypatch, outbox):
+    """Kiểm tra request vượt giới hạn bị trả 429 kèm Retry-After, không ghi gì vào database"""
+    monkeypatch.setattr(rate_limits, "rules", [make_rule("contact", "POST", "/api/contact/submit", "2/60")])
+    before = db.query(Contact).count()
+
+    for _ in range(2):
+        assert client.post("/api/contact/submit", json=TEST_CONTACT).status_code == 200
+
+    response = client.post("/api/contact/submit", json=TEST_CONTACT, headers={"Origin": "https://phulong.com"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
+    # Frontend khác origin đọc được Retry-After
+    assert "retry-after" in response.headers["Access-Control-Expose-Headers"].lower()
+    assert db.query(Contact).count() == before + 2
+
+    # Route khác không bị ảnh hưởng
+    assert client.get("/api/services/").status_code == 200
+
+    # Sau proxy tin cậy, IP lấy từ X-Forwarded-For: client khác vẫn gửi được
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+    response = client.post("/api/contact/submit", json=TEST_CONTACT, headers={"X-Forwarded-For": "203.0.113.7"})
+    assert response.status_code == 200
+
+def test_memory_bucket_refill():
+    """Kiểm tra bucket hồi token theo thời gian"""
+    now = [0.0]
+    backend = MemoryBackend(clock=lambda: now[0])
+    rule = make_rule("reviews", "POST", "/api/services/{service_id}/reviews", "2/60")
+
+    assert backend.hit("reviews:1.2.3.4", rule) == 0
+    assert backend.hit("reviews:1.2.3.4", rule) == 0
+    assert backend.hit("reviews:1.2.3.4", rule) == 30
+    assert backend.hit("reviews:5.6.7.8", rule) == 0
+
+    now[0] = 30
+    assert backend.hit("reviews:1.2.3.4", rule) == 0
+    assert backend.hit("reviews:1.2.3.4", rule) == 30
+
+def test_postgres_backend(connection):
+    """Kiểm tra bucket dùng chung trong bảng rate_limit_buckets"""
+    backend = PostgresBackend()
+    rule = make_rule("orders", "POST", "/api/orders/", "2/60")
+
+    assert backend.hit("orders:1.2.3.4", rule) == 0
+    assert backend.hit("orders:1.2.3.4", rule) == 0
+    assert 29 < backend.hit("orders:1.2.3.4", rule) <= 30
+    assert backend.hit("orders:5.6.7.8", rule) == 0
+    assert backend.prune(3600) == 0
@@ -0,0 +1,66 @@
+def create_searchable_service(client, headers):
+    """Tạo dịch vụ có từ khóa riêng để tìm kiếm"""
+    response = client.post(
+        "/api/services/",
+        headers=headers,
+        json={
+            "name": "In thiệp cưới cao cấp",
+            "description": "Thiệp cưới ép kim, giấy mỹ thuật",
+            "price": 5000,
+            "is_active": True
+        }
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_search_without_diacritics(client, admin_headers):
+    """Kiểm tra tìm kiếm không dấu vẫn khớp nội dung có dấu"""
+    service_id = create_searchable_service(client, admin_headers)
+
+    response = client.get("/api/search", params={"q": "thiep cuoi"})
+
+    assert response.status_code == 200
+    data = response.json()
+    ids = [(item["kind"], item["id"]) for item in data["items"]]
+    assert ("service", service_id) in ids
+
+    item = next(item for item in data["items"] if item["id"] == service_id and item["kind"] == "service")
+    assert "<mark>" in item["title_highlight"]
+
+def test_search_cursor_pagination(client, admin_headers):
+    """Kiểm tra phân trang bằng cursor không trả trùng kết quả"""
+    create_searchable_service(client, admin_headers)
+    create_searchable_service(client, admin_headers)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "thiệp cưới", "limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/search", params=params).json()
+        seen.extend((item["kind"], item["id"]) for item in data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) >= 2
+    assert len(seen) == len(set(seen))
+
+def test_search_invalid_cursor(client):
+    """Kiểm tra cursor không hợp lệ"""
+    response = client.get("/api/search", params={"q": "in", "cursor": "khong-hop-le"})
+    assert response.status_code == 400
+
+def test_suggest_updates_after_write(client, admin_headers):
+    """Kiểm tra gợi ý được cập nhật ngay khi tạo và xóa dịch vụ"""
+    service_id = create_searchable_service(client, admin_headers)
+
+    response = client.get("/api/search/suggest", params={"prefix": "thiep cu"})
+    assert response.status_code == 200
+    assert any(item["kind"] == "service" and item["id"] == service_id for item in response.json())
+
+    client.delete(f"/api/services/{service_id}", headers=admin_headers)
+
+    response = client.get("/api/search/suggest", params={"prefix": "thiep cu"})
+    assert all(item["id"] != service_id for item in response.json())
@@ -1,11 +1,4 @@
-import requests
-import pytest
-import json
-from tests.test_auth import API_URL, ROOT_USERNAME, ROOT_PASSWORD, test_login_root
-
-# Biến lưu trữ token và ID dịch vụ test
-admin_token = None
-test_service_id = None
+from tests import factories
 
 # Dữ liệu test
 TEST_SERVICE = {
@@ -20,51 +13,15 @@ UPDATE_SERVICE = {
     "price": 300000
 }
 
-def get_admin_token():
-    """Lấy token admin cho test"""
-    global admin_token
-    
-    # Nếu chưa có token, đăng nhập
-    if not admin_token:
-        # Đăng nhập với tài khoản admin
-        response = requests.post(
-            f"{API_URL}/auth/login-json",
-            json={
-                "username": "test_admin",
-                "password": "test123456"
-            }
-        )
-        
-        # Nếu đăng nhập thất bại, thử với root
-        if response.status_code != 200:
-            response = requests.post(
-                f"{API_URL}/auth/login-json",
-                json={
-                    "username": ROOT_USERNAME,
-                    "password": ROOT_PASSWORD
-                }
-            )
-        
-        assert response.status_code == 200
-        admin_token = response.json()["access_token"]
-    
-    return admin_token
-
-def test_create_service():
+def test_create_service(client, admin_headers):
     """Kiểm tra tạo dịch vụ mới"""
-    global test_service_id
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API tạo dịch vụ
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(
-        f"{API_URL}/services/",
-        headers=headers,
+    response = client.post(
+        "/api/services/",
+        headers=admin_headers,
         json=TEST_SERVICE
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
@@ -73,90 +30,197 @@ def test_create_service():
     assert data["price"] == TEST_SERVICE["price"]
     assert data["is_active"] == TEST_SERVICE["is_active"]
     assert "id" in data
-    
-    # Lưu ID dịch vụ cho các test sau
-    test_service_id = data["id"]
 
-def test_get_all_services():
+    # Không có token thì không được tạo
+    assert client.post("/api/services/", json=TEST_SERVICE).status_code == 401
+
+def test_get_all_services(client, service):
     """Kiểm tra lấy danh sách dịch vụ"""
     # Gọi API lấy danh sách dịch vụ
-    response = requests.get(f"{API_URL}/services/")
-    
+    response = client.get("/api/services/")
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
+    assert any(item["id"] == service.id for item in data)
 
-def test_get_service_by_id():
+def test_get_service_by_id(client, service):
     """Kiểm tra lấy chi tiết dịch vụ theo ID"""
-    global test_service_id
-    
-    # Đảm bảo đã có ID dịch vụ test
-    if not test_service_id:
-        test_create_service()
-    
     # Gọi API lấy chi tiết dịch vụ
-    response = requests.get(f"{API_URL}/services/{test_service_id}")
-    
+    response = client.get(f"/api/services/{service.id}")
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_service_id
-    assert data["name"] == TEST_SERVICE["name"]
+    assert data["id"] == service.id
+    assert data["name"] == service.name
 
-def test_update_service():
+def test_update_service(client, admin_headers, service):
     """Kiểm tra cập nhật dịch vụ"""
-    global test_service_id
-    
-    # Đảm bảo đã có ID dịch vụ test
-    if not test_service_id:
-        test_create_service()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API cập nhật dịch vụ
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.put(
-        f"{API_URL}/services/{test_service_id}",
-        headers=headers,
+    response = client.put(
+        f"/api/services/{service.id}",
+        headers=admin_headers,
         json=UPDATE_SERVICE
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == test_service_id
+    assert data["id"] == service.id
     assert data["name"] == UPDATE_SERVICE["name"]
     assert data["price"] == UPDATE_SERVICE["price"]
-    
-def test_delete_service():
+
+def test_delete_service(client, admin_headers, service):
     """Kiểm tra xóa dịch vụ"""
-    global test_service_id
-    
-    # Đảm bảo đã có ID dịch vụ test
-    if not test_service_id:
-        test_create_service()
-    
-    # Lấy token admin
-    token = get_admin_token()
-    
     # Gọi API xóa dịch vụ
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.delete(
-        f"{API_URL}/services/{test_service_id}",
-        headers=headers
+    response = client.delete(
+        f"/api/services/{service.id}",
+        headers=admin_headers
     )
-    
+
     # Kiểm tra kết quả
     assert response.status_code == 204
+    assert client.get(f"/api/services/{service.id}").status_code == 404
 
-if __name__ == "__main__":
-    # Chạy các test theo thứ tự
-    test_create_service()
-    test_get_all_services()
-    test_get_service_by_id()
-    test_update_service()
-    test_delete_service()
-    
-    print("Tất cả test services đã pass!") 
\ No newline at end of file
+def test_review_aggregates_and_pagination(client, service):
+    """Kiểm tra tổng hợp đánh giá trên dịch vụ và phân trang đánh giá bằng cursor"""
+    for rating in [5, 4, 5]:
+        response = client.post(
+            f"/api/services/{service.id}/reviews",
+            json={"rating": rating, "content": "Dịch vụ tốt"}
+        )
+        assert response.status_code == 200
+
+    data = client.get(f"/api/services/{service.id}").json()
+    assert data["rating_count"] == 3
+    assert data["rating_sum"] == 14
+    assert data["rating_average"] == 4.67
+    assert data["rating_histogram"]["5"] == 2
+
+    # Trang 2 đánh giá, trang sau lấy bằng next_cursor trong body
+    data = client.get(f"/api/services/{service.id}/reviews", params={"limit": 2}).json()
+    assert len(data["items"]) == 2
+    data = client.get(f"/api/services/{service.id}/reviews", params={"limit": 2, "cursor": data["next_cursor"]}).json()
+    assert len(data["items"]) == 1
+    assert data["next_cursor"] is None
+
+def test_get_suggested_services(client, db, monkeypatch):
+    """Kiểm tra gợi ý dịch vụ liên quan: dịch vụ cùng khách đặt trước, rồi cùng danh mục, không chứa chính nó"""
+    import routers.services
+    from utils.recommendations import RecommendationCache
+
+    current = factories.create_service(db, category="Danh thiếp")
+    co_ordered = factories.create_service(db, category="Tờ rơi")
+    same_category = [factories.create_service(db, category="Danh thiếp") for _ in range(2)]
+    for _ in range(3):
+        factories.create_service(db, category="Khác")
+    for email in ["khach_a@example.com", "khach_b@example.com"]:
+        factories.create_order(db, current, customer_email=email)
+        factories.create_order(db, co_ordered, customer_email=email)
+
+    cache = RecommendationCache(size=4)
+    monkeypatch.setattr(routers.services, "recommendation_cache", cache)
+    cache.refresh()
+
+    response = client.get("/api/services/suggested", params={"current_id": current.id})
+
+    assert response.status_code == 200
+    ids = [service["id"] for service in response.json()]
+    assert len(ids) == 4
+    assert current.id not in ids
+    assert ids[0] == co_ordered.id
+    assert set(ids[1:3]) == {service.id for service in same_category}
+
+def test_bulk_services(client, admin_headers):
+    """Kiểm tra tạo, cập nhật và xóa dịch vụ hàng loạt với kết quả theo từng phần tử"""
+    response = client.post("/api/services/bulk", headers=admin_headers, json={"items": [TEST_SERVICE] * 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == 3
+    ids = [item["id"] for item in data["items"]]
+
+    # ID không tồn tại được báo riêng, các phần tử khác vẫn được cập nhật
+    response = client.put(
+        "/api/services/bulk",
+        headers=admin_headers,
+        json={"items": [{"id": service_id, "price": 123000} for service_id in ids] + [{"id": 999999, "price": 1}]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == 3
+    assert data["items"][-1]["status"] == "not_found"
+    assert client.get(f"/api/services/{ids[0]}").json()["price"] == 123000
+
+    response = client.request("DELETE", "/api/services/bulk", headers=admin_headers, json={"ids": ids})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 3
+    assert client.get(f"/api/services/{ids[0]}").status_code == 404
+
+def test_import_services(client, admin_headers):
+    """Kiểm tra nhập bảng giá từ CSV: dòng lỗi được báo cáo, dịch vụ trùng tên được cập nhật"""
+    name = "Dịch vụ nhập file"
+    csv_content = (
+        "Tên dịch vụ;Mô tả;Giá;Danh mục\n"
+        f"{name};In từ file;150000;Nhập file\n"
+        f"{name} 2;Giá sai;không rõ;Nhập file\n"
+    )
+
+    # Chạy thử: có báo cáo nhưng không ghi vào database
+    response = client.post(
+        "/api/services/import",
+        headers=admin_headers,
+        params={"dry_run": "true"},
+        files={"file": ("bang_gia.csv", csv_content.encode("utf-8-sig"), "text/csv")}
+    )
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    data = response.json()
+    assert data["dry_run"] is True
+    assert data["total_rows"] == 2
+    assert data["created"] == 1
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 3
+    assert data["errors"][0]["field"] == "price"
+
+    response = client.post(
+        "/api/services/import",
+        headers=admin_headers,
+        files={"file": ("bang_gia.csv", csv_content.encode("utf-8-sig"), "text/csv")}
+    )
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    assert response.json()["created"] == 1
+
+    # Nhập lại cùng tên với giá mới: cập nhật, không tạo thêm
+    response = client.post(
+        "/api/services/import",
+        headers=admin_headers,
+        files={"file": ("bang_gia.csv", f"name,price\n{name},175000\n".encode(), "text/csv")}
+    )
+    assert response.status_code == 200, f"API trả về lỗi: {response.text}"
+    data = response.json()
+    assert data["created"] == 0
+    assert data["updated"] == 1
+
+    services = [service for service in client.get("/api/services/", params={"limit": 1000}).json()
+                if service["name"] == name]
+    assert len(services) == 1
+    assert services[0]["price"] == 175000
+    assert services[0]["description"] == "In từ file"
+
+def test_get_suggested_services_before_cache_loaded(client, db, monkeypatch):
+    """Kiểm tra worker chưa nạp bảng gợi ý vẫn trả về dịch vụ nổi bật, đang hoạt động"""
+    import routers.services
+    from utils.recommendations import RecommendationCache
+
+    monkeypatch.setattr(routers.services, "recommendation_cache", RecommendationCache(size=4))
+    current = factories.create_service(db, featured=True)
+    featured = factories.create_service(db, featured=True)
+    factories.create_service(db, featured=True, is_active=False)
+    others = [factories.create_service(db) for _ in range(4)]
+
+    response = client.get("/api/services/suggested", params={"current_id": current.id})
+
+    assert response.status_code == 200
+    ids = [service["id"] for service in response.json()]
+    assert ids == [featured.id] + [service.id for service in others[:3]]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from utils.async_email import AsyncEmailSender, QueuedEmail
+from utils.tracing import Span, SpanExporter, tracer
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Bật tracing trong test, các span kết thúc được ghi vào danh sách thay vì gửi cho exporter"""
+    spans = []
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(tracer.exporter, "submit", spans.append)
+    return spans
+
+def test_request_id_propagation(client):
+    """Kiểm tra request_id được trả lại, không có traceparent khi tắt tracing"""
+    response = client.get("/api/services/", headers={"X-Request-ID": "test-tracing-1"})
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "test-tracing-1"
+    assert "traceparent" not in response.headers
+
+def test_trace_context_propagation(client, service, spans):
+    """Kiểm tra trace_id của client được giữ nguyên, câu SQL là span con của span request"""
+    response = client.get(f"/api/services/{service.id}", headers={
+        "X-Request-ID": "test-tracing-2",
+        "traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+    })
+    assert response.status_code == 200
+
+    version, trace_id, span_id, flags = response.headers["traceparent"].split("-")
+    assert trace_id == TRACE_ID
+    assert span_id != "00f067aa0ba902b7"
+    assert flags == "01"
+
+    server = next(span for span in spans if span.name == "GET /api/services/{service_id}")
+    assert server.span_id == span_id
+    assert server.parent_id == "00f067aa0ba902b7"
+    queries = [span for span in spans if span.name == "db.query"]
+    assert queries and all(span.parent_id == span_id and span.trace_id == TRACE_ID for span in queries)
+
+def test_exporter_queue_is_bounded():
+    """Kiểm tra span bị bỏ (và được đếm) khi hàng đợi xuất đầy thay vì làm tăng bộ nhớ"""
+    exporter = SpanExporter(max_queue_size=2)
+    for _ in range(3):
+        exporter.submit(Span(TRACE_ID, None, "db.query", 3))
+    assert exporter.dropped == 1
+
+def test_queued_email_joins_request_trace(spans):
+    """Kiểm tra email gửi từ hàng đợi bất đồng bộ nằm trong trace của request đã tạo ra nó"""
+    class FakeSMTP:
+        is_connected = True
+
+        async def sendmail(self, *args):
+            pass
+
+    async def scenario():
+        sender = AsyncEmailSender(concurrency=1)
+        with tracer.span("POST /api/contact/submit", root=True) as request_span:
+            sender.enqueue(QueuedEmail("admin@phulong.com", "Liên hệ mới", "<p>Nội dung</p>"))
+        # Lấy email trước khi worker kịp chạy rồi gửi ngoài request, như worker gửi email
+        email = sender._queue.get_nowait()
+        sender._queue.task_done()
+        await sender.send(email, FakeSMTP())
+        await sender.stop()
+        return request_span
+
+    request_span = asyncio.run(scenario())
+    smtp_span = next(span for span in spans if span.name == "smtp.send")
+    assert smtp_span.trace_id == request_span.trace_id
+    assert smtp_span.parent_id == request_span.span_id
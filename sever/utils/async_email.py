@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import aiosmtplib
+
+from config.settings import settings
+from utils.email import build_message
+from utils.email_templates import render_email, render_fragments
+from utils.tracing import tracer, KIND_CLIENT
+
+
+class QueuedEmail(NamedTuple):
+    to_email: str
+    subject: str
+    html: str
+    text: Optional[str] = None
+    # (trace_id, span_id) của request đưa email vào hàng đợi, span smtp.send được nối vào trace đó
+    trace: Optional[Tuple[str, str]] = None
+
+
+class AsyncEmailSender:
+    """
+    Gửi email bằng asyncio thay vì chiếm thread của threadpool.
+    - Tối đa `concurrency` phiên SMTP chạy song song (semaphore), mỗi worker giữ một phiên mở sẵn
+    - Hàng đợi có giới hạn: khi đầy, email thông báo liên hệ được gộp thành một email tổng hợp
+      cho mỗi `digest_size` liên hệ, các email khác bị bỏ (shed) và được đếm lại
+    """
+
+    def __init__(self, concurrency: int = 2, queue_size: int = 100, digest_size: int = 20):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.digest_size = digest_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._workers: List[asyncio.Task] = []
+        # Phiên SMTP đang mở của từng worker (theo số thứ tự worker), đóng khi stop()
+        self._clients: Dict[int, aiosmtplib.SMTP] = {}
+        self._pending_contacts: List[Dict[str, Any]] = []
+        self.sent = 0
+        self.failed = 0
+        self.shed = 0
+        self.coalesced = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def _ensure_queue(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def start(self):
+        if self.running:
+            return
+        self._ensure_started()
+        logging.info(f"Khởi động {self.concurrency} worker gửi email bất đồng bộ")
+
+    async def stop(self, timeout: float = 10):
+        """Gửi nốt các email còn trong hàng đợi (tối đa `timeout` giây) rồi dừng worker"""
+        if not self.running:
+            return
+        self._flush_contacts()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dừng gửi email khi còn {self._queue.qsize()} email trong hàng đợi")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.quit()
+            except Exception:
+                # Phiên đã bị máy chủ đóng hoặc lỗi khi QUIT: không còn gì để đóng
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending_contacts": len(self._pending_contacts),
+            "sent": self.sent,
+            "failed": self.failed,
+            "shed": self.shed,
+            "coalesced": self.coalesced
+        }
+
+    def _ensure_started(self):
+        # Tạo sẵn hàng đợi để enqueue ngay được, worker khởi động ở vòng lặp kế tiếp
+        self._ensure_queue()
+        if not self.running:
+            loop = asyncio.get_running_loop()
+            self._workers = [loop.create_task(self._worker(index)) for index in range(self.concurrency)]
+
+    def enqueue(self, email: QueuedEmail) -> bool:
+        """Đưa email vào hàng đợi, không chờ. Trả về False nếu hàng đợi đầy và email bị bỏ."""
+        self._ensure_started()
+        if email.trace is None:
+            email = email._replace(trace=tracer.current_context())
+        try:
+            self._queue.put_nowait(email)
+            return True
+        except asyncio.QueueFull:
+            self.shed += 1
+            logging.warning(f"Hàng đợi email đầy, bỏ email '{email.subject}' đến {email.to_email}")
+            return False
+
+    def enqueue_contact(self, context: Dict[str, Any]):
+        """
+        Thông báo liên hệ mới cho admin. Gửi từng email khi hàng đợi còn chỗ,
+        gộp thành email tổng hợp khi hàng đợi đầy.
+        """
+        self._ensure_started()
+        if not self._pending_contacts and not self._queue.full():
+            rendered = render_email("contact_notification", context)
+            self._queue.put_nowait(QueuedEmail(settings.ADMIN_EMAIL, *rendered, trace=tracer.current_context()))
+            return
+
+        self._pending_contacts.append(context)
+        self.coalesced += 1
+        if len(self._pending_contacts) >= self.digest_size:
+            self._flush_contacts()
+
+    def _flush_contacts(self):
+        """Gộp các liên hệ đang chờ thành một email tổng hợp"""
+        if not self._pending_contacts:
+            return
+        contacts, self._pending_contacts = self._pending_contacts, []
+        contacts_html, contacts_text = render_fragments("contact_item", contacts)
+        rendered = render_email("contact_digest", {
+            "count": len(contacts),
+            "contacts_html": contacts_html,
+            "contacts_text": contacts_text
+        })
+        email = QueuedEmail(settings.ADMIN_EMAIL, *rendered)
+        try:
+            self._queue.put_nowait(email)
+        except asyncio.QueueFull:
+            # Email tổng hợp được ưu tiên hơn: chờ chỗ trống thay vì bỏ
+            asyncio.get_running_loop().create_task(self._queue.put(email))
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            start_tls=settings.SMTP_USE_TLS,
+            timeout=settings.SMTP_TIMEOUT
+        )
+        await client.connect()
+        if settings.SMTP_USERNAME:
+            await client.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return client
+
+    async def send(self, email: QueuedEmail, client: Optional[aiosmtplib.SMTP] = None) -> Optional[aiosmtplib.SMTP]:
+        """
+        Gửi một email (giới hạn bởi semaphore), dùng lại phiên `client` nếu còn kết nối.
+        Trả về phiên đang mở để lần gửi sau dùng tiếp.
+        """
+        message = build_message(email.to_email, email.subject, email.html, email.text)
+        async with self._semaphore:
+            with tracer.span("smtp.send", {"smtp.host": settings.SMTP_SERVER, "email.count": 1}, KIND_CLIENT,
+                             root=True, parent=email.trace):
+                for attempt in range(2):
+                    try:
+                        if client is None or not client.is_connected:
+                            client = await self._connect()
+                        await client.sendmail(settings.SMTP_USERNAME, [email.to_email], message)
+                        self.sent += 1
+                        return client
+                    except aiosmtplib.SMTPServerDisconnected:
+                        client = None
+                        if attempt:
+                            raise
+                        logging.warning("Phiên SMTP bất đồng bộ bị ngắt, mở phiên mới")
+
+    async def _worker(self, index: int):
+        client = None
+        while True:
+            email = await self._queue.get()
+            try:
+                client = await self.send(email, client)
+                logging.info(f"Email đã được gửi thành công đến {email.to_email}")
+            except Exception as e:
+                self.failed += 1
+                client = None
+                logging.error(f"Lỗi khi gửi email đến {email.to_email}: {str(e)}")
+            finally:
+                self._queue.task_done()
+            if client is None:
+                self._clients.pop(index, None)
+            else:
+                self._clients[index] = client
+
+            # Hàng đợi đã rảnh thì gửi luôn các liên hệ đang chờ gộp
+            if self._queue.empty():
+                self._flush_contacts()
+
+
+async_mailer = AsyncEmailSender(
+    concurrency=settings.SMTP_ASYNC_CONCURRENCY,
+    queue_size=settings.SMTP_ASYNC_QUEUE_SIZE,
+    digest_size=settings.CONTACT_DIGEST_SIZE
+)
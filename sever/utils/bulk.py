@@ -0,0 +1,68 @@
+"""
+Thao tác hàng loạt cho các endpoint /bulk: mỗi thao tác chỉ gồm vài câu lệnh SQL
+(INSERT nhiều dòng, UPDATE theo khóa chính dạng executemany, DELETE ... RETURNING)
+trong transaction của session. Router tự commit rồi chạy các bước phụ (chỉ mục gợi ý, xóa file).
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from schemas.schemas import BulkItemStatus
+
+
+SUCCEEDED_STATUSES = {BulkItemStatus.CREATED, BulkItemStatus.UPDATED, BulkItemStatus.DELETED}
+
+
+def bulk_result(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    failed = sum(1 for item in items if item["status"] not in SUCCEEDED_STATUSES)
+    return {"succeeded": len(items) - failed, "failed": failed, "items": items}
+
+
+def bulk_create(db: Session, model, items: List[BaseModel]) -> List[int]:
+    """INSERT tất cả phần tử bằng một câu lệnh nhiều dòng, trả về id theo đúng thứ tự gửi lên"""
+    rows = [item.model_dump() for item in items]
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.scalars(statement, rows))
+
+
+def existing_ids(db: Session, model, ids: List[int]) -> Set[int]:
+    return set(db.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+def bulk_update(db: Session, model, items: List[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    Cập nhật theo khóa chính, chỉ các trường được gửi lên (khác None).
+    SQLAlchemy gom các phần tử có cùng tập trường thành một lệnh executemany.
+    """
+    found = existing_ids(db, model, [item.id for item in items])
+    now = datetime.utcnow()
+    rows, results = [], []
+    for index, item in enumerate(items):
+        if item.id not in found:
+            results.append({"index": index, "id": item.id, "status": BulkItemStatus.NOT_FOUND,
+                            "detail": f"Không tồn tại bản ghi với ID {item.id}"})
+            continue
+        values = item.model_dump(exclude_none=True)
+        if hasattr(model, "updated_at"):
+            values["updated_at"] = now
+        rows.append(values)
+        results.append({"index": index, "id": item.id, "status": BulkItemStatus.UPDATED})
+    if rows:
+        db.execute(update(model), rows)
+    return results
+
+
+def bulk_delete(db: Session, model, ids: List[int]) -> List[Dict[str, Any]]:
+    """Xóa bằng một câu DELETE ... RETURNING, id không tồn tại được báo lỗi riêng"""
+    deleted = set(db.scalars(delete(model).where(model.id.in_(ids)).returning(model.id)))
+    return [
+        {"index": index, "id": item_id, "status": BulkItemStatus.DELETED}
+        if item_id in deleted else
+        {"index": index, "id": item_id, "status": BulkItemStatus.NOT_FOUND,
+         "detail": f"Không tồn tại bản ghi với ID {item_id}"}
+        for index, item_id in enumerate(ids)
+    ]
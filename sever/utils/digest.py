@@ -0,0 +1,118 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from utils.async_email import QueuedEmail, async_mailer
+from utils.email import order_email_context
+from utils.email_templates import render_email, render_fragments
+
+
+class AdminDigest:
+    """
+    Gom thông báo đơn hàng mới và liên hệ mới cho admin thành một email tổng hợp
+    sau mỗi khoảng `window_seconds` (flush được gọi định kỳ từ main.py).
+    - Sự kiện được đánh dấu khẩn (urgent) vẫn gửi ngay
+    - window_seconds <= 0 tắt chế độ tổng hợp, mọi thông báo gửi ngay như trước
+    - Giữ tối đa `max_events` sự kiện, phần vượt chỉ được đếm và ghi chú trong email
+
+    Mỗi tiến trình (worker uvicorn) có bộ đệm riêng nên sẽ gửi digest riêng.
+    """
+
+    def __init__(self, window_seconds: int, max_events: int = 500, urgent_quantity: int = 0,
+                 urgent_keywords: Optional[List[str]] = None):
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self.urgent_quantity = urgent_quantity
+        self.urgent_keywords = [k.strip().lower() for k in (urgent_keywords or []) if k.strip()]
+        self._orders: List[Dict[str, Any]] = []
+        self._contacts: List[Dict[str, Any]] = []
+        self._dropped = 0
+        self._window_start = datetime.now()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def _has_urgent_keyword(self, *texts: Optional[str]) -> bool:
+        content = " ".join(t for t in texts if t).lower()
+        return any(keyword in content for keyword in self.urgent_keywords)
+
+    def is_urgent_order(self, order) -> bool:
+        if self.urgent_quantity and (order.quantity or 0) >= self.urgent_quantity:
+            return True
+        return self._has_urgent_keyword(order.notes)
+
+    def is_urgent_contact(self, context: Dict[str, Any]) -> bool:
+        return self._has_urgent_keyword(context.get("subject"), context.get("message"))
+
+    def _buffer(self, items: List[Dict[str, Any]], context: Dict[str, Any]):
+        with self._lock:
+            if len(self._orders) + len(self._contacts) >= self.max_events:
+                self._dropped += 1
+            else:
+                items.append(context)
+
+    def add_order(self, order, service, urgent: bool = False):
+        """Ghi nhận đơn hàng mới: gửi ngay nếu khẩn hoặc tắt digest, ngược lại đưa vào bộ đệm"""
+        context = order_email_context(order, service)
+        if not self.enabled or urgent or self.is_urgent_order(order):
+            rendered = render_email("admin_new_order", context)
+            async_mailer.enqueue(QueuedEmail(settings.ADMIN_EMAIL, *rendered))
+            return
+        self._buffer(self._orders, context)
+
+    def add_contact(self, context: Dict[str, Any], urgent: bool = False):
+        """Ghi nhận liên hệ mới: gửi ngay nếu khẩn hoặc tắt digest, ngược lại đưa vào bộ đệm"""
+        if not self.enabled or urgent or self.is_urgent_contact(context):
+            async_mailer.enqueue_contact(context)
+            return
+        self._buffer(self._contacts, context)
+
+    def build(self) -> Optional[QueuedEmail]:
+        """
+        Lấy các sự kiện trong cửa sổ hiện tại và dựng email tổng hợp, None nếu không có gì để gửi.
+        Không đụng tới hàng đợi email nên gọi được từ thread pool (render template không chặn vòng lặp asyncio).
+        """
+        with self._lock:
+            orders, self._orders = self._orders, []
+            contacts, self._contacts = self._contacts, []
+            dropped, self._dropped = self._dropped, 0
+            window_start, self._window_start = self._window_start, datetime.now()
+
+        if not orders and not contacts and not dropped:
+            return None
+
+        orders_html, orders_text = render_fragments("order_item", orders)
+        contacts_html, contacts_text = render_fragments("contact_item", contacts)
+        rendered = render_email("admin_digest", {
+            "window_start": window_start.strftime('%H:%M %d/%m/%Y'),
+            "window_end": datetime.now().strftime('%H:%M %d/%m/%Y'),
+            "order_count": len(orders),
+            "contact_count": len(contacts),
+            "orders_html": orders_html,
+            "orders_text": orders_text,
+            "contacts_html": contacts_html,
+            "contacts_text": contacts_text,
+            "dropped_note": f"Và {dropped} sự kiện khác không được liệt kê." if dropped else ""
+        })
+        logging.info(f"Gửi email tổng hợp: {len(orders)} đơn hàng, {len(contacts)} liên hệ")
+        return QueuedEmail(settings.ADMIN_EMAIL, *rendered)
+
+    def flush(self) -> bool:
+        """Gửi email tổng hợp cho các sự kiện trong cửa sổ hiện tại. Trả về False nếu không có gì để gửi."""
+        email = self.build()
+        if email is None:
+            return False
+        async_mailer.enqueue(email)
+        return True
+
+
+admin_digest = AdminDigest(
+    window_seconds=settings.ADMIN_DIGEST_WINDOW_SECONDS,
+    max_events=settings.ADMIN_DIGEST_MAX_EVENTS,
+    urgent_quantity=settings.ADMIN_DIGEST_URGENT_QUANTITY,
+    urgent_keywords=settings.ADMIN_DIGEST_URGENT_KEYWORDS.split(",")
+)
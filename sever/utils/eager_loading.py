@@ -0,0 +1,35 @@
+"""
+Cách nạp quan hệ theo schema trả về.
+
+Schema có trường lồng (OrderOut.service, ImageOut.uploader) sẽ đọc quan hệ tương ứng khi serialize;
+nếu để nạp lazy thì mỗi dòng của danh sách tốn thêm một câu SELECT. Bảng EAGER_LOADS khai báo
+quan hệ cần nạp sẵn cho từng schema để danh sách và chi tiết có số câu truy vấn cố định:
+- joinedload cho quan hệ nhiều-một (một dòng liên quan, gộp vào cùng câu SELECT bằng LEFT JOIN)
+- selectinload cho quan hệ một-nhiều (một câu SELECT ... WHERE id IN (...) cho cả trang)
+
+Thêm trường lồng mới vào schema thì khai báo quan hệ tương ứng ở đây.
+"""
+
+from typing import Dict, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Query, joinedload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from models.models import Image, Order
+from schemas.schemas import ImageOut, OrderOut
+
+EAGER_LOADS: Dict[Type[BaseModel], Tuple[LoaderOption, ...]] = {
+    OrderOut: (joinedload(Order.service),),
+    ImageOut: (joinedload(Image.uploader),),
+}
+
+
+def loader_options(schema: Type[BaseModel]) -> Tuple[LoaderOption, ...]:
+    """Các option nạp quan hệ cho schema (rỗng nếu schema không có trường lồng)"""
+    return EAGER_LOADS.get(schema, ())
+
+
+def eager_load(query: Query, schema: Type[BaseModel]) -> Query:
+    """Áp dụng cách nạp quan hệ của schema vào query"""
+    return query.options(*loader_options(schema))
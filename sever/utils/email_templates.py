@@ -0,0 +1,281 @@
+"""
+Bộ template email biên dịch sẵn.
+
+Mỗi template gồm hai file trong templates/email/:
+- <tên>.html: phần HTML, CSS trong <style> được inline vào thuộc tính style lúc biên dịch
+- <tên>.txt: phần văn bản thuần, dòng đầu "Subject: ..." là tiêu đề email
+
+File bắt đầu bằng "_" là đoạn template (fragment) không có tiêu đề, dùng để render danh sách
+(ví dụ từng dòng trong email tổng hợp) rồi chèn vào template chính qua SafeHTML.
+
+Biến được viết dạng {{ ten_bien }}. Template được đọc và biên dịch một lần khi khởi động
+(load_templates), sau đó mỗi lần render chỉ còn ghép chuỗi nên rất nhanh.
+Sửa nội dung email chỉ cần sửa file template, không cần sửa code.
+"""
+
+import html
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "email")
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+_STYLE_BLOCK_RE = re.compile(r"<style[^>]*>(.*?)</style>", re.IGNORECASE | re.DOTALL)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_TAG_RE = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>")
+_ATTR_RE = re.compile(r"""\s(class|style)\s*=\s*("([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_SIMPLE_SELECTOR_RE = re.compile(r"^([A-Za-z][A-Za-z0-9]*)?((?:\.[A-Za-z0-9_-]+)*)$")
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+
+
+class SafeHTML(str):
+    """Chuỗi HTML đã được render sẵn, không escape lại khi chèn vào template"""
+
+
+class CompiledTemplate:
+    """Template đã tách sẵn thành các đoạn chữ cố định và tên biến"""
+
+    __slots__ = ("parts", "fields")
+
+    def __init__(self, source: str):
+        # parts xen kẽ: chữ cố định ở vị trí chẵn, tên biến ở vị trí lẻ
+        self.parts: List[str] = _PLACEHOLDER_RE.split(source)
+        self.fields = set(self.parts[1::2])
+
+    def render(self, context: Dict[str, Any], escape: bool = False) -> str:
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            value = context[parts[i]]
+            if value is None:
+                value = ""
+            elif not isinstance(value, str):
+                value = str(value)
+            parts[i] = html.escape(value) if escape and not isinstance(value, SafeHTML) else value
+        return "".join(parts)
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+class EmailTemplate:
+    def __init__(self, name: str, subject: CompiledTemplate, html_body: CompiledTemplate, text_body: CompiledTemplate):
+        self.name = name
+        self.subject = subject
+        self.html = html_body
+        self.text = text_body
+        self.fields = subject.fields | html_body.fields | text_body.fields
+
+    def render(self, context: Dict[str, Any]) -> RenderedEmail:
+        missing = self.fields.difference(context)
+        if missing:
+            raise KeyError(f"Template '{self.name}' thiếu biến: {', '.join(sorted(missing))}")
+        return RenderedEmail(
+            subject=self.subject.render(context),
+            html=self.html.render(context, escape=True),
+            text=self.text.render(context)
+        )
+
+
+def _parse_selector(selector: str) -> Optional[List[Tuple[Optional[str], frozenset]]]:
+    """
+    Tách selector dạng "tag.class .class tag" thành danh sách (tag, classes).
+    Trả về None với selector không inline được (pseudo-class, id, thuộc tính, >, +, ~...).
+    """
+    compounds = []
+    for token in selector.split():
+        match = _SIMPLE_SELECTOR_RE.match(token)
+        if not match or not token:
+            return None
+        tag = match.group(1).lower() if match.group(1) else None
+        classes = frozenset(c for c in match.group(2).split(".") if c)
+        compounds.append((tag, classes))
+    return compounds or None
+
+
+def _compound_matches(compound, tag: str, classes: frozenset) -> bool:
+    want_tag, want_classes = compound
+    return (want_tag is None or want_tag == tag) and want_classes <= classes
+
+
+def _selector_matches(compounds, stack: List[Tuple[str, frozenset]]) -> bool:
+    """stack[-1] là phần tử đang xét, các phần tử trước là tổ tiên"""
+    if not _compound_matches(compounds[-1], *stack[-1]):
+        return False
+    position = len(stack) - 2
+    for compound in reversed(compounds[:-1]):
+        while position >= 0 and not _compound_matches(compound, *stack[position]):
+            position -= 1
+        if position < 0:
+            return False
+        position -= 1
+    return True
+
+
+def inline_css(source: str) -> str:
+    """
+    Chuyển CSS trong <style> thành thuộc tính style trên từng thẻ.
+    Hỗ trợ selector theo thẻ, class và quan hệ con cháu; các luật không inline được
+    (ví dụ :hover, :last-child, @media) được giữ lại trong một thẻ <style>.
+    Style viết sẵn trên thẻ luôn được ưu tiên hơn CSS inline.
+    """
+    rules = []
+    leftover = []
+    order = 0
+    for block in _STYLE_BLOCK_RE.findall(source):
+        block = _CSS_COMMENT_RE.sub("", block)
+        for selectors, body in _CSS_RULE_RE.findall(block):
+            declarations = "; ".join(d.strip() for d in body.split(";") if d.strip())
+            if not declarations:
+                continue
+            kept = []
+            for selector in selectors.split(","):
+                selector = selector.strip()
+                compounds = _parse_selector(selector)
+                if compounds is None:
+                    kept.append(selector)
+                    continue
+                specificity = (sum(len(c[1]) for c in compounds), sum(1 for c in compounds if c[0]))
+                rules.append((specificity, order, compounds, declarations))
+                order += 1
+            if kept:
+                # Cần !important để thắng style đã inline trên thẻ
+                important = "; ".join(d if "!important" in d else f"{d} !important" for d in declarations.split("; "))
+                leftover.append(f"{', '.join(kept)} {{ {important} }}")
+    rules.sort(key=lambda rule: (rule[0], rule[1]))
+
+    # Giữ các luật còn lại ở vị trí thẻ <style> đầu tiên, bỏ các thẻ <style> khác
+    leftover_css = "\n".join(leftover)
+    blocks_seen = []
+
+    def _replace_style_block(match):
+        blocks_seen.append(match)
+        if len(blocks_seen) == 1 and leftover_css:
+            return f"<style>\n{leftover_css}\n</style>"
+        return ""
+
+    source = _STYLE_BLOCK_RE.sub(_replace_style_block, source)
+
+    stack: List[Tuple[str, frozenset]] = []
+    output = []
+    last = 0
+    for match in _TAG_RE.finditer(source):
+        closing, tag, attrs = match.group(1), match.group(2).lower(), match.group(3)
+        if closing:
+            # Đóng thẻ: bỏ khỏi stack tới thẻ mở tương ứng gần nhất
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == tag:
+                    del stack[i:]
+                    break
+            continue
+
+        attributes = {}
+        for attr in _ATTR_RE.finditer(attrs):
+            attributes[attr.group(1).lower()] = attr.group(3) if attr.group(3) is not None else attr.group(4)
+        classes = frozenset(attributes.get("class", "").split())
+        stack.append((tag, classes))
+        declarations = [decl for _, _, compounds, decl in rules if _selector_matches(compounds, stack)]
+        if tag in _VOID_TAGS or attrs.rstrip().endswith("/"):
+            stack.pop()
+        if not declarations:
+            continue
+
+        style = "; ".join(declarations)
+        if attributes.get("style"):
+            style = f"{style}; {attributes['style'].strip().rstrip(';')}"
+        attrs = _ATTR_RE.sub(lambda m: "" if m.group(1).lower() == "style" else m.group(0), attrs)
+        self_closing = attrs.rstrip().endswith("/")
+        if self_closing:
+            attrs = attrs.rstrip()[:-1]
+        style = style.replace('"', "&quot;")
+        output.append(source[last:match.start()])
+        output.append(f'<{match.group(2)}{attrs.rstrip()} style="{style}"{" /" if self_closing else ""}>')
+        last = match.end()
+    output.append(source[last:])
+    return "".join(output)
+
+
+def _split_subject(text: str, name: str) -> Tuple[str, str]:
+    first_line, _, body = text.partition("\n")
+    if not first_line.lower().startswith("subject:"):
+        raise ValueError(f"Template '{name}.txt' phải bắt đầu bằng dòng 'Subject: ...'")
+    return first_line[len("subject:"):].strip(), body.lstrip("\n")
+
+
+def compile_template(name: str, html_source: str, text_source: str) -> EmailTemplate:
+    subject, text_body = _split_subject(text_source, name)
+    return EmailTemplate(
+        name=name,
+        subject=CompiledTemplate(subject),
+        html_body=CompiledTemplate(inline_css(html_source)),
+        text_body=CompiledTemplate(text_body)
+    )
+
+
+class FragmentTemplate:
+    """Đoạn template không có tiêu đề, render lặp cho từng phần tử của danh sách"""
+
+    def __init__(self, name: str, html_body: CompiledTemplate, text_body: CompiledTemplate):
+        self.name = name
+        self.html = html_body
+        self.text = text_body
+
+    def render_many(self, contexts: List[Dict[str, Any]]) -> Tuple[SafeHTML, str]:
+        html_parts = [self.html.render(context, escape=True) for context in contexts]
+        text_parts = [self.text.render(context) for context in contexts]
+        return SafeHTML("".join(html_parts)), "".join(text_parts)
+
+
+_templates: Dict[str, EmailTemplate] = {}
+_fragments: Dict[str, FragmentTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def load_templates(directory: str = TEMPLATE_DIR) -> Dict[str, EmailTemplate]:
+    """Đọc và biên dịch toàn bộ template trong thư mục (gọi khi khởi động hoặc khi cần nạp lại)"""
+    compiled = {}
+    fragments = {}
+    for filename in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(filename)
+        if ext != ".html":
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            html_source = f.read()
+        with open(os.path.join(directory, f"{name}.txt"), encoding="utf-8") as f:
+            text_source = f.read()
+        if name.startswith("_"):
+            # Fragment chỉ dùng style viết sẵn trên thẻ, không qua bước inline CSS
+            fragments[name[1:]] = FragmentTemplate(name[1:], CompiledTemplate(html_source), CompiledTemplate(text_source))
+        else:
+            compiled[name] = compile_template(name, html_source, text_source)
+
+    global _templates, _fragments
+    with _templates_lock:
+        _templates = compiled
+        _fragments = fragments
+    logging.info(f"Đã biên dịch {len(compiled)} template email: {', '.join(compiled)}")
+    return compiled
+
+
+def get_template(name: str) -> EmailTemplate:
+    if not _templates:
+        load_templates()
+    return _templates[name]
+
+
+def render_email(name: str, context: Dict[str, Any]) -> RenderedEmail:
+    """Render template thành (subject, html, text) từ context"""
+    return get_template(name).render(context)
+
+
+def render_fragments(name: str, contexts: List[Dict[str, Any]]) -> Tuple[SafeHTML, str]:
+    """Render fragment cho từng context, trả về (html, text) đã ghép để chèn vào template chính"""
+    if not _templates:
+        load_templates()
+    return _fragments[name].render_many(contexts)
@@ -0,0 +1,367 @@
+"""
+Nhập dịch vụ và đơn hàng hàng loạt từ file CSV/XLSX.
+
+File được đọc theo từng dòng (module csv hoặc openpyxl ở chế độ read_only) nên không nạp
+cả file vào bộ nhớ. Mỗi dòng được kiểm tra bằng schema pydantic như khi tạo qua API, dòng
+hợp lệ được ghi vào bộ đệm CSV và cứ IMPORT_COPY_BATCH_ROWS dòng thì COPY một lần vào
+bảng tạm. Cuối cùng vài câu INSERT/UPDATE ... SELECT gộp bảng tạm vào bảng chính, tất cả
+trong transaction của session: router commit (hoặc rollback khi chạy thử).
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import logging
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, UploadFile, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from schemas.schemas import OrderImportRow, ServiceCreate, ServiceImportRow
+from utils.pricing import pricing_engine
+from utils.search_index import normalize
+
+IMPORT_COPY_BATCH_ROWS = 10000
+
+# Tên cột được chấp nhận ngoài tên trường của schema (so sánh sau khi bỏ dấu, chữ thường),
+# gồm cả tiêu đề của file xuất /api/orders/export/csv
+SERVICE_COLUMN_ALIASES = {
+    "ten dich vu": "name",
+    "dich vu": "name",
+    "mo ta": "description",
+    "gia": "price",
+    "don gia": "price",
+    "hinh anh": "image_url",
+    "danh muc": "category",
+    "hoat dong": "is_active",
+    "noi bat": "featured",
+}
+
+ORDER_COLUMN_ALIASES = {
+    "ten khach hang": "customer_name",
+    "email": "customer_email",
+    "so dien thoai": "customer_phone",
+    "ma dich vu": "service_id",
+    "so luong": "quantity",
+    "kich thuoc": "size",
+    "chat lieu": "material",
+    "ghi chu": "notes",
+    "trang thai": "status",
+    "ngay tao": "created_at",
+}
+
+# Bảng tạm bị xóa khi transaction commit; DROP trước để nhập được nhiều lần trong cùng transaction
+# (ví dụ test chạy trong một transaction được rollback, commit của router chỉ giải phóng savepoint)
+SERVICE_STAGING_SQL = """
+DROP TABLE IF EXISTS pg_temp.import_services;
+CREATE TEMP TABLE import_services (
+    row_number integer, name varchar, description text, price float8, image_url varchar,
+    category varchar, is_active boolean, featured boolean
+) ON COMMIT DROP
+"""
+
+ORDER_STAGING_SQL = """
+DROP TABLE IF EXISTS pg_temp.import_orders;
+CREATE TEMP TABLE import_orders (
+    row_number integer, customer_name varchar, customer_email varchar, customer_phone varchar,
+    service_id integer, quantity integer, size varchar, material varchar, notes text,
+    status varchar, created_at timestamp, total_price float8
+) ON COMMIT DROP
+"""
+
+
+class ImportReport:
+    """Đếm dòng và gom lỗi theo dòng, chỉ giữ tối đa `max_errors` lỗi để báo cáo gọn"""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed_rows = set()
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+
+    def add_error(self, row: int, message: str, field: Optional[str] = None):
+        self.failed_rows.add(row)
+        if len(self.errors) >= self.max_errors:
+            self.errors_truncated = True
+            return
+        self.errors.append({"row": row, "field": field, "message": message})
+
+    def as_dict(self, dry_run: bool = False) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total_rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": len(self.failed_rows),
+            "dry_run": dry_run,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.errors_truncated
+        }
+
+
+def _cell(value: Any) -> Any:
+    """Chuẩn hóa giá trị ô: ô trống thành None, số nguyên Excel lưu dạng float thành int, còn lại là chuỗi"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _csv_rows(upload: UploadFile) -> Iterator[List[Any]]:
+    # utf-8-sig bỏ BOM của file do Excel hoặc /export/csv tạo ra
+    reader = codecs.getreader("utf-8-sig")(upload.file, errors="replace")
+    header = reader.readline()
+    # Excel với định dạng số tiếng Việt lưu CSV bằng dấu ";", chọn ký tự phân cách xuất hiện nhiều nhất ở dòng tiêu đề
+    delimiter = max(",;\t", key=header.count)
+    yield from csv.reader(itertools.chain([header], reader), delimiter=delimiter)
+
+
+def _xlsx_rows(upload: UploadFile) -> Iterator[List[Any]]:
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File XLSX không hợp lệ"
+        )
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def read_rows(upload: UploadFile) -> Iterator[Tuple[int, List[Any]]]:
+    """Đọc từng dòng của file upload, trả về (số dòng, danh sách giá trị) với dòng tiêu đề là dòng 1"""
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    if extension == ".csv":
+        rows = _csv_rows(upload)
+    elif extension in (".xlsx", ".xlsm"):
+        rows = _xlsx_rows(upload)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Chỉ hỗ trợ file .csv hoặc .xlsx"
+        )
+    for row_number, row in enumerate(rows, start=1):
+        yield row_number, row
+
+
+def map_columns(header: List[Any], schema: Type[BaseModel], aliases: Dict[str, str]) -> Dict[int, str]:
+    """Vị trí cột -> tên trường của schema, cột không nhận ra được bỏ qua"""
+    known = {normalize(field): field for field in schema.model_fields}
+    known.update(aliases)
+    columns = {}
+    for position, title in enumerate(header):
+        field = known.get(normalize(str(title or "")))
+        if field and field not in columns.values():
+            columns[position] = field
+    return columns
+
+
+def missing_columns(columns: Dict[int, str], schema: Type[BaseModel]) -> List[str]:
+    return [name for name, info in schema.model_fields.items()
+            if info.is_required() and name not in columns.values()]
+
+
+def require_columns(columns: Dict[int, str], schema: Type[BaseModel]):
+    missing = missing_columns(columns, schema)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File thiếu cột bắt buộc: {', '.join(missing)}"
+        )
+
+
+def validate_rows(rows: Iterator[Tuple[int, List[Any]]], columns: Dict[int, str], schema: Type[BaseModel],
+                  report: ImportReport) -> Iterator[Tuple[int, BaseModel]]:
+    """Kiểm tra từng dòng bằng schema, dòng lỗi được ghi vào báo cáo và bỏ qua"""
+    for row_number, row in rows:
+        data = {}
+        for position, field in columns.items():
+            value = _cell(row[position]) if position < len(row) else None
+            if value is not None:
+                data[field] = value
+        if not data:
+            continue  # Dòng trống
+        report.total_rows += 1
+        try:
+            yield row_number, schema.model_validate(data)
+        except ValidationError as e:
+            for error in e.errors():
+                field = ".".join(str(part) for part in error["loc"]) or None
+                report.add_error(row_number, error["msg"], field)
+
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return "\\N"
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    return value
+
+
+def copy_rows(db: Session, table: str, fields: List[str], rows: Iterator[Tuple[int, BaseModel]]) -> int:
+    """COPY các dòng hợp lệ vào bảng tạm theo từng lô, trả về số dòng đã ghi"""
+    cursor = db.connection().connection.cursor()
+    statement = f"COPY {table} (row_number, {', '.join(fields)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = total = 0
+
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    try:
+        for row_number, item in rows:
+            writer.writerow([row_number] + [_copy_value(getattr(item, field)) for field in fields])
+            pending += 1
+            if pending >= IMPORT_COPY_BATCH_ROWS:
+                flush()
+                total, pending = total + pending, 0
+        if pending:
+            flush()
+            total += pending
+    finally:
+        cursor.close()
+    return total
+
+
+def read_header(upload: UploadFile) -> Tuple[List[Any], Iterator[Tuple[int, List[Any]]]]:
+    """Tách dòng tiêu đề, trả về (tiêu đề, các dòng dữ liệu còn lại)"""
+    rows = read_rows(upload)
+    header = next(rows, None)
+    if header is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File không có dữ liệu"
+        )
+    return header[1], rows
+
+
+def load_staging(db: Session, rows: Iterator[Tuple[int, List[Any]]], columns: Dict[int, str],
+                 schema: Type[BaseModel], staging_sql: str, table: str, report: ImportReport) -> int:
+    """Tạo bảng tạm rồi kiểm tra và COPY các dòng vào đó"""
+    db.execute(text(staging_sql))
+    return copy_rows(db, table, list(schema.model_fields), validate_rows(rows, columns, schema, report))
+
+
+def import_services(db: Session, upload: UploadFile) -> ImportReport:
+    """
+    Nhập bảng giá dịch vụ. Dịch vụ trùng tên với dịch vụ đã có được cập nhật (chỉ các ô có
+    giá trị), tên mới được thêm thành dịch vụ mới. Tên lặp lại trong file thì dòng cuối cùng được dùng.
+    File chỉ có một phần cột (ví dụ name, price) chỉ dùng để cập nhật: mỗi dòng được kiểm tra
+    bằng ServiceImportRow thay vì ServiceCreate và tên chưa có được báo lỗi.
+    """
+    started = time.perf_counter()
+    report = ImportReport(settings.IMPORT_MAX_ERRORS)
+    header, rows = read_header(upload)
+    columns = map_columns(header, ServiceCreate, SERVICE_COLUMN_ALIASES)
+    require_columns(columns, ServiceImportRow)
+    missing = missing_columns(columns, ServiceCreate)
+    schema = ServiceImportRow if missing else ServiceCreate
+    load_staging(db, rows, columns, schema, SERVICE_STAGING_SQL, "import_services", report)
+
+    latest = "SELECT DISTINCT ON (name) * FROM import_services ORDER BY name, row_number DESC"
+    now = datetime.utcnow()
+    # Ô trống không xóa giá trị đang có
+    assignments = [f"{field} = coalesce(i.{field}, s.{field})" for field in columns.values() if field != "name"]
+    if assignments:
+        report.updated = db.execute(text(f"""
+            UPDATE services s SET {', '.join(assignments)}, updated_at = :now
+            FROM ({latest}) i
+            WHERE s.name = i.name
+        """), {"now": now}).rowcount
+
+    if missing:
+        unknown = db.execute(text("""
+            SELECT row_number, name FROM import_services i
+            WHERE NOT EXISTS (SELECT 1 FROM services s WHERE s.name = i.name)
+            ORDER BY row_number
+        """))
+        for row_number, name in unknown:
+            report.add_error(row_number, f"Dịch vụ '{name}' chưa tồn tại, file cần có cột "
+                                         f"{', '.join(missing)} để thêm mới", "name")
+    else:
+        fields = list(ServiceCreate.model_fields)
+        report.created = db.execute(text(f"""
+            INSERT INTO services ({', '.join(fields)}, created_at, updated_at)
+            SELECT {', '.join(f'i.{field}' for field in fields)}, :now, :now
+            FROM ({latest}) i
+            WHERE NOT EXISTS (SELECT 1 FROM services s WHERE s.name = i.name)
+            ORDER BY i.row_number
+        """), {"now": now}).rowcount
+
+    logging.info(f"Nhập dịch vụ: {report.total_rows} dòng, {report.created} thêm mới, {report.updated} cập nhật, "
+                 f"{len(report.failed_rows)} lỗi trong {(time.perf_counter() - started) * 1000:.0f} ms")
+    return report
+
+
+def import_orders(db: Session, upload: UploadFile, user_id: Optional[int] = None) -> ImportReport:
+    """Nhập đơn hàng ngoại tuyến. Dòng có mã dịch vụ không tồn tại được báo lỗi, các dòng khác được thêm."""
+    started = time.perf_counter()
+    report = ImportReport(settings.IMPORT_MAX_ERRORS)
+    header, rows = read_header(upload)
+    columns = map_columns(header, OrderImportRow, ORDER_COLUMN_ALIASES)
+    require_columns(columns, OrderImportRow)
+    db.execute(text(ORDER_STAGING_SQL))
+    # Thành tiền để trống được tính theo bảng giá vừa nạp lại, như khi tạo đơn hàng qua API
+    pricing_engine.load(db)
+
+    def with_prices(items: Iterator[Tuple[int, OrderImportRow]]) -> Iterator[Tuple[int, OrderImportRow]]:
+        for row_number, item in items:
+            if item.total_price is None:
+                item.total_price = pricing_engine.total_price(
+                    pricing_engine.base_price(db, item.service_id), item.quantity, item.size, item.material
+                )
+            yield row_number, item
+
+    validated = validate_rows(rows, columns, OrderImportRow, report)
+    copy_rows(db, "import_orders", list(OrderImportRow.model_fields), with_prices(validated))
+
+    missing_service = db.execute(text("""
+        SELECT row_number, service_id FROM import_orders i
+        WHERE NOT EXISTS (SELECT 1 FROM services s WHERE s.id = i.service_id)
+        ORDER BY row_number
+    """))
+    for row_number, service_id in missing_service:
+        report.add_error(row_number, f"Dịch vụ với ID {service_id} không tồn tại", "service_id")
+
+    fields = [field for field in OrderImportRow.model_fields if field != "created_at"]
+    now = datetime.utcnow()
+    # Ghi sự kiện đầu tiên của lịch sử trạng thái trong cùng câu lệnh, không tính vào thống kê SLA
+    report.created = db.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO orders ({', '.join(fields)}, status_changed_at, created_at, updated_at)
+            SELECT {', '.join(f'i.{field}' for field in fields)}, coalesce(i.created_at, :now),
+                   coalesce(i.created_at, :now), :now
+            FROM import_orders i
+            WHERE EXISTS (SELECT 1 FROM services s WHERE s.id = i.service_id)
+            ORDER BY i.row_number
+            RETURNING id, service_id, status, version, created_at
+        )
+        INSERT INTO order_status_events (order_id, service_id, to_status, version, user_id, created_at)
+        SELECT id, service_id, status, version, :user_id, created_at FROM inserted
+    """), {"now": now, "user_id": user_id}).rowcount
+
+    logging.info(f"Nhập đơn hàng: {report.total_rows} dòng, {report.created} thêm mới, "
+                 f"{len(report.failed_rows)} lỗi trong {(time.perf_counter() - started) * 1000:.0f} ms")
+    return report
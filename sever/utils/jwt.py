@@ -18,7 +18,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def create_ticket(username: str, role: str, scope: str, expires_seconds: int) -> str:
+    """
+    Vé ngắn hạn chỉ dùng được cho một loại kết nối (scope), truyền qua query string khi client
+    không gửi được header (EventSource) thay cho access token đầy đủ
+    """
+    return create_access_token({"sub": username, "role": role, "scope": scope}, timedelta(seconds=expires_seconds))
+
+def verify_token(token: str, scope: Optional[str] = None):
+    """Kiểm tra access token; với `scope` thì chỉ nhận vé đúng scope đó (vé không dùng được như access token)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,7 +36,7 @@ def verify_token(token: str):
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
         token_data = TokenData(username=username, role=role)
         return token_data
@@ -0,0 +1,222 @@
+"""
+Ghi log bất đồng bộ: QueueHandler -> QueueListener (thread riêng) -> file JSON + console.
+
+- logging.info(...) trong request chỉ đưa bản ghi vào hàng đợi, việc định dạng và ghi file chạy ở thread
+  của QueueListener nên không chặn vòng lặp asyncio
+- File logs/app_YYYYMMDD.log, mỗi dòng một object JSON, sang ngày mới thì mở file mới, giữ
+  LOG_RETENTION_DAYS ngày. Không đổi tên file khi chuyển ngày nên nhiều worker (gunicorn -w 4)
+  cùng ghi nối vào một file mà không xóa mất file của nhau như TimedRotatingFileHandler
+- Mỗi request có request_id (lấy từ header X-Request-ID hoặc tự sinh, trả lại trong response),
+  được gắn vào mọi dòng log của request đó, kể cả log từ threadpool
+- LOG_SAMPLE_RATES ("/api/orders:0.1,/api/services:0.5"): chỉ giữ log INFO/DEBUG của một phần request
+  theo tiền tố đường dẫn. Quyết định một lần cho cả request nên log của request được giữ thì đầy đủ;
+  WARNING trở lên luôn được ghi.
+"""
+
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional, Tuple
+
+from config.settings import settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# False: request không được chọn để ghi log INFO/DEBUG
+_sampled: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+# Thuộc tính có sẵn của LogRecord, phần còn lại là trường truyền qua `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+# Mã request client gửi lên chỉ được dùng nếu ngắn và không có ký tự lạ
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    Ghi nối vào <prefix>_YYYYMMDD.log của ngày hiện tại, sang ngày mới thì đóng file cũ và mở file mới.
+    Mỗi tiến trình tự mở file theo ngày (chế độ append) nên nhiều worker dùng chung thư mục log được.
+    """
+
+    def __init__(self, log_dir: str, prefix: str = "app", retention_days: int = 30, encoding: str = "utf-8"):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.retention_days = retention_days
+        self.day = date.today()
+        super().__init__(self._path(self.day), encoding=encoding, delay=True)
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}_{day.strftime('%Y%m%d')}.log")
+
+    def emit(self, record: logging.LogRecord):
+        today = date.today()
+        if today != self.day:
+            self.day = today
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._path(today))
+            self.remove_expired()
+        super().emit(record)
+
+    def remove_expired(self):
+        """Xóa file log cũ hơn retention_days ngày (worker khác có thể đã xóa trước)"""
+        if self.retention_days <= 0:
+            return
+        oldest = (self.day - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        pattern = re.compile(rf"{re.escape(self.prefix)}_(\d{{8}})\.log")
+        for name in os.listdir(self.log_dir):
+            match = pattern.fullmatch(name)
+            if match and match.group(1) < oldest:
+                try:
+                    os.remove(os.path.join(self.log_dir, name))
+                except FileNotFoundError:
+                    pass
+
+
+class ContextFilter(logging.Filter):
+    """Gắn request_id và bỏ log INFO/DEBUG của request không được chọn (chạy ở thread gọi logging)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and not _sampled.get():
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Chuẩn bị bản ghi để chuyển sang thread khác: tính sẵn message và traceback (args/exc_info có thể
+        không dùng được sau khi request kết thúc) nhưng giữ nguyên các trường để định dạng JSON.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sample_rates(raw: str) -> List[Tuple[str, float]]:
+    """Đọc cấu hình "/api/orders:0.1" thành danh sách (tiền tố, tỷ lệ), tiền tố dài hơn đứng trước"""
+    rates = []
+    for part in raw.split(","):
+        prefix, _, rate = part.strip().rpartition(":")
+        if not prefix:
+            continue
+        try:
+            rates.append((prefix, float(rate)))
+        except ValueError:
+            logging.warning(f"Bỏ qua cấu hình lấy mẫu log không hợp lệ: '{part.strip()}'")
+    return sorted(rates, key=lambda item: len(item[0]), reverse=True)
+
+
+def setup_logging(log_dir: Optional[str] = None, level: Optional[str] = None):
+    """Cấu hình logging cho tiến trình (gọi một lần khi khởi động, thay cho logging.basicConfig)"""
+    global _listener
+    if _listener is not None:
+        return
+    log_dir = log_dir or settings.LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = DailyFileHandler(log_dir, retention_days=settings.LOG_RETENTION_DAYS)
+    file_handler.remove_expired()
+    file_handler.setFormatter(JsonFormatter())
+    handlers: List[logging.Handler] = [file_handler]
+    if settings.LOG_CONSOLE:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        handlers.append(console_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = AsyncQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel((level or settings.LOG_LEVEL).upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Ghi hết log còn trong hàng đợi rồi dừng thread ghi log"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """ASGI middleware: gán request_id và quyết định lấy mẫu log cho từng request"""
+
+    def __init__(self, app, sample_rates: Optional[str] = None):
+        self.app = app
+        self.sample_rates = parse_sample_rates(settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates)
+
+    def _sample(self, path: str) -> bool:
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return rate >= 1 or random.random() < rate
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                value = value.decode("latin-1")
+                request_id = value if _REQUEST_ID_PATTERN.fullmatch(value) else None
+                break
+        request_id = request_id or uuid.uuid4().hex
+        id_token = request_id_var.set(request_id)
+        sampled_token = _sampled.set(self._sample(scope["path"]))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(id_token)
+            _sampled.reset(sampled_token)
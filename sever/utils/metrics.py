@@ -0,0 +1,151 @@
+"""
+Số liệu request cho Prometheus (GET /metrics, định dạng text exposition 0.0.4).
+
+- http_request_duration_seconds: histogram thời gian xử lý theo route (mẫu đường dẫn, không phải URL thật),
+  method và status
+- http_requests_in_flight: số request đang xử lý theo method
+- http_request_db_queries: histogram số câu truy vấn mỗi request, cùng tổng số câu và tổng thời gian truy vấn
+
+Ghi số liệu không dùng khóa: middleware chỉ ghi trên vòng lặp asyncio (một thread), còn số câu truy vấn
+lấy từ QueryProfile riêng của từng request (utils/query_profiler.py).
+Mỗi tiến trình (worker uvicorn) giữ số liệu riêng.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from utils import query_profiler
+from utils.query_profiler import QueryProfile
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Request không khớp route nào (404) được gộp một nhãn để không sinh vô số chuỗi số liệu
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteStats:
+    __slots__ = ("latency", "latency_sum", "queries", "query_count", "query_seconds")
+
+    def __init__(self):
+        # Số request rơi vào từng bucket (không cộng dồn), phần tử cuối là +Inf
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = [0] * (len(QUERY_COUNT_BUCKETS) + 1)
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str, int], RouteStats] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    def started(self, method: str):
+        self._in_flight[method] = self._in_flight.get(method, 0) + 1
+
+    def finished(self, route: str, method: str, status: int, seconds: float, queries: Optional[QueryProfile]):
+        self._in_flight[method] -= 1
+        key = (route, method, status)
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = RouteStats()
+        stats.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        stats.latency_sum += seconds
+        if queries is not None:
+            stats.queries[bisect_left(QUERY_COUNT_BUCKETS, queries.count)] += 1
+            stats.query_count += queries.count
+            stats.query_seconds += queries.seconds
+
+    def render(self) -> str:
+        """Xuất toàn bộ số liệu theo định dạng text của Prometheus"""
+        lines = [
+            "# HELP http_requests_in_flight Số request đang được xử lý.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for method, value in sorted(self._in_flight.items()):
+            lines.append(f'http_requests_in_flight{{method="{method}"}} {value}')
+
+        routes = sorted(self._routes.items())
+        lines += [
+            "# HELP http_request_duration_seconds Thời gian xử lý request.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method, status), stats in routes:
+            labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+            lines += _histogram("http_request_duration_seconds", labels, LATENCY_BUCKETS,
+                                stats.latency, stats.latency_sum)
+
+        lines += [
+            "# HELP http_request_db_queries Số câu truy vấn database trong một request.",
+            "# TYPE http_request_db_queries histogram",
+        ]
+        for (route, method, status), stats in routes:
+            labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+            lines += _histogram("http_request_db_queries", labels, QUERY_COUNT_BUCKETS,
+                                stats.queries, stats.query_count)
+
+        lines += [
+            "# HELP http_request_db_query_seconds_total Tổng thời gian truy vấn database của các request.",
+            "# TYPE http_request_db_query_seconds_total counter",
+        ]
+        for (route, method, status), stats in routes:
+            labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+            lines.append(f"http_request_db_query_seconds_total{{{labels}}} {stats.query_seconds!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram(name: str, labels: str, bounds: Tuple[float, ...], counts: List[int], total: float) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total!r}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+class MetricsMiddleware:
+    """ASGI middleware đo thời gian từng request (chỉ HTTP, bỏ qua websocket/lifespan)"""
+
+    def __init__(self, app, registry: "MetricsRegistry" = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        queries, token = query_profiler.begin()
+        registry = self.registry
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.started(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            query_profiler.end(token)
+            # Router ghi route đã khớp vào scope, dùng mẫu đường dẫn ("/api/orders/{order_id}") làm nhãn
+            route = scope.get("route")
+            registry.finished(getattr(route, "path", UNMATCHED_ROUTE), method, status_code, elapsed, queries)
+
+
+metrics = MetricsRegistry()
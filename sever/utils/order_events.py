@@ -0,0 +1,224 @@
+"""
+Sự kiện đơn hàng (tạo mới, đổi trạng thái, nhập từ file) cho luồng SSE /api/orders/events.
+
+- publish_order_event gọi pg_notify trong transaction của request: sự kiện chỉ được phát khi
+  commit và đến mọi worker đang LISTEN, kể cả worker khác với worker xử lý request
+- Mỗi worker có một thread LISTEN trên kết nối riêng (không chiếm pool), thông báo nhận được
+  được chuyển vào vòng lặp asyncio và đẩy tới các client đang kết nối
+- Mã sự kiện lấy từ sequence order_event_seq nên giống nhau trên mọi worker. Worker giữ
+  ORDER_EVENTS_BUFFER_SIZE sự kiện gần nhất: client kết nối lại với Last-Event-ID được phát lại
+  các sự kiện bị lỡ, nếu đã quá xa thì nhận sự kiện "reset" để tải lại danh sách
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config.database import engine
+from config.settings import settings
+
+CHANNEL = "order_events"
+
+# Số sự kiện tối đa chờ gửi cho một client, client quá chậm bị ngắt để kết nối lại và phát lại từ bộ đệm
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class OrderEvent(NamedTuple):
+    id: int
+    type: str
+    data: str  # JSON
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+
+def order_event_data(event_type: str, order=None, previous_status: Optional[str] = None,
+                     **extra: Any) -> Dict[str, Any]:
+    """Nội dung sự kiện; `order` là đơn hàng ORM hoặc dòng RETURNING có các cột tương ứng"""
+    data = {"type": event_type, "timestamp": datetime.utcnow().isoformat()}
+    if order is not None:
+        data.update({
+            "order_id": order.id,
+            "status": order.status,
+            "previous_status": previous_status,
+            "customer_name": order.customer_name,
+            "service_id": order.service_id,
+            "total_price": order.total_price
+        })
+    data.update(extra)
+    return data
+
+
+def publish_order_event(db: Session, event_type: str, order=None, previous_status: Optional[str] = None,
+                        **extra: Any):
+    """Phát sự kiện khi transaction hiện tại commit. Gọi sau flush để đơn hàng mới đã có id."""
+    publish_order_events(db, [order_event_data(event_type, order, previous_status, **extra)])
+
+
+def publish_order_events(db: Session, events: List[Dict[str, Any]]):
+    """Phát nhiều sự kiện bằng một câu lệnh, mỗi sự kiện có mã riêng: "<id> <json>" """
+    if not events:
+        return
+    db.execute(
+        text("SELECT pg_notify(:channel, nextval('order_event_seq') || ' ' || payload) "
+             "FROM unnest(CAST(:payloads AS text[])) AS payload"),
+        {"channel": CHANNEL, "payloads": [json.dumps(data, ensure_ascii=False, default=str) for data in events]}
+    )
+
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+
+
+class OrderEventBroker:
+    def __init__(self, buffer_size: int = 1000):
+        self._buffer: Deque[OrderEvent] = deque(maxlen=buffer_size)
+        # Mọi sự kiện có id lớn hơn horizon đều còn trong bộ đệm
+        self._horizon = 0
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._ready = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="order-events-listener", daemon=True)
+        self._thread.start()
+        logging.info("Khởi động luồng nhận sự kiện đơn hàng (LISTEN order_events)")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stopping.set()
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join, 5)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self._subscribers), "buffered": len(self._buffer)}
+
+    def _listen(self):
+        """Chạy trong thread riêng: giữ một kết nối LISTEN, tự kết nối lại khi mất kết nối"""
+        delay = 1
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                fairy = engine.raw_connection()
+                fairy.detach()  # Kết nối dùng riêng, không trả về pool
+                connection = fairy.dbapi_connection
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {CHANNEL}")
+                # Sự kiện phát sau thời điểm này chắc chắn được nhận
+                cursor.execute("SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM order_event_seq")
+                horizon = cursor.fetchone()[0]
+                self._loop.call_soon_threadsafe(self._reset_horizon, horizon)
+                self._ready.set()
+                delay = 1
+
+                while not self._stopping.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._dispatch(connection.notifies.pop(0).payload)
+            except Exception as e:
+                self._ready.clear()
+                logging.error(f"Lỗi kết nối nhận sự kiện đơn hàng: {str(e)}, thử lại sau {delay} giây")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _dispatch(self, payload: str):
+        try:
+            event_id, data = payload.split(" ", 1)
+            event = OrderEvent(int(event_id), json.loads(data).get("type", "message"), data)
+        except ValueError:
+            logging.warning(f"Bỏ qua sự kiện đơn hàng không hợp lệ: {payload[:200]}")
+            return
+        self._loop.call_soon_threadsafe(self._publish, event)
+
+    def _reset_horizon(self, horizon: int):
+        # Sau khi mất kết nối có thể đã lỡ sự kiện: chỉ phát lại được các sự kiện từ lần LISTEN mới
+        self._buffer.clear()
+        self._horizon = horizon
+
+    def _publish(self, event: OrderEvent):
+        """Chạy trên vòng lặp asyncio: lưu vào bộ đệm và đẩy tới các client"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self._horizon = max(self._horizon, self._buffer[0].id)
+        self._buffer.append(event)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.lagged = True
+                self._subscribers.discard(subscription)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[Subscription, Optional[List[OrderEvent]]]:
+        """
+        Đăng ký nhận sự kiện. Trả về (subscription, các sự kiện cần phát lại);
+        danh sách là None khi không thể phát lại đủ từ `last_event_id` (client cần tải lại).
+        """
+        subscription = Subscription()
+        self._subscribers.add(subscription)
+        if last_event_id is None:
+            return subscription, []
+        if last_event_id < self._horizon or not self._ready.is_set():
+            return subscription, None
+        return subscription, [event for event in self._buffer if event.id > last_event_id]
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    async def stream(self, last_event_id: Optional[int] = None, keepalive_seconds: int = 15):
+        """Chuỗi text/event-stream cho một client"""
+        subscription, replay = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if replay is None:
+                latest = self._buffer[-1].id if self._buffer else self._horizon
+                yield OrderEvent(latest, "reset", json.dumps({"type": "reset"})).encode()
+            else:
+                for event in replay:
+                    yield event.encode()
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if subscription.lagged:
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield event.encode()
+                if subscription.lagged and subscription.queue.empty():
+                    # Client không theo kịp: đóng luồng, trình duyệt tự kết nối lại với Last-Event-ID
+                    break
+        finally:
+            self.unsubscribe(subscription)
+
+
+order_events = OrderEventBroker(buffer_size=settings.ORDER_EVENTS_BUFFER_SIZE)
@@ -0,0 +1,235 @@
+"""
+Máy trạng thái đơn hàng và cập nhật trạng thái có kiểm tra phiên bản (optimistic concurrency).
+
+Mỗi lần đổi trạng thái là một câu UPDATE có điều kiện (đúng id, trạng thái hiện tại được phép
+chuyển sang trạng thái mới, và đúng version nếu client gửi lên) kèm RETURNING, version tăng 1.
+Trạng thái cũ được đọc trong chính câu UPDATE (CTE khóa bản ghi trước khi sửa) nên không cần SELECT trước.
+Chỉ khi không có dòng nào được cập nhật mới đọc lại đơn hàng để báo lỗi cụ thể.
+
+Mỗi thay đổi được ghi vào order_status_events và cộng dồn vào order_status_stats (thời gian ở từng
+trạng thái và thời gian từ lúc tạo đến khi hoàn thành theo dịch vụ) trong cùng transaction.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, String, column, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from models.models import Order, OrderStatusEvent
+from schemas.schemas import BulkItemStatus, OrderStatus
+
+# Trạng thái hiện tại -> các trạng thái được phép chuyển sang
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PROCESSING, OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.PENDING, OrderStatus.COMPLETED, OrderStatus.CANCELLED},
+    # Mở lại đơn đã hoàn thành khi cần làm lại, đơn đã hủy chỉ có thể quay về chờ xử lý
+    OrderStatus.COMPLETED: {OrderStatus.PROCESSING},
+    OrderStatus.CANCELLED: {OrderStatus.PENDING},
+}
+
+# Trạng thái cũ lấy từ CTE khóa dòng (FOR UPDATE) chứ không join thẳng với orders: khi hai admin sửa
+# cùng đơn hàng (không gửi version), câu UPDATE thứ hai chờ khóa rồi kiểm tra lại WHERE trên dòng mới,
+# nhưng bảng join vẫn trả trạng thái đọc từ trước -> lịch sử sai from_status/thời gian, thống kê cộng hai lần.
+# SELECT ... FOR UPDATE trong READ COMMITTED luôn trả phiên bản mới nhất sau khi có khóa.
+# Khóa theo thứ tự id để các cập nhật hàng loạt đồng thời không deadlock.
+BULK_STATUS_SQL = """
+WITH previous AS (
+    SELECT id, status, status_changed_at FROM orders
+    WHERE id = ANY(CAST(:ids AS integer[]))
+    ORDER BY id
+    FOR UPDATE
+)
+UPDATE orders o
+SET status = :status, version = o.version + 1, status_changed_at = :now, updated_at = :now
+FROM previous, unnest(CAST(:ids AS integer[]), CAST(:versions AS integer[])) AS requested(id, version)
+WHERE o.id = requested.id
+  AND previous.id = o.id
+  AND (requested.version IS NULL OR o.version = requested.version)
+  AND o.status = ANY(CAST(:sources AS varchar[]))
+RETURNING o.id, o.status, o.version, previous.status AS previous_status,
+          previous.status_changed_at AS previous_changed_at, o.created_at,
+          o.customer_name, o.service_id, o.total_price
+"""
+
+# Cộng dồn thống kê, thứ tự khóa cố định để các transaction đồng thời không deadlock
+STATS_UPSERT_SQL = """
+INSERT INTO order_status_stats (service_id, stage, count, total_seconds, max_seconds, updated_at)
+SELECT s.service_id, s.stage, s.count, s.total_seconds, s.max_seconds, :now
+FROM unnest(CAST(:service_ids AS integer[]), CAST(:stages AS varchar[]), CAST(:counts AS integer[]),
+            CAST(:totals AS float8[]), CAST(:maxima AS float8[])) AS s(service_id, stage, count, total_seconds, max_seconds)
+WHERE EXISTS (SELECT 1 FROM services WHERE services.id = s.service_id)
+ORDER BY s.service_id, s.stage
+ON CONFLICT (service_id, stage) DO UPDATE SET
+    count = order_status_stats.count + excluded.count,
+    total_seconds = order_status_stats.total_seconds + excluded.total_seconds,
+    max_seconds = greatest(order_status_stats.max_seconds, excluded.max_seconds),
+    updated_at = excluded.updated_at
+"""
+
+# Stage đặc biệt trong order_status_stats: từ lúc tạo đơn hàng đến khi hoàn thành
+LEAD_TIME_STAGE = "lead_time"
+
+
+def allowed_sources(target: OrderStatus) -> List[str]:
+    """Các trạng thái có thể chuyển sang `target`"""
+    return [source.value for source, targets in ORDER_STATUS_TRANSITIONS.items() if target in targets]
+
+
+def transition_error(order_id: int, current_status: str, current_version: int, target: OrderStatus,
+                     expected_version: Optional[int]) -> Optional[Tuple[BulkItemStatus, str]]:
+    """Lý do không cập nhật được (loại lỗi, mô tả); None nếu đơn hàng đã ở đúng trạng thái yêu cầu"""
+    if expected_version is not None and current_version != expected_version:
+        return BulkItemStatus.CONFLICT, (f"Đơn hàng #{order_id} đã được cập nhật bởi người khác "
+                                         f"(phiên bản hiện tại: {current_version}), vui lòng tải lại")
+    if current_status == target.value:
+        return None
+    return BulkItemStatus.INVALID_TRANSITION, (f"Không thể chuyển đơn hàng #{order_id} từ trạng thái "
+                                               f"'{current_status}' sang '{target.value}'")
+
+
+def record_status_changes(db: Session, changes: List[Any], user_id: Optional[int], now: datetime):
+    """
+    Ghi lịch sử và cộng dồn thống kê cho các đơn hàng vừa đổi trạng thái. Mỗi phần tử có id, service_id,
+    status, version, previous_status, previous_changed_at và created_at (dòng RETURNING của câu UPDATE).
+    """
+    if not changes:
+        return
+    events = []
+    stats: Dict[Tuple[int, str], List[float]] = {}
+
+    def add(service_id: int, stage: str, seconds: float):
+        stat = stats.setdefault((service_id, stage), [0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = max(stat[2], seconds)
+
+    for row in changes:
+        duration = (now - row.previous_changed_at).total_seconds() if row.previous_changed_at else None
+        events.append({
+            "order_id": row.id,
+            "service_id": row.service_id,
+            "from_status": row.previous_status,
+            "to_status": row.status,
+            "version": row.version,
+            "duration_seconds": duration,
+            "user_id": user_id,
+            "created_at": now
+        })
+        if row.service_id is None:
+            continue
+        if duration is not None:
+            add(row.service_id, row.previous_status, duration)
+        if row.status == OrderStatus.COMPLETED.value and row.created_at:
+            add(row.service_id, LEAD_TIME_STAGE, (now - row.created_at).total_seconds())
+
+    db.execute(insert(OrderStatusEvent), events)
+    if stats:
+        keys = sorted(stats)
+        db.execute(text(STATS_UPSERT_SQL), {
+            "now": now,
+            "service_ids": [key[0] for key in keys],
+            "stages": [key[1] for key in keys],
+            "counts": [stats[key][0] for key in keys],
+            "totals": [stats[key][1] for key in keys],
+            "maxima": [stats[key][2] for key in keys]
+        })
+
+
+def record_order_created(db: Session, order: Order, user_id: Optional[int] = None):
+    """Sự kiện đầu tiên trong lịch sử của đơn hàng mới (gọi sau flush để đơn hàng đã có id)"""
+    db.add(OrderStatusEvent(order_id=order.id, service_id=order.service_id, to_status=order.status,
+                            version=order.version, user_id=user_id, created_at=order.created_at))
+
+
+def change_order_status(db: Session, order_id: int, target: OrderStatus, expected_version: Optional[int] = None,
+                        user_id: Optional[int] = None) -> Tuple[Order, Optional[str]]:
+    """
+    Đổi trạng thái một đơn hàng. Trả về (đơn hàng, trạng thái cũ); trạng thái cũ là None khi
+    đơn hàng đã ở trạng thái yêu cầu và không có gì thay đổi.
+    """
+    now = datetime.utcnow()
+    orders = Order.__table__
+    # Khóa dòng trước khi đọc trạng thái cũ, xem chú thích ở BULK_STATUS_SQL
+    previous = (
+        select(orders.c.id, orders.c.status, orders.c.status_changed_at)
+        .where(orders.c.id == order_id)
+        .with_for_update()
+        .cte("previous")
+    )
+    statement = (
+        update(orders)
+        .where(orders.c.id == order_id, previous.c.id == orders.c.id, orders.c.status.in_(allowed_sources(target)))
+        .values(status=target.value, version=orders.c.version + 1, status_changed_at=now, updated_at=now)
+        .returning(*orders.c, previous.c.status.label("previous_status"),
+                   previous.c.status_changed_at.label("previous_changed_at"))
+    )
+    if expected_version is not None:
+        statement = statement.where(orders.c.version == expected_version)
+    # Nạp dòng RETURNING thành đối tượng Order, kèm trạng thái trước khi sửa
+    statement = select(Order, column("previous_status", String),
+                       column("previous_changed_at", DateTime)).from_statement(statement)
+    row = db.execute(statement).first()
+    if row is not None:
+        order, previous_status, previous_changed_at = row
+        record_status_changes(db, [SimpleNamespace(
+            id=order.id, service_id=order.service_id, status=order.status, version=order.version,
+            previous_status=previous_status, previous_changed_at=previous_changed_at, created_at=order.created_at
+        )], user_id, now)
+        return order, previous_status
+
+    order = db.query(Order).filter(Order.id == order_id).first()
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Đơn hàng với ID {order_id} không tồn tại"
+        )
+    error = transition_error(order_id, order.status, order.version, target, expected_version)
+    if error is None:
+        return order, None
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error[1])
+
+
+def bulk_change_status(db: Session, target: OrderStatus, items: List[Any],
+                       user_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[Any]]:
+    """
+    Đổi trạng thái nhiều đơn hàng bằng một câu UPDATE. Trả về (kết quả theo từng phần tử, các dòng đã đổi);
+    mỗi dòng đã đổi có id, status, version, previous_status và các cột dùng cho sự kiện.
+    """
+    now = datetime.utcnow()
+    changed = db.execute(text(BULK_STATUS_SQL), {
+        "status": target.value,
+        "now": now,
+        "ids": [item.id for item in items],
+        "versions": [item.version for item in items],
+        "sources": allowed_sources(target)
+    }).all()
+    record_status_changes(db, changed, user_id, now)
+    changed_by_id = {row.id: row for row in changed}
+
+    missing = [item.id for item in items if item.id not in changed_by_id]
+    current = {}
+    if missing:
+        current = {row.id: row for row in db.execute(
+            text("SELECT id, status, version FROM orders WHERE id = ANY(CAST(:ids AS integer[]))"), {"ids": missing}
+        )}
+
+    results = []
+    for index, item in enumerate(items):
+        if item.id in changed_by_id:
+            results.append({"index": index, "id": item.id, "status": BulkItemStatus.UPDATED})
+            continue
+        row = current.get(item.id)
+        if row is None:
+            results.append({"index": index, "id": item.id, "status": BulkItemStatus.NOT_FOUND,
+                            "detail": f"Đơn hàng với ID {item.id} không tồn tại"})
+            continue
+        error = transition_error(item.id, row.status, row.version, target, item.version)
+        if error is None:
+            results.append({"index": index, "id": item.id, "status": BulkItemStatus.UPDATED,
+                            "detail": f"Đơn hàng đã ở trạng thái '{target.value}'"})
+        else:
+            results.append({"index": index, "id": item.id, "status": error[0], "detail": error[1]})
+    return results, changed
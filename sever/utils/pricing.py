@@ -0,0 +1,149 @@
+"""
+Tính giá đơn hàng phía server.
+
+Thành tiền = đơn giá dịch vụ x hệ số kích thước x hệ số chất liệu x số lượng x (1 - chiết khấu theo số lượng),
+làm tròn đến đồng. Hệ số và mức chiết khấu được cấu hình trong .env (PRICE_SIZE_MULTIPLIERS,
+PRICE_MATERIAL_MULTIPLIERS, PRICE_QUANTITY_DISCOUNTS); kích thước/chất liệu không khớp cấu hình có hệ số 1.
+
+Bảng đơn giá theo dịch vụ được nạp một lần vào bộ nhớ, xóa khi dịch vụ được thêm/sửa/xóa
+trong tiến trình này và tự nạp lại sau PRICE_CACHE_TTL_SECONDS để các worker khác không giữ giá cũ quá lâu.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from utils.search_index import normalize
+
+# Số kích thước/chất liệu khác nhau được nhớ kết quả so khớp
+MODIFIER_CACHE_SIZE = 2048
+
+
+def parse_multipliers(raw: str) -> List[Tuple[str, float]]:
+    """
+    Đọc cấu hình dạng "A4:1,A3:1.8" thành danh sách (khóa đã chuẩn hóa, hệ số),
+    khóa dài hơn đứng trước để "a3 plus" được ưu tiên hơn "a3".
+    """
+    table = []
+    for part in raw.split(","):
+        key, _, value = part.rpartition(":")
+        key = normalize(key)
+        if not key:
+            continue
+        try:
+            table.append((key, float(value)))
+        except ValueError:
+            logging.warning(f"Bỏ qua cấu hình giá không hợp lệ: '{part.strip()}'")
+    return sorted(table, key=lambda item: len(item[0]), reverse=True)
+
+
+def parse_discounts(raw: str) -> List[Tuple[int, float]]:
+    """Đọc cấu hình dạng "100:0.05,500:0.1" (từ số lượng: tỷ lệ chiết khấu), sắp theo số lượng giảm dần"""
+    tiers = []
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        try:
+            quantity, rate = part.split(":")
+            tiers.append((int(quantity), float(rate)))
+        except ValueError:
+            logging.warning(f"Bỏ qua cấu hình chiết khấu không hợp lệ: '{part.strip()}'")
+    return sorted(tiers, reverse=True)
+
+
+class PricingEngine:
+    def __init__(self, size_multipliers: str = "", material_multipliers: str = "",
+                 quantity_discounts: str = "", ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._modifiers = {
+            "size": parse_multipliers(size_multipliers),
+            "material": parse_multipliers(material_multipliers)
+        }
+        self._discounts = parse_discounts(quantity_discounts)
+        self._modifier_cache: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+        self._prices: Dict[int, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Bỏ bảng đơn giá, lần tính giá tiếp theo sẽ nạp lại (gọi sau khi thêm/sửa/xóa dịch vụ)"""
+        self._loaded_at = None
+
+    def load(self, db: Session):
+        from models.models import Service
+
+        prices = {row.id: row.price for row in db.query(Service.id, Service.price).filter(Service.price.isnot(None))}
+        with self._lock:
+            self._prices = prices
+            self._loaded_at = time.monotonic()
+
+    def base_price(self, db: Session, service_id: int) -> Optional[float]:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl_seconds:
+            self.load(db)
+        return self._prices.get(service_id)
+
+    def modifier(self, kind: str, value: Optional[str]) -> Tuple[Optional[str], float]:
+        """Hệ số của kích thước/chất liệu: khóa cấu hình khớp (theo từ, không dấu) và hệ số, mặc định (None, 1)"""
+        text = normalize(value or "")
+        if not text:
+            return None, 1.0
+        cached = self._modifier_cache.get((kind, text))
+        if cached is not None:
+            return cached
+
+        padded = f" {text} "
+        result = next(((key, multiplier) for key, multiplier in self._modifiers[kind] if f" {key} " in padded),
+                      (None, 1.0))
+        if len(self._modifier_cache) >= MODIFIER_CACHE_SIZE:
+            self._modifier_cache.clear()
+        self._modifier_cache[(kind, text)] = result
+        return result
+
+    def discount_rate(self, quantity: int) -> float:
+        return next((rate for minimum, rate in self._discounts if quantity >= minimum), 0.0)
+
+    def compute(self, base_price: float, quantity: int, size: Optional[str] = None,
+                material: Optional[str] = None) -> Dict[str, Any]:
+        """Chi tiết báo giá từ đơn giá dịch vụ"""
+        size_key, size_multiplier = self.modifier("size", size)
+        material_key, material_multiplier = self.modifier("material", material)
+        discount_rate = self.discount_rate(quantity)
+        unit_price = base_price * size_multiplier * material_multiplier
+        return {
+            "base_price": base_price,
+            "quantity": quantity,
+            "size_key": size_key,
+            "size_multiplier": size_multiplier,
+            "material_key": material_key,
+            "material_multiplier": material_multiplier,
+            "discount_rate": discount_rate,
+            "unit_price": round(unit_price, 2),
+            "total_price": float(round(unit_price * quantity * (1 - discount_rate)))
+        }
+
+    def total_price(self, base_price: Optional[float], quantity: Optional[int], size: Optional[str] = None,
+                    material: Optional[str] = None) -> Optional[float]:
+        if base_price is None or not quantity:
+            return None
+        return self.compute(base_price, quantity, size, material)["total_price"]
+
+    def quote(self, db: Session, service_id: int, quantity: int, size: Optional[str] = None,
+              material: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Báo giá theo bảng đơn giá trong bộ nhớ, None nếu dịch vụ không tồn tại hoặc chưa có giá"""
+        base_price = self.base_price(db, service_id)
+        if base_price is None:
+            return None
+        return {"service_id": service_id, **self.compute(base_price, quantity, size, material)}
+
+
+pricing_engine = PricingEngine(
+    size_multipliers=settings.PRICE_SIZE_MULTIPLIERS,
+    material_multipliers=settings.PRICE_MATERIAL_MULTIPLIERS,
+    quantity_discounts=settings.PRICE_QUANTITY_DISCOUNTS,
+    ttl_seconds=settings.PRICE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,170 @@
+"""
+Theo dõi truy vấn SQL của từng request qua event của SQLAlchemy.
+
+Mỗi request có một QueryProfile (truyền qua contextvars, kể cả tới threadpool) ghi số câu truy vấn,
+tổng thời gian và số lần chạy theo từng câu lệnh. Khi request xong:
+- cùng một dạng truy vấn (fingerprint: bỏ tham số, gộp danh sách IN) chạy quá QUERY_PROFILER_REPEAT_THRESHOLD
+  lần thì ghi cảnh báo N+1 vào log
+- ở chế độ DEBUG, response có header Server-Timing (db: thời gian và số câu truy vấn, app: thời gian xử lý)
+
+Câu lệnh được gom theo chuỗi SQL đã biên dịch (SQLAlchemy dùng lại cùng chuỗi cho cùng truy vấn),
+chỉ tính fingerprint khi cần báo cáo nên chi phí mỗi truy vấn chỉ là một lần tra dict.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import settings
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar("query_profile", default=None)
+# Profile nhận mọi truy vấn của tiến trình, dùng trong test (capture_queries)
+_captures: List["QueryProfile"] = []
+
+
+class QueryProfile:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Chuỗi SQL -> [số lần chạy, tổng thời gian]
+        self.statements: Dict[str, List[float]] = {}
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        stat = self.statements.get(statement)
+        if stat is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+
+    def fingerprints(self) -> List[Tuple[str, int, float]]:
+        """(fingerprint, số lần chạy, tổng thời gian), chạy nhiều nhất đứng trước"""
+        merged: Dict[str, List[float]] = {}
+        for statement, (count, seconds) in self.statements.items():
+            stat = merged.setdefault(fingerprint(statement), [0, 0.0])
+            stat[0] += count
+            stat[1] += seconds
+        return sorted(((key, int(count), seconds) for key, (count, seconds) in merged.items()),
+                      key=lambda item: (-item[1], -item[2]))
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int, float]]:
+        """Các dạng truy vấn chạy quá `threshold` lần"""
+        if self.count <= threshold:
+            return []
+        return [item for item in self.fingerprints() if item[1] > threshold]
+
+    def summary(self, limit: int = 10) -> str:
+        lines = [f"{self.count} truy vấn, {self.seconds * 1000:.1f} ms"]
+        for key, count, seconds in self.fingerprints()[:limit]:
+            lines.append(f"  {count} x {seconds * 1000:.1f} ms: {key[:300]}")
+        return "\n".join(lines)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Dạng chung của câu lệnh: tham số và hằng số thay bằng ?, danh sách (?, ?, ...) gộp thành (...)"""
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _PLACEHOLDER.sub("?", text)
+    text = _LITERAL.sub("?", text)
+    return _VALUE_LIST.sub("(...)", text)
+
+
+def begin() -> Tuple[QueryProfile, Optional[Token]]:
+    """Bắt đầu ghi cho request hiện tại; nếu middleware bên ngoài đã bắt đầu thì dùng chung profile đó"""
+    profile = _current_profile.get()
+    if profile is not None:
+        return profile, None
+    profile = QueryProfile()
+    return profile, _current_profile.set(profile)
+
+
+def end(token: Optional[Token]):
+    if token is not None:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryProfile]:
+    """Ghi mọi truy vấn chạy trong khối with, ở bất kỳ thread nào (dùng trong test để kiểm tra số câu truy vấn)"""
+    profile = QueryProfile()
+    _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        _captures.remove(profile)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    profile = _current_profile.get()
+    if started is None or (profile is None and not _captures):
+        return
+    elapsed = time.perf_counter() - started
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for capture in _captures:
+        capture.record(statement, elapsed)
+
+
+def instrument_engine(engine: Engine):
+    """Gắn bộ đếm truy vấn vào engine (gọi một lần khi khởi động)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware: cảnh báo N+1 và thêm header Server-Timing ở chế độ DEBUG"""
+
+    def __init__(self, app, repeat_threshold: Optional[int] = None, server_timing: Optional[bool] = None):
+        self.app = app
+        self.repeat_threshold = settings.QUERY_PROFILER_REPEAT_THRESHOLD if repeat_threshold is None else repeat_threshold
+        self.server_timing = settings.DEBUG if server_timing is None else server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile, token = begin()
+        start = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                elapsed = (time.perf_counter() - start) * 1000
+                value = (f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries", '
+                         f"app;dur={elapsed:.2f}")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        send_wrapper = timed_send if self.server_timing else send
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end(token)
+            if self.repeat_threshold:
+                for key, count, seconds in profile.repeated(self.repeat_threshold):
+                    route = getattr(scope.get("route"), "path", scope["path"])
+                    logging.warning(f"Nghi ngờ N+1: truy vấn chạy {count} lần ({seconds * 1000:.1f} ms) "
+                                    f"trong {scope['method']} {route}: {key[:300]}")
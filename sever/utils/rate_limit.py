@@ -0,0 +1,266 @@
+"""
+Giới hạn tần suất (token bucket) cho các endpoint ghi công khai, theo IP và route:
+POST /api/contact/submit, POST /api/orders/, POST /api/services/{service_id}/reviews.
+
+- Mỗi cặp (route, IP) có một bucket chứa tối đa N token, hồi lại N token sau mỗi chu kỳ (cấu hình "N/giây",
+  ví dụ RATE_LIMIT_CONTACT="5/600"); mỗi request lấy một token, hết token thì trả 429 kèm header Retry-After
+- Kiểm tra trong middleware ASGI, trước khi đọc body và trước mọi truy vấn database
+- Backend "memory": bucket trong bộ nhớ của từng worker. Backend "postgres": bucket dùng chung giữa các worker
+  trong bảng UNLOGGED rate_limit_buckets, mỗi lần kiểm tra là một câu upsert
+- Khi bị chặn, worker nhớ thời điểm được gửi lại cho key đó: request tiếp theo trong lúc bị chặn bị từ chối
+  ngay trong bộ nhớ, không truy vấn database, nên flood không làm chậm các request khác
+- Lỗi database khi dùng backend "postgres" thì cho request đi qua (không chặn khách thật vì sự cố của bộ đếm)
+"""
+
+import logging
+import math
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from config.database import SessionLocal
+from config.settings import settings
+
+# Số key tối đa giữ trong bộ nhớ trước khi dọn các bucket đã hồi đầy token
+MAX_MEMORY_KEYS = 10000
+
+# Khoảng thời gian tối thiểu giữa hai lần ghi log lỗi của backend postgres
+ERROR_LOG_INTERVAL_SECONDS = 60
+
+
+class RateLimitRule(NamedTuple):
+    name: str
+    method: str
+    path: Pattern
+    capacity: int  # Số request tối đa liên tiếp
+    refill: float  # Số token hồi lại mỗi giây
+
+    def retry_after(self, tokens: float) -> float:
+        """Số giây chờ tới khi bucket có lại một token"""
+        return (1 - tokens) / self.refill
+
+    def full_after(self) -> float:
+        """Số giây để một bucket rỗng hồi đầy, bucket không dùng lâu hơn thế có thể xóa"""
+        return self.capacity / self.refill
+
+
+def parse_limit(raw: str) -> Optional[Tuple[int, float]]:
+    """Đọc cấu hình "5/600" (5 request mỗi 600 giây) thành (sức chứa, token hồi mỗi giây); rỗng là không giới hạn"""
+    if not raw.strip():
+        return None
+    try:
+        count, seconds = raw.split("/")
+        capacity, period = int(count), float(seconds)
+        if capacity < 1 or period <= 0:
+            raise ValueError
+    except ValueError:
+        logging.warning(f"Bỏ qua cấu hình giới hạn tần suất không hợp lệ: '{raw.strip()}'")
+        return None
+    return capacity, capacity / period
+
+
+def make_rule(name: str, method: str, path: str, raw: str) -> Optional[RateLimitRule]:
+    """Tạo luật cho một route (mẫu đường dẫn như khi khai báo router, bỏ qua dấu / cuối)"""
+    limit = parse_limit(raw)
+    if limit is None:
+        return None
+    pattern, _, _ = compile_path(path.rstrip("/"))
+    return RateLimitRule(name, method, pattern, *limit)
+
+
+def default_rules() -> List[RateLimitRule]:
+    rules = [
+        make_rule("contact", "POST", "/api/contact/submit", settings.RATE_LIMIT_CONTACT),
+        make_rule("orders", "POST", "/api/orders/", settings.RATE_LIMIT_ORDERS),
+        make_rule("reviews", "POST", "/api/services/{service_id}/reviews", settings.RATE_LIMIT_REVIEWS),
+    ]
+    return [rule for rule in rules if rule is not None]
+
+
+class MemoryBackend:
+    """Bucket trong bộ nhớ của tiến trình, chỉ dùng trên vòng lặp asyncio nên không cần khóa"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        # key -> [số token, thời điểm cập nhật, thời gian hồi đầy của luật]
+        self._buckets: Dict[str, List[float]] = {}
+
+    def hit(self, key: str, rule: RateLimitRule) -> float:
+        """Lấy một token; trả về 0 nếu được phép, ngược lại là số giây phải chờ"""
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_MEMORY_KEYS:
+                self.prune(now)
+            self._buckets[key] = [rule.capacity - 1, now, rule.full_after()]
+            return 0
+        tokens = min(rule.capacity, bucket[0] + (now - bucket[1]) * rule.refill)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return rule.retry_after(tokens)
+        bucket[0] = tokens - 1
+        return 0
+
+    def prune(self, now: float):
+        # Bucket để lâu tới mức đã hồi đầy giống hệt bucket chưa có, xóa không ảnh hưởng giới hạn
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < bucket[2]}
+        if len(self._buckets) >= MAX_MEMORY_KEYS:
+            logging.warning(f"Bộ đếm giới hạn tần suất vượt {MAX_MEMORY_KEYS} key, xóa toàn bộ")
+            self._buckets.clear()
+
+
+# Tính token hiện có và lấy một token trong cùng một câu lệnh; cột allowed cho biết lần này có được phép không
+POSTGRES_HIT_SQL = """
+    INSERT INTO rate_limit_buckets AS bucket (key, tokens, allowed, updated_at)
+    VALUES (:key, :capacity - 1, true, clock_timestamp())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE
+            WHEN LEAST(:capacity, bucket.tokens + EXTRACT(EPOCH FROM clock_timestamp() - bucket.updated_at) * :refill) >= 1
+            THEN LEAST(:capacity, bucket.tokens + EXTRACT(EPOCH FROM clock_timestamp() - bucket.updated_at) * :refill) - 1
+            ELSE LEAST(:capacity, bucket.tokens + EXTRACT(EPOCH FROM clock_timestamp() - bucket.updated_at) * :refill)
+        END,
+        allowed = LEAST(:capacity, bucket.tokens + EXTRACT(EPOCH FROM clock_timestamp() - bucket.updated_at) * :refill) >= 1,
+        updated_at = clock_timestamp()
+    RETURNING tokens, allowed
+"""
+
+
+class PostgresBackend:
+    """Bucket dùng chung giữa các worker trong bảng rate_limit_buckets"""
+
+    def __init__(self):
+        self._last_error = 0.0
+
+    def hit(self, key: str, rule: RateLimitRule) -> float:
+        db = SessionLocal()
+        try:
+            tokens, allowed = db.execute(
+                text(POSTGRES_HIT_SQL), {"key": key, "capacity": rule.capacity, "refill": rule.refill}
+            ).one()
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            now = time.monotonic()
+            if now - self._last_error >= ERROR_LOG_INTERVAL_SECONDS:
+                self._last_error = now
+                logging.error(f"Lỗi bộ đếm giới hạn tần suất, tạm cho request đi qua: {str(e)}")
+            return 0
+        finally:
+            db.close()
+        return 0 if allowed else rule.retry_after(tokens)
+
+    def prune(self, seconds: float) -> int:
+        """Xóa bucket không dùng lâu hơn `seconds` (thời gian hồi đầy của luật chậm nhất)"""
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                text("DELETE FROM rate_limit_buckets "
+                     "WHERE updated_at < clock_timestamp() - make_interval(secs => :seconds)"),
+                {"seconds": seconds}
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+
+class RateLimiter:
+    def __init__(self, rules: List[RateLimitRule], backend, clock: Callable[[], float] = time.monotonic):
+        self.rules = rules
+        self.backend = backend
+        self.clock = clock
+        # key -> thời điểm (clock) được gửi lại; request trong khoảng này bị từ chối không cần hỏi backend
+        self._blocked: Dict[str, float] = {}
+
+    def match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        path = path.rstrip("/")
+        for rule in self.rules:
+            if rule.method == method and rule.path.match(path):
+                return rule
+        return None
+
+    async def check(self, rule: RateLimitRule, client_ip: str) -> float:
+        """Trả về 0 nếu request được phép, ngược lại là số giây phải chờ"""
+        key = f"{rule.name}:{client_ip}"
+        now = self.clock()
+        until = self._blocked.get(key)
+        if until is not None:
+            if now < until:
+                return until - now
+            del self._blocked[key]
+
+        if isinstance(self.backend, MemoryBackend):
+            wait = self.backend.hit(key, rule)
+        else:
+            wait = await run_in_threadpool(self.backend.hit, key, rule)
+        if wait > 0:
+            if len(self._blocked) >= MAX_MEMORY_KEYS:
+                self._blocked = {k: v for k, v in self._blocked.items() if v > now}
+            self._blocked[key] = now + wait
+            logging.warning(f"Giới hạn tần suất {rule.name}: chặn {client_ip} trong {math.ceil(wait)} giây")
+        return wait
+
+    def prune(self) -> int:
+        """Dọn bucket đã hồi đầy trong bảng rate_limit_buckets (gọi định kỳ, backend memory tự dọn)"""
+        if not isinstance(self.backend, PostgresBackend):
+            return 0
+        return self.backend.prune(max((rule.full_after() for rule in self.rules), default=0))
+
+    def reset(self):
+        self._blocked.clear()
+        if isinstance(self.backend, MemoryBackend):
+            self.backend = MemoryBackend(self.backend.clock)
+
+
+def client_ip(scope) -> str:
+    """
+    IP của client. Sau RATE_LIMIT_TRUSTED_PROXIES proxy (nginx...), mỗi proxy thêm IP nó nhận được vào cuối
+    X-Forwarded-For nên IP thật nằm ở vị trí thứ N tính từ cuối; phần trước đó do client tự gửi, không tin được.
+    """
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                addresses = [address.strip() for address in value.decode("latin-1").split(",")]
+                return addresses[-hops] if len(addresses) >= hops else addresses[0]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware trả 429 cho request vượt giới hạn, trước khi route xử lý (chưa đọc body, chưa truy vấn)"""
+
+    def __init__(self, app, limiter: "RateLimiter" = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.limiter.match(scope["method"], scope["path"])
+        if rule is not None:
+            wait = await self.limiter.check(rule, client_ip(scope))
+            if wait > 0:
+                retry_after = math.ceil(wait)
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": f"Bạn gửi quá nhiều yêu cầu, vui lòng thử lại sau {retry_after} giây"},
+                    headers={"Retry-After": str(retry_after)}
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+rate_limiter = RateLimiter(
+    default_rules(),
+    PostgresBackend() if settings.RATE_LIMIT_BACKEND == "postgres" else MemoryBackend()
+)
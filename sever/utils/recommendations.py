@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from config.settings import settings
+
+# Khóa advisory để chỉ một worker tính lại bảng gợi ý tại một thời điểm
+RECOMMENDATION_LOCK_ID = 350035
+
+# Thời gian tối đa worker không giành được khóa chờ worker đang tính xong
+RECOMMENDATION_WAIT_TIMEOUT = "300s"
+
+# Ứng viên theo thứ tự ưu tiên: dịch vụ thường được cùng khách hàng đặt, cùng danh mục,
+# nổi bật, cuối cùng là dịch vụ đang hoạt động bất kỳ để luôn đủ số lượng.
+# Mỗi cặp (dịch vụ, gợi ý) chỉ giữ lý do có ưu tiên cao nhất.
+COMPUTE_SQL = """
+WITH customer_services AS (
+    SELECT DISTINCT customer_email, service_id
+    FROM orders
+    WHERE service_id IS NOT NULL AND status <> 'cancelled' AND created_at >= :since
+),
+candidates AS (
+    SELECT a.service_id, b.service_id AS recommended_id, 'co_ordered' AS reason,
+           count(*)::float8 AS score, 0 AS priority
+    FROM customer_services a
+    JOIN customer_services b ON a.customer_email = b.customer_email AND a.service_id <> b.service_id
+    GROUP BY a.service_id, b.service_id
+    UNION ALL
+    SELECT s.id, c.id, 'same_category', c.rating_count::float8, 1
+    FROM services s
+    CROSS JOIN LATERAL (
+        SELECT id, rating_count FROM services c
+        WHERE c.category = s.category AND c.id <> s.id AND c.is_active
+        ORDER BY c.featured DESC, c.rating_count DESC, c.id
+        LIMIT :size
+    ) c
+    WHERE s.category IS NOT NULL
+    UNION ALL
+    SELECT s.id, f.id, 'featured', f.rating_count::float8, 2
+    FROM services s
+    CROSS JOIN LATERAL (
+        SELECT id, rating_count FROM services f
+        WHERE f.featured AND f.is_active AND f.id <> s.id
+        ORDER BY f.rating_count DESC, f.id
+        LIMIT :size
+    ) f
+    UNION ALL
+    SELECT s.id, a.id, 'active', a.rating_count::float8, 3
+    FROM services s
+    CROSS JOIN LATERAL (
+        SELECT id, rating_count FROM services a
+        WHERE a.is_active AND a.id <> s.id
+        ORDER BY a.rating_count DESC, a.id
+        LIMIT :size
+    ) a
+),
+best AS (
+    SELECT DISTINCT ON (c.service_id, c.recommended_id) c.*
+    FROM candidates c
+    JOIN services r ON r.id = c.recommended_id AND r.is_active
+    ORDER BY c.service_id, c.recommended_id, c.priority, c.score DESC
+),
+ranked AS (
+    SELECT *, row_number() OVER (
+        PARTITION BY service_id ORDER BY priority, score DESC, recommended_id
+    ) AS position
+    FROM best
+)
+INSERT INTO service_recommendations (service_id, position, recommended_id, reason, score, computed_at)
+SELECT service_id, position, recommended_id, reason, score, :now
+FROM ranked
+WHERE position <= :size
+"""
+
+# Gợi ý mặc định cho dịch vụ chưa có trong bảng (ví dụ vừa tạo sau lần tính gần nhất)
+DEFAULT_SQL = """
+SELECT id FROM services
+WHERE is_active
+ORDER BY featured DESC, rating_count DESC, id
+LIMIT :size
+"""
+
+
+class RecommendationCache:
+    """
+    Danh sách id dịch vụ gợi ý theo từng dịch vụ, nạp từ bảng service_recommendations
+    vào bộ nhớ sau mỗi lần tính lại. Mỗi tiến trình (worker uvicorn) giữ bản riêng.
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._by_service: Dict[int, List[int]] = {}
+        self._default: List[int] = []
+        self.loaded_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def get(self, service_id: int) -> List[int]:
+        ids = self._by_service.get(service_id)
+        if ids is None:
+            ids = [i for i in self._default if i != service_id][:self.size]
+        return ids
+
+    def compute(self, db: Session) -> Optional[int]:
+        """
+        Tính lại toàn bộ bảng gợi ý trong một transaction. Trả về số dòng đã ghi,
+        hoặc None nếu một worker khác đang tính.
+        """
+        locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": RECOMMENDATION_LOCK_ID}).scalar()
+        if not locked:
+            db.rollback()
+            return None
+        db.execute(text("DELETE FROM service_recommendations"))
+        result = db.execute(text(COMPUTE_SQL), {
+            "since": datetime.utcnow() - timedelta(days=settings.RECOMMENDATION_LOOKBACK_DAYS),
+            "size": self.size,
+            "now": datetime.utcnow()
+        })
+        db.commit()
+        return result.rowcount
+
+    def wait_for_compute(self, db: Session):
+        """
+        Chờ worker đang giữ khóa tính xong (khóa transaction được nhả khi commit) để nạp bảng mới,
+        thay vì nạp bảng đang bị xóa dở/còn trống và dùng danh sách mặc định suốt một chu kỳ
+        """
+        try:
+            db.execute(text("SELECT set_config('lock_timeout', :timeout, true)"),
+                       {"timeout": RECOMMENDATION_WAIT_TIMEOUT})
+            db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": RECOMMENDATION_LOCK_ID})
+        except OperationalError as e:
+            logging.warning(f"Hết thời gian chờ worker khác tính gợi ý dịch vụ, nạp bảng hiện có: {str(e)}")
+        finally:
+            db.rollback()
+
+    def load(self, db: Session):
+        """Nạp bảng gợi ý vào bộ nhớ, thay thế bản cũ một lần"""
+        by_service: Dict[int, List[int]] = {}
+        rows = db.execute(text(
+            "SELECT service_id, recommended_id FROM service_recommendations ORDER BY service_id, position"
+        ))
+        for service_id, recommended_id in rows:
+            by_service.setdefault(service_id, []).append(recommended_id)
+        default = [row[0] for row in db.execute(text(DEFAULT_SQL), {"size": self.size + 1})]
+
+        with self._lock:
+            self._by_service = by_service
+            self._default = default
+            self.loaded_at = datetime.utcnow()
+
+    def refresh(self):
+        """
+        Tính lại bảng gợi ý rồi nạp vào bộ nhớ (chạy định kỳ từ main.py, trong threadpool vì truy vấn
+        tính lại mất vài giây trên dữ liệu lớn)
+        """
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            count = self.compute(db)
+            if count is None:
+                self.wait_for_compute(db)
+            self.load(db)
+            if count is not None:
+                logging.info(f"Đã tính lại {count} gợi ý dịch vụ cho {len(self._by_service)} dịch vụ "
+                             f"trong {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Lỗi khi tính gợi ý dịch vụ: {str(e)}")
+        finally:
+            db.close()
+
+
+recommendation_cache = RecommendationCache(size=settings.RECOMMENDATION_SIZE)
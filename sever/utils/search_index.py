@@ -0,0 +1,198 @@
+"""
+Chỉ mục tiền tố trong bộ nhớ cho gợi ý tìm kiếm (autocomplete).
+
+Mỗi tên dịch vụ, tiêu đề bài viết và danh mục được chuẩn hóa (bỏ dấu, chữ thường) rồi
+sinh một khóa cho mỗi vị trí bắt đầu của từ, ví dụ "In bảng hiệu" sinh "in bang hieu",
+"bang hieu" và "hieu". Các khóa nằm trong một mảng đã sắp xếp nên tra cứu tiền tố chỉ là
+một lần bisect cộng với duyệt các phần tử liền kề, tốn vài micro giây.
+
+Chỉ mục được xây dựng khi khởi động (build) và cập nhật từng phần khi thêm/sửa/xóa
+dịch vụ hoặc bài viết. Mỗi tiến trình (worker uvicorn) có bản chỉ mục riêng.
+"""
+
+import bisect
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+_SPACE_RE = re.compile(r"[^0-9a-z]+")
+
+# Số khóa tối đa sinh cho một mục, tránh tiêu đề quá dài làm phình chỉ mục
+MAX_KEYS_PER_ITEM = 12
+
+ItemRef = Tuple[str, Union[int, str]]
+
+
+def normalize(text: str) -> str:
+    """Bỏ dấu tiếng Việt, chuyển chữ thường và gộp ký tự không phải chữ/số thành một khoảng trắng"""
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _keys_for(label: str) -> List[str]:
+    words = normalize(label).split()
+    return [" ".join(words[i:]) for i in range(min(len(words), MAX_KEYS_PER_ITEM))]
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    id: Optional[int]
+    label: str
+
+
+class PrefixIndex:
+    """Mảng khóa đã sắp xếp, mỗi phần tử là (khóa, loại, id)"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, Union[int, str]]] = []
+        # Nhãn gốc và dạng chuẩn hóa (cũng là khóa đầu tiên của mục)
+        self._labels: Dict[ItemRef, Tuple[str, str]] = {}
+        # Danh mục được gợi ý khi còn ít nhất một dịch vụ/bài viết đang hoạt động dùng nó
+        self._item_categories: Dict[ItemRef, str] = {}
+        self._category_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _insert(self, ref: ItemRef, label: str):
+        keys = _keys_for(label)
+        self._labels[ref] = (label, keys[0] if keys else "")
+        for key in keys:
+            bisect.insort(self._entries, (key, ref[0], ref[1]))
+
+    def _remove(self, ref: ItemRef):
+        labels = self._labels.pop(ref, None)
+        if labels is None:
+            return
+        for key in _keys_for(labels[0]):
+            entry = (key, ref[0], ref[1])
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def _set_category(self, ref: ItemRef, category: Optional[str]):
+        old = self._item_categories.pop(ref, None)
+        if old:
+            self._category_counts[old] -= 1
+            if not self._category_counts[old]:
+                del self._category_counts[old]
+                self._remove(("category", old))
+        if category:
+            self._item_categories[ref] = category
+            self._category_counts[category] = self._category_counts.get(category, 0) + 1
+            if self._category_counts[category] == 1:
+                self._insert(("category", category), category)
+
+    def upsert(self, kind: str, item_id: int, label: Optional[str], category: Optional[str] = None,
+               is_active: bool = True):
+        """Thêm hoặc cập nhật một dịch vụ/bài viết. Mục không hoạt động sẽ bị gỡ khỏi chỉ mục."""
+        ref = (kind, item_id)
+        with self._lock:
+            self._remove(ref)
+            if is_active and label:
+                self._insert(ref, label)
+                self._set_category(ref, category)
+            else:
+                self._set_category(ref, None)
+
+    def remove(self, kind: str, item_id: int):
+        ref = (kind, item_id)
+        with self._lock:
+            self._remove(ref)
+            self._set_category(ref, None)
+
+    def build(self, items: List[Tuple[str, int, str, Optional[str]]]):
+        """Xây dựng lại toàn bộ chỉ mục từ danh sách (loại, id, nhãn, danh mục) một lần sắp xếp"""
+        fresh = PrefixIndex()
+        for kind, item_id, label, category in items:
+            ref = (kind, item_id)
+            keys = _keys_for(label or "")
+            if not keys:
+                continue
+            fresh._labels[ref] = (label, keys[0])
+            fresh._entries.extend((key, kind, item_id) for key in keys)
+            if category:
+                fresh._item_categories[ref] = category
+                fresh._category_counts[category] = fresh._category_counts.get(category, 0) + 1
+        for category in fresh._category_counts:
+            keys = _keys_for(category)
+            if keys:
+                fresh._labels[("category", category)] = (category, keys[0])
+                fresh._entries.extend((key, "category", category) for key in keys)
+        fresh._entries.sort()
+
+        with self._lock:
+            self._entries = fresh._entries
+            self._labels = fresh._labels
+            self._item_categories = fresh._item_categories
+            self._category_counts = fresh._category_counts
+
+    def lookup(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Các mục có một từ bắt đầu bằng `prefix`; mục khớp từ đầu tiên của nhãn được ưu tiên"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            entries = self._entries
+            labels = self._labels
+            position = bisect.bisect_left(entries, (prefix,))
+            end = min(len(entries), position + limit * MAX_KEYS_PER_ITEM)
+            leading, others, seen = [], [], set()
+            while position < end:
+                key, kind, ident = entries[position]
+                position += 1
+                if not key.startswith(prefix):
+                    break
+                ref = (kind, ident)
+                if ref in seen:
+                    continue
+                seen.add(ref)
+                label, normalized = labels[ref]
+                suggestion = Suggestion(kind, None if kind == "category" else ident, label)
+                (leading if normalized.startswith(prefix) else others).append(suggestion)
+                if len(leading) >= limit:
+                    break
+        return (leading + others)[:limit]
+
+    def memory_usage(self) -> int:
+        """Ước lượng số byte chỉ mục đang chiếm (mảng, tuple, chuỗi khóa và nhãn)"""
+        with self._lock:
+            total = sys.getsizeof(self._entries) + sys.getsizeof(self._labels)
+            total += sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) for entry in self._entries)
+            # Dạng chuẩn hóa trong _labels dùng chung đối tượng chuỗi với khóa đầu tiên nên không tính lại
+            total += sum(sys.getsizeof(ref) + sys.getsizeof(labels) + sys.getsizeof(labels[0])
+                         for ref, labels in self._labels.items())
+        return total
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "items": len(self._labels),
+            "keys": len(self._entries),
+            "memory_bytes": self.memory_usage()
+        }
+
+
+suggest_index = PrefixIndex()
+
+
+def build_suggest_index(db) -> PrefixIndex:
+    """Nạp tên dịch vụ, tiêu đề bài viết và danh mục đang hoạt động vào chỉ mục gợi ý"""
+    from models.models import Blog, Service
+
+    started = time.perf_counter()
+    items = [("service", row.id, row.name, row.category)
+             for row in db.query(Service.id, Service.name, Service.category).filter(Service.is_active == True)]
+    items += [("blog", row.id, row.title, row.category)
+              for row in db.query(Blog.id, Blog.title, Blog.category).filter(Blog.is_active == True)]
+    suggest_index.build(items)
+
+    stats = suggest_index.stats()
+    logging.info(f"Đã xây dựng chỉ mục gợi ý: {stats['items']} mục, {stats['keys']} khóa, "
+                 f"~{stats['memory_bytes'] / 1024:.0f} KB trong {(time.perf_counter() - started) * 1000:.0f} ms")
+    return suggest_index
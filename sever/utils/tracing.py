@@ -0,0 +1,347 @@
+"""
+Tracing theo định dạng OpenTelemetry (OTLP/JSON), không cần cài SDK.
+
+Mỗi request là một span gốc (SERVER), bên trong có span cho từng câu SQL, lưu file upload và gửi email,
+nên xem được thời gian của request dồn vào database, ghi file hay SMTP.
+- trace_id lấy từ header traceparent (W3C) nếu có, nếu không thì dùng request_id của log
+  (utils/logging_pipeline.py) để tra log và trace bằng cùng một mã
+- Span kết thúc được đưa vào hàng đợi có giới hạn (TRACING_MAX_QUEUE_SIZE, đầy thì bỏ span và đếm lại
+  để collector chậm/không chạy không làm tăng bộ nhớ), thread riêng gom theo lô rồi ghi vào file JSON lines
+  (TRACING_EXPORTER=file, mỗi dòng một ExportTraceServiceRequest giống file exporter của OTel Collector)
+  hoặc gửi tới OTLP/HTTP collector (TRACING_EXPORTER=otlp, TRACING_OTLP_ENDPOINT)
+- Tắt mặc định (TRACING_ENABLED=false): span() khi đó chỉ là một lần kiểm tra cờ
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import settings
+from utils.logging_pipeline import request_id_var
+
+# SpanKind của OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+SERVICE_NAME = "phulong-api"
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 2.0
+# Câu SQL dài được cắt bớt trong thuộc tính db.statement
+MAX_STATEMENT_LENGTH = 2000
+# Khoảng thời gian tối thiểu giữa hai cảnh báo bỏ span vì hàng đợi đầy
+DROP_WARNING_INTERVAL_SECONDS = 60
+
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+_TRACE_ID = re.compile(r"[0-9a-f]{32}")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes",
+                 "status", "status_message")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, kind: int,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = 0
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = str(error)[:500]
+        self.attributes["exception.type"] = type(error).__name__
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status:
+            span["status"] = {"code": self.status, "message": self.status_message}
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    """Gom span đã kết thúc theo lô và ghi file / gửi OTLP trong thread riêng"""
+
+    def __init__(self, exporter: str = "file", path: str = "logs/traces.jsonl", endpoint: str = "",
+                 max_queue_size: int = 10000):
+        self.exporter = exporter
+        self.path = path
+        self.endpoint = endpoint
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.dropped = 0
+        self._dropped_since_warning = 0
+        self._last_drop_warning = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.exporter == "file":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(5)
+        self._thread = None
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            self._dropped_since_warning += 1
+            now = time.monotonic()
+            if now - self._last_drop_warning >= DROP_WARNING_INTERVAL_SECONDS:
+                logging.warning(f"Hàng đợi span đầy, đã bỏ {self._dropped_since_warning} span "
+                                f"(tổng {self.dropped}), kiểm tra exporter/collector")
+                self._last_drop_warning = now
+                self._dropped_since_warning = 0
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._stopping.wait(EXPORT_INTERVAL_SECONDS)
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            batch: List[Span] = []
+            try:
+                while len(batch) < EXPORT_BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._export(batch)
+            if len(batch) < EXPORT_BATCH_SIZE:
+                return
+
+    def _export(self, batch: List[Span]):
+        payload = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "phulong.tracing"}, "spans": [span.to_otlp() for span in batch]}]
+        }]}, ensure_ascii=False, default=str)
+        try:
+            if self.exporter == "otlp":
+                request = urllib.request.Request(self.endpoint, data=payload.encode(), method="POST",
+                                                 headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(request, timeout=5).close()
+            else:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(payload + "\n")
+        except Exception as e:
+            logging.warning(f"Không xuất được {len(batch)} span: {str(e)}")
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.enabled = enabled
+        self.exporter = exporter or SpanExporter()
+        self.sample_rate = sample_rate
+
+    def start(self):
+        if self.enabled:
+            self.exporter.start()
+
+    def stop(self):
+        self.exporter.stop()
+
+    def start_span(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+                   root: bool = False, trace_id: Optional[str] = None, parent_id: Optional[str] = None) -> Optional[Span]:
+        """
+        Tạo span con của span hiện tại. Không có span hiện tại thì chỉ tạo span gốc khi root=True
+        (ví dụ email gửi từ tác vụ nền), còn lại trả về None để không ghi span lẻ.
+        """
+        if not self.enabled:
+            return None
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(parent.trace_id, parent.span_id, name, kind, attributes)
+        if not root:
+            return None
+        return Span(trace_id or secrets.token_hex(16), parent_id, name, kind, attributes)
+
+    def current_context(self) -> Optional[Tuple[str, str]]:
+        """(trace_id, span_id) của span hiện tại, để nối span của việc chạy sau (email trong hàng đợi) vào trace"""
+        span = _current_span.get()
+        return (span.trace_id, span.span_id) if span is not None else None
+
+    def end_span(self, span: Span):
+        span.end = time.time_ns()
+        self.exporter.submit(span)
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL,
+             root: bool = False, parent: Optional[Tuple[str, str]] = None) -> Iterator[Optional[Span]]:
+        """
+        Đo một đoạn code: with tracer.span("upload.save", {"file.size": 123}) as span: ...
+        `parent` (trace_id, span_id) lấy từ current_context() khi span gốc thuộc về một trace đã có.
+        """
+        trace_id, parent_id = parent or (None, None)
+        span = self.start_span(name, kind, attributes, root, trace_id, parent_id)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.start_span("db.query", KIND_CLIENT, {
+        "db.system": "postgresql",
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+    })
+    if span is not None:
+        conn.info["trace_span"] = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = conn.info.pop("trace_span", None)
+    if span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rows", cursor.rowcount)
+        tracer.end_span(span)
+
+
+def _handle_error(exception_context):
+    span = exception_context.connection.info.pop("trace_span", None) if exception_context.connection else None
+    if span is not None:
+        span.record_error(exception_context.original_exception)
+        tracer.end_span(span)
+
+
+def instrument_engine(engine: Engine):
+    """Tạo span cho từng câu SQL chạy trong request"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """ASGI middleware: span gốc cho mỗi request, trả về header traceparent để client nối tiếp trace"""
+
+    def __init__(self, app, tracer: "Tracer" = None):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        tracer = self.tracer or globals()["tracer"]
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        sampled = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                match = _TRACEPARENT.fullmatch(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_id = match.group(1), match.group(2)
+                    sampled = int(match.group(3), 16) & 1 == 1
+                break
+        if sampled is None:
+            sampled = random.random() < tracer.sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        if trace_id is None:
+            request_id = request_id_var.get()
+            trace_id = request_id if request_id and _TRACE_ID.fullmatch(request_id) else secrets.token_hex(16)
+        span = tracer.start_span(f"{scope['method']} {scope['path']}", KIND_SERVER, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+            "request.id": request_id_var.get() or "",
+        }, root=True, trace_id=trace_id, parent_id=parent_id)
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                traceparent = f"00-{span.trace_id}-{span.span_id}-01"
+                message["headers"] = list(message.get("headers", [])) + [(b"traceparent", traceparent.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            # Tên span theo mẫu route để gom được theo endpoint
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            tracer.end_span(span)
+
+
+tracer = Tracer(
+    enabled=settings.TRACING_ENABLED,
+    exporter=SpanExporter(settings.TRACING_EXPORTER, settings.TRACING_FILE, settings.TRACING_OTLP_ENDPOINT,
+                          settings.TRACING_MAX_QUEUE_SIZE),
+    sample_rate=settings.TRACING_SAMPLE_RATE
+)